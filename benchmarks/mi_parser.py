@@ -0,0 +1,35 @@
+"""Benchmark of pygdbmi's parser against pygdbnx.miparser on the records seen while debugging"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+import timeit
+# exit benchmarks directory
+sys.path.append("../")
+
+from pygdbmi import gdbmiparser
+from pygdbnx import miparser
+
+RECORDS = {
+    "memory": '12^done,memory=[{begin="0x0000007100001234",offset="0x0000000000000000",'
+              'end="0x0000007100001334",contents="' + "3b424950" * 64 + '"}]',
+    "register-values": '13^done,register-values=[{number="0",value="0x1001"},'
+                       '{number="1",value="0x7100001234"},{number="2",value="0x1002"}]',
+    "stopped": '*stopped,reason="breakpoint-hit",disp="keep",bkptno="1",'
+               'frame={addr="0x0000007100001234",func="??",args=[],arch="aarch64"},'
+               'thread-id="1",stopped-threads="all",core="0"',
+    "breakpoint-modified": '=breakpoint-modified,bkpt={number="1",type="breakpoint",'
+                           'disp="keep",enabled="y",addr="0x0000007100001234",times="3",'
+                           'ignore="2",original-location="*0x7100001234",thread-groups=["i1"]}',
+    "console": '~"x3             0x1001              4097\\n"',
+    "done": "14^done",
+}
+NUMBER = 20000
+
+print(f"{'record':<20} {'pygdbmi':>14} {'miparser':>14} {'speedup':>8}")
+for name, record in RECORDS.items():
+    expected = gdbmiparser.parse_response(record)
+    assert {key: miparser.parse_response(record)[key] for key in expected} == expected
+    before = NUMBER / timeit.timeit(lambda record = record: gdbmiparser.parse_response(record),
+                                    number = NUMBER)
+    after = NUMBER / timeit.timeit(lambda record = record: miparser.parse_response(record),
+                                   number = NUMBER)
+    print(f"{name:<20} {before:>10,.0f}/sec {after:>10,.0f}/sec {after / before:>7.1f}x")
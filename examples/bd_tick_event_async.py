@@ -0,0 +1,23 @@
+"""An example of waiting for breakpoints with asyncio"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+import asyncio
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.asyncgdbprocess import AsyncGdbProcess
+from pygdbnx.breakpoint import Breakpoint
+
+async def main():
+    """Print every tick event while other tasks keep running"""
+    # IP of switch
+    gdb_process = await AsyncGdbProcess.create("192.168.0.19")
+    # create breakpoint at address 71002BC2C70 (SmartPoint.AssetAssistant.Sequencer$$Update in BD)
+    await gdb_process.add_breakpoint(Breakpoint(0x7102BC2C70, "TickEvent", registers = ["x0"]))
+    # connecting with gdb automatically pauses execution, resume in order to wait for breakpoints
+    await gdb_process.resume()
+    async for event in gdb_process.events():
+        print(f"Tick event! x0={event.registers['x0']:X}")
+        await gdb_process.resume()
+
+asyncio.run(main())
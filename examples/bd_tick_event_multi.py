@@ -0,0 +1,25 @@
+"""An example of waiting for breakpoints on many consoles at once"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+import asyncio
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.manager import SessionManager
+from pygdbnx.breakpoint import Breakpoint
+
+async def main():
+    """Print every tick event of every console"""
+    manager = SessionManager()
+    # IPs of switches
+    await manager.add_consoles(["192.168.0.19", "192.168.0.20"])
+    # create breakpoint at address 71002BC2C70 (SmartPoint.AssetAssistant.Sequencer$$Update in BD)
+    # on every console
+    await manager.broadcast_breakpoints([Breakpoint(0x7102BC2C70, "TickEvent", registers = ["x0"])])
+    # connecting with gdb automatically pauses execution, resume in order to wait for breakpoints
+    await manager.resume_all()
+    async for console_event in manager.events():
+        print(f"Tick event on {console_event.console}! x0={console_event.event.registers['x0']:X}")
+        await manager.resume(console_event.console)
+
+asyncio.run(main())
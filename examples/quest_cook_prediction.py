@@ -1,4 +1,5 @@
-"""Example of waiting for input after breaking, along with storing information in breakpoints"""
+"""Example of analysing in the background after breaking, along with storing information
+in breakpoints"""
 # pylint: disable=import-error, wrong-import-position, unused-argument
 import sys
 import json
@@ -60,7 +61,7 @@ def generate_voxel(rng: Xorshift):
     return is_shiny(sidtid, pid), pid, sidtid, species
 
 def on_rng_accessed(gdbprocess: GdbProcess, bkpt: Breakpoint):
-    """Function to be run whenever the global rng is accessed"""
+    """Function to be run while the game is halted whenever the global rng is accessed"""
     seed0 = gdbprocess.read_int(0x2c8ef30,size="w",offset_main=True)
     seed1 = gdbprocess.read_int(0x2c8ef34,size="w",offset_main=True)
     seed2 = gdbprocess.read_int(0x2c8ef38,size="w",offset_main=True)
@@ -75,9 +76,13 @@ def on_rng_accessed(gdbprocess: GdbProcess, bkpt: Breakpoint):
         while rng.state != test.state:
             rng.next()
             bkpt.stored_information['rng_advances'] += 1
-    advances: int = bkpt.stored_information['rng_advances']
+    # everything returned here is handed to find_shiny while the game keeps running
+    return bkpt.stored_information['rng_advances'], (seed0, seed1, seed2, seed3)
 
-    test = Xorshift(seed0,seed1,seed2,seed3)
+def find_shiny(captured):
+    """Function to be run in the background to search for the next shiny"""
+    advances, seeds = captured
+    test = Xorshift(*seeds)
     advances_until_shiny = 0
     # can only hit even/odd
     if not advances & 1:
@@ -87,12 +92,15 @@ def on_rng_accessed(gdbprocess: GdbProcess, bkpt: Breakpoint):
         test.next()
         test.next()
         advances_until_shiny += 2
+    return advances, advances_until_shiny, generate_voxel(test), seeds
 
+def on_shiny_found(bkpt: Breakpoint, result):
+    """Function to be run with the result of find_shiny"""
+    advances, advances_until_shiny, voxel, (seed0, seed1, seed2, seed3) = result
     print(f"{advances=}")
     print(f"{advances_until_shiny=}")
-    print(f"{generate_voxel(test)}")
+    print(f"{voxel}")
     print(f"{seed0=:08X} {seed1=:08X} {seed2=:08X} {seed3=:08X}")
-    input()
 
 # IP of switch
 gdb_process = GdbProcess("192.168.0.19")
@@ -100,7 +108,9 @@ gdb_process = GdbProcess("192.168.0.19")
 gdb_process.add_breakpoint(Breakpoint(
     0x710101d960,
     "RNG accessed",
-    on_break=on_rng_accessed
+    on_break=on_rng_accessed,
+    on_analysis=find_shiny,
+    on_result=on_shiny_found
 ))
 # connecting with gdb automatically pauses execution, resume in order to wait for breakpoints
 gdb_process.resume_execution()
@@ -0,0 +1,17 @@
+"""An example of keeping one gdb session attached for many short-lived scripts"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.daemon import SessionDaemon
+from pygdbnx.logs import log_to_console
+
+# print connection progress and where the session is served
+log_to_console()
+
+# IP of switch
+gdb_process = GdbProcess("192.168.0.19", background_reader = True)
+# serve the attached session until interrupted, scripts like vi_spawn_client connect to it
+SessionDaemon(gdb_process).serve_forever()
@@ -0,0 +1,34 @@
+"""An example of capturing stack information without halting the game"""
+# pylint: disable=import-error, wrong-import-position, unused-argument
+import sys
+import struct
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.breakpoint import Breakpoint, MemoryRange
+from pygdbnx.capture import CaptureEvent
+
+def overworld_spawn_capture(gdbprocess: GdbProcess, bkpt: Breakpoint, event: CaptureEvent):
+    """Function to be called with the captured pokemon information"""
+    pokemon = event.memory[0]
+    ec, pid, tidsid = struct.unpack_from("<QQQ", pokemon)
+    species, form = struct.unpack_from("<HH", pokemon, 0x18)
+    level = struct.unpack_from("<H", pokemon, 0x1e)[0]
+    print(f"{species=} {form=} {level=} {ec=:X} {pid=:X} {tidsid=:X}")
+
+# IP of switch
+gdb_process = GdbProcess("192.168.0.19")
+# print the pokemon stored in stack at address 7100D0AA60
+# (near end of pokemon generation function in Violet) and continue immediately
+gdb_process.add_breakpoint(Breakpoint(
+    0x7100d0aa60,
+    "Pokemon Generated",
+    memory = [MemoryRange("$sp + 0x18", 0x20)],
+    auto_continue = True,
+    on_capture = overworld_spawn_capture
+    ))
+# connecting with gdb automatically pauses execution, resume in order to wait for breakpoints
+gdb_process.resume_execution()
+# start loop of waiting for captures
+gdb_process.wait_for_break()
@@ -0,0 +1,25 @@
+"""An example of using the session held by vi_session_daemon"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+import struct
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.daemon import DaemonClient
+
+# IP of switch the daemon is attached to
+client = DaemonClient(ip_address = "192.168.0.19")
+# capture the pokemon stored in stack at address 7100D0AA60
+# (near end of pokemon generation function in Violet) and continue immediately
+client.add_breakpoints([{
+    'address': 0x7100d0aa60,
+    'name': "Pokemon Generated",
+    'memory': [["$sp + 0x18", 0x20]],
+    'auto_continue': True,
+}])
+client.resume()
+for event in client.events():
+    pokemon = bytes.fromhex(event['memory'][0])
+    ec, pid, tidsid = struct.unpack_from("<QQQ", pokemon)
+    species, form = struct.unpack_from("<HH", pokemon, 0x18)
+    print(f"{species=} {form=} {ec=:X} {pid=:X} {tidsid=:X}")
@@ -0,0 +1,45 @@
+"""An example of storing captured information in a columnar store instead of printing it"""
+# pylint: disable=import-error, wrong-import-position
+import sys
+import numpy as np
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.breakpoint import Breakpoint, MemoryRange
+from pygdbnx.columnar import ColumnarSink, read_columns
+
+# layout of the pokemon stored in stack, every field becomes a column
+POKEMON_DTYPE = np.dtype([
+    ("ec", "<u8"),
+    ("pid", "<u8"),
+    ("tidsid", "<u8"),
+    ("species", "<u2"),
+    ("form", "<u2"),
+    ("unknown", "V2"),
+    ("level", "<u2"),
+])
+
+# IP of switch
+gdb_process = GdbProcess("192.168.0.19")
+sink = ColumnarSink("violet_spawns", struct_dtypes = {"Pokemon Generated": [POKEMON_DTYPE]})
+sink.subscribe(gdb_process.events)
+# capture the pokemon stored in stack at address 7100D0AA60
+# (near end of pokemon generation function in Violet) and continue immediately
+gdb_process.add_breakpoint(Breakpoint(
+    0x7100d0aa60,
+    "Pokemon Generated",
+    memory = [MemoryRange("$sp + 0x18", 0x20)],
+    auto_continue = True,
+    ))
+# connecting with gdb automatically pauses execution, resume in order to wait for breakpoints
+gdb_process.resume_execution()
+try:
+    # store captures until interrupted
+    gdb_process.wait_for_break()
+except KeyboardInterrupt:
+    pass
+sink.close()
+columns = read_columns("violet_spawns", "Pokemon Generated")
+species = columns["memory0.species"]
+print(f"{len(species)} pokemon generated, most common species: {np.bincount(species).argmax()}")
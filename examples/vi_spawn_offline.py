@@ -0,0 +1,45 @@
+"""An example of developing a breakpoint callback against a snapshot instead of the console"""
+# pylint: disable=import-error, wrong-import-position, unused-argument
+import os
+import sys
+# exit examples directory
+sys.path.append("../")
+
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.offline import OfflineGdbProcess
+from pygdbnx.breakpoint import Breakpoint
+
+SNAPSHOT = "violet_spawn.snapshot"
+
+def overworld_spawn_event(gdbprocess: GdbProcess, bkpt: Breakpoint):
+    """Function to be called when a pokemon is generated, live or offline"""
+    pokemon_addr = gdbprocess.read_register("sp") + 0x18
+    pid = gdbprocess.read_int(pokemon_addr + 0x8)
+    species = gdbprocess.read_int(pokemon_addr + 0x18, "w")
+    level = gdbprocess.read_int(pokemon_addr + 0x1e, "h")
+    return species, level, pid
+
+def take_snapshot(gdbprocess: GdbProcess, bkpt: Breakpoint):
+    """Dump the stack and registers once the first pokemon is generated"""
+    gdbprocess.dump_snapshot(SNAPSHOT, [("stack", gdbprocess.stack_base,
+                                         gdbprocess.stack_max - gdbprocess.stack_base)])
+    bkpt.active = False
+
+if not os.path.exists(SNAPSHOT):
+    # IP of switch
+    gdb_process = GdbProcess("192.168.0.19")
+    # take a snapshot at address 7100D0AA60 (near end of pokemon generation function in Violet)
+    gdb_process.add_breakpoint(Breakpoint(
+        0x7100d0aa60,
+        "Pokemon Generated",
+        on_break = take_snapshot,
+        max_hits = 1
+        ))
+    gdb_process.resume_execution()
+    gdb_process.wait_for_break(timeout = 600)
+    gdb_process.exit()
+
+# run the callback against the snapshot as often as needed without touching the console
+offline_process = OfflineGdbProcess(SNAPSHOT)
+print(offline_process.replay(Breakpoint(0x7100d0aa60, "Pokemon Generated",
+                                        on_break = overworld_spawn_event)))
@@ -0,0 +1,488 @@
+"""asyncio counterpart of GdbProcess"""
+
+import asyncio
+import os.path
+import time
+from typing import AsyncIterator, Dict, List, Optional, Union
+from pygdbmi import gdbmiparser
+
+from .breakpoint import Breakpoint
+from .capture import CaptureEvent, parse_capture
+from .exceptions import ConnectionLost, GDBNotFoundException, GdbCommandException, \
+    MemoryReadException
+from .miparser import parse_response
+from .router import RecordRouter
+from .session import SwitchSession
+
+
+class AsyncGdbProcess(SwitchSession):
+    """asyncio counterpart of GdbProcess driving gdb through non-blocking pipes"""
+    STREAM_LIMIT = 1 << 26
+
+    def __init__(
+        self,
+        ip_address: str,
+        path_to_gdb: Optional[str] = "aarch64-none-elf-gdb.exe",
+        max_notifications: int = 65536,
+    ):
+        """
+        Create new asyncio gdb process without starting it, see AsyncGdbProcess.create
+
+        Args:
+            ip_address (str): Local IP address of the Nintendo Switch console
+
+            path_to_gdb (Optional[str], optional): Path to gdb executable to run.
+            Defaults to "aarch64-none-elf-gdb.exe"
+
+            max_notifications (int, optional): Maximum amount of records queued for events(),
+            the oldest are dropped once it is reached. Defaults to 65536
+        """
+        if not os.path.exists(path_to_gdb):
+            raise GDBNotFoundException(f"GDB executable not found at {path_to_gdb}."
+                                        " Either specify the direct path to gdb,"
+                                        " or place it next to the script you are executing")
+        self.init_session(ip_address)
+        self.path_to_gdb = path_to_gdb
+        self.gdb_process: asyncio.subprocess.Process = None
+        self.reader: asyncio.Task = None
+        self.router = RecordRouter()
+        self.waiters: Dict[int, asyncio.Future] = {}
+        self.max_notifications = max_notifications
+        self.notifications: asyncio.Queue = None
+        self.dropped = 0
+
+    @classmethod
+    async def create(
+        cls,
+        ip_address: str,
+        breakpoints: Optional[List[Breakpoint]] = None,
+        path_to_gdb: Optional[str] = "aarch64-none-elf-gdb.exe",
+        process_name: str = "Application",
+    ) -> "AsyncGdbProcess":
+        """
+        Create new gdb process, connect to the switch and attach to a process
+
+        Args:
+            ip_address (str): Local IP address of the Nintendo Switch console
+
+            breakpoints (Optional[List[Breakpoint]], optional): List of breakpoints
+            to apply on start of process.
+
+            path_to_gdb (Optional[str], optional): Path to gdb executable to run.
+            Defaults to "aarch64-none-elf-gdb.exe"
+
+            process_name (str, optional): Name of switch process to attach to.
+            Defaults to "Application"
+
+        Returns:
+            AsyncGdbProcess: The attached process
+        """
+        process = cls(ip_address, path_to_gdb)
+        await process.start()
+        await process.connect()
+        await process.attach(process_name)
+        await process.get_bases()
+        await process.command("set step-mode on")
+        if breakpoints is not None:
+            await process.add_breakpoints(breakpoints)
+        return process
+
+    async def start(
+        self,
+    ):
+        """
+        Launch gdb and start reading its output
+        """
+        self.notifications = asyncio.Queue(self.max_notifications)
+        self.gdb_process = await asyncio.create_subprocess_exec(
+            self.path_to_gdb,
+            "--interpreter=mi3",
+            stdin = asyncio.subprocess.PIPE,
+            stdout = asyncio.subprocess.PIPE,
+            stderr = asyncio.subprocess.STDOUT,
+            limit = self.STREAM_LIMIT,
+        )
+        self.reader = asyncio.ensure_future(self.read_output())
+
+    async def read_output(
+        self,
+    ):
+        """
+        Parse gdb output line by line as it arrives and route the records
+        """
+        try:
+            while True:
+                line = await self.gdb_process.stdout.readline()
+                if not line:
+                    break
+                line = line.decode(errors = "replace").rstrip("\r\n")
+                if not line or gdbmiparser.response_is_finished(line):
+                    continue
+                routed = self.router.route(parse_response(line))
+                if routed is None:
+                    continue
+                token, records = routed
+                if token is None:
+                    self.notify(records[0])
+                else:
+                    waiter = self.waiters.pop(token, None)
+                    if waiter is not None and not waiter.done():
+                        waiter.set_result(records)
+        finally:
+            for token in self.router.abandon():
+                waiter = self.waiters.pop(token, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(GdbCommandException("gdb exited"))
+            self.notify(None)
+
+    def notify(
+        self,
+        record: Optional[dict],
+    ):
+        """
+        Queue a record for events(), dropping the oldest record if the queue is full
+
+        Args:
+            record (Optional[dict]): Unclaimed mi3 record, None once gdb exited
+        """
+        if self.notifications.full():
+            self.notifications.get_nowait()
+            self.dropped += 1
+        self.notifications.put_nowait(record)
+
+    async def command(
+        self,
+        command: str,
+    ) -> List[dict]:
+        """
+        Send a command to gdb and wait for the records it caused
+
+        Args:
+            command (str): gdb command to send
+
+        Returns:
+            List[dict]: Stream records of the command followed by its result record
+        """
+        return (await self.command_many([command]))[0]
+
+    async def command_many(
+        self,
+        commands: List[str],
+    ) -> List[List[dict]]:
+        """
+        Pipeline commands to gdb and wait for the records of all of them
+
+        Args:
+            commands (List[str]): gdb commands to send
+
+        Returns:
+            List[List[dict]]: Records of each command, in order
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        lines = []
+        for command in commands:
+            token = self.next_token()
+            self.router.expect(token)
+            self.waiters[token] = loop.create_future()
+            futures.append(self.waiters[token])
+            lines.append(f"{token}{command}\n")
+        self.gdb_process.stdin.write("".join(lines).encode())
+        await self.gdb_process.stdin.drain()
+        return list(await asyncio.gather(*futures))
+
+    async def connect(
+        self,
+    ):
+        """
+        Connect to the switch with the ip address stored in self.ip_address
+        """
+        response = await self.command(f"target extended-remote {self.ip_address}:22225")
+        if response[-1]['message'] == "error":
+            raise ConnectionLost(f"Failed to connect to {self.ip_address}: "
+                                 f"{response[-1]['payload']['msg']}")
+        self.log_response(response)
+
+    async def attach(
+        self,
+        process_name: str = "Application",
+    ):
+        """
+        Attach to process of name process_name
+
+        Args:
+            process_name (str, optional): Name of switch process to attach to.
+            Defaults to "Application"
+        """
+        process_id = self.parse_process_id(await self.command("info os processes"), process_name)
+        if process_id is not None:
+            self.process_id = process_id
+            self.log_response(await self.command(f"attach {process_id}"))
+
+    async def get_bases(
+        self,
+    ):
+        """
+        Read the base addresses of sections of the switch's memory
+        """
+        self.apply_bases(await self.command("monitor get base"))
+
+    async def read_memory(
+        self,
+        address: int,
+        size: int,
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ) -> bytes:
+        """
+        Read a range of memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+
+        Returns:
+            bytes: Bytes read from address
+        """
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        result = (await self.command(f"-data-read-memory-bytes {address} {size}"))[-1]
+        if result['message'] == "error":
+            raise MemoryReadException(f"Failed to read 0x{size:X} bytes at 0x{address:X}: "
+                                      f"{result['payload']['msg']}")
+        contents = "".join(block['contents'] for block in result['payload']['memory'])
+        if len(contents) != size * 2:
+            raise MemoryReadException(f"Only part of 0x{size:X} bytes at 0x{address:X} "
+                                      "could be read")
+        return bytes.fromhex(contents)
+
+    async def read_int(
+        self,
+        address: int,
+        size: str = "g",
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ) -> int:
+        """
+        Read memory at address
+
+        Args:
+            address (int): Address to read from
+            size (str, optional): GDB size of int to read. Defaults to "g"
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+
+        Returns:
+            int: Integer read from address
+        """
+        return int.from_bytes(
+            await self.read_memory(address, self.INT_SIZES[size], offset_main, offset_heap),
+            "little"
+        )
+
+    async def read_register(
+        self,
+        register: str,
+    ) -> Union[int, float]:
+        """
+        Read value of register as either an int or a float
+
+        Args:
+            register (str): Register to read from
+
+        Returns:
+            Union[int, float]: Value read from register
+        """
+        return self.parse_register(register, await self.command(f"info register ${register}"))
+
+    async def evaluate(
+        self,
+        expression: str,
+    ) -> int:
+        """
+        Evaluate a gdb expression as an integer
+
+        Args:
+            expression (str): Expression to evaluate (e.g. "$sp + 0x18")
+
+        Returns:
+            int: Value of the expression
+        """
+        command = f"-data-evaluate-expression {self.mi_quote(expression)}"
+        result = (await self.command(command))[-1]
+        if result['message'] == "error":
+            raise GdbCommandException(f"Failed to evaluate {expression}: "
+                                      f"{result['payload']['msg']}")
+        return int(result['payload']['value'].split(" ")[0], 0)
+
+    async def write_int(
+        self,
+        address: int,
+        value: int,
+        size: str = "g",
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ):
+        """
+        Write integer of size to address
+
+        Args:
+            address (int): Address to write to
+            value (int): Value to write to memory
+            size (str, optional): GDB size of int to write. Defaults to "g"
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+        """
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        await self.command(f"-data-write-memory-bytes {address} "
+                           f"{value.to_bytes(self.INT_SIZES[size], 'little').hex()}")
+
+    async def add_breakpoint(
+        self,
+        bkpt: Breakpoint,
+    ):
+        """
+        Activate breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint object to activate
+        """
+        await self.add_breakpoints([bkpt])
+
+    async def add_breakpoints(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Activate many breakpoints at once by pipelining the gdb commands that install them
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoint objects to activate
+        """
+        records = await self.command_many(self.insert_commands(bkpts))
+        commands, error = self.register_breakpoints(bkpts, [record[-1] for record in records])
+        await self.command_many(commands)
+        if error is not None:
+            raise error
+
+    async def enable_many(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Enable many breakpoints at once
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to enable
+        """
+        for bkpt in bkpts:
+            bkpt.active = True
+        await self.command_many(self.toggle_commands("enable", bkpts))
+
+    async def disable_many(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Disable many breakpoints at once
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to disable
+        """
+        for bkpt in bkpts:
+            bkpt.active = False
+        await self.command_many(self.toggle_commands("disable", bkpts))
+
+    async def resume(
+        self,
+    ):
+        """
+        Resume program execution
+        """
+        await self.command("-exec-continue")
+
+    async def capture(
+        self,
+        bkpt: Breakpoint,
+    ) -> CaptureEvent:
+        """
+        Read the registers and memory declared by a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to capture for
+
+        Returns:
+            CaptureEvent: Captured registers and memory
+        """
+        event = CaptureEvent(bkpt, time.time())
+        for register in bkpt.registers:
+            event.registers[register] = await self.read_register(register)
+        for memory_range in bkpt.memory:
+            address = memory_range.address
+            if not isinstance(address, int):
+                address = await self.evaluate(address)
+            event.memory.append(await self.read_memory(address, memory_range.size))
+        return event
+
+    async def events(
+        self,
+    ) -> AsyncIterator[CaptureEvent]:
+        """
+        Iterate over breakpoint events until gdb exits
+
+        Events of auto-continue breakpoints arrive while the target keeps running. For every
+        other breakpoint the declared registers and memory are captured and the target stays
+        halted until resume() is awaited.
+
+        Yields:
+            CaptureEvent: Event of each breakpoint hit
+        """
+        while True:
+            record = await self.notifications.get()
+            if record is None:
+                return
+            if record['type'] == "console":
+                event = parse_capture(record['payload'], self.captures, time.time())
+                if event is not None:
+                    event.hit_no = self.next_hit_no()
+                    self.count_capture(event.bkpt)
+                    yield event
+            elif record['message'] == "breakpoint-deleted":
+                self.forget_breakpoint(int(record['payload']['id']))
+            elif record['message'] == "breakpoint-modified":
+                bkpt = self.count_hits(record['payload']['bkpt'])
+                if bkpt is None:
+                    continue
+                bkpt.times_handled += 1
+                event = await self.capture(bkpt)
+                event.hit_no = self.next_hit_no()
+                await self.command_many(self.handled_hit_commands(bkpt))
+                yield event
+
+    async def exit(
+        self,
+    ):
+        """
+        Exit gdb and wait for it to terminate
+        """
+        if self.gdb_process is None:
+            return
+        if self.gdb_process.returncode is None:
+            self.gdb_process.stdin.write(b"-gdb-exit\n")
+            await self.gdb_process.stdin.drain()
+            await self.gdb_process.wait()
+        await self.reader
+        self.gdb_process = None
@@ -1,7 +1,13 @@
 """Classes for gdb breakpoints"""
 
 from dataclasses import dataclass, field
-from typing import Callable
+from typing import Callable, List, Union
+
+@dataclass
+class MemoryRange:
+    """Range of memory to capture when a breakpoint is hit"""
+    address: Union[int, str]
+    size: int
 
 @dataclass
 class Breakpoint:
@@ -11,7 +17,21 @@ class Breakpoint:
     on_break: Callable = None
     active: bool = True
     bkpt_no: int = None
+    capture_key: int = None
     stored_information: dict = field(default_factory=lambda : {})
+    registers: List[str] = field(default_factory=lambda : [])
+    memory: List[MemoryRange] = field(default_factory=lambda : [])
+    auto_continue: bool = False
+    temporary: bool = False
+    on_capture: Callable = None
+    on_analysis: Callable = None
+    on_result: Callable = None
+    ignore_count: int = 0
+    sample_every: int = 1
+    max_hits: int = None
+    times_hit: int = 0
+    times_handled: int = 0
+    ignore_remaining: int = 0
 
 @dataclass
 class Watchpoint(Breakpoint):
@@ -0,0 +1,135 @@
+"""Capturing of registers and memory when breakpoints are hit"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from .breakpoint import Breakpoint, MemoryRange
+
+CAPTURE_PREFIX = "pygdbnx-capture"
+
+@dataclass
+class CaptureEvent:
+    """Registers and memory captured from a single breakpoint hit"""
+    bkpt: Breakpoint
+    timestamp: float
+    registers: Dict[str, Union[int, float]] = field(default_factory=lambda : {})
+    memory: List[bytes] = field(default_factory=lambda : [])
+    hit_no: int = None
+
+def is_float_register(
+    register: str,
+) -> bool:
+    """
+    Check if a register is a floating point register
+
+    Args:
+        register (str): Name of register
+
+    Returns:
+        bool: Whether or not the register holds a float
+    """
+    return register != "sp" and (register.startswith("s") or register.startswith("d"))
+
+def range_expression(
+    memory_range: MemoryRange,
+) -> str:
+    """
+    Convert the start of a MemoryRange to a gdb expression
+
+    Args:
+        memory_range (MemoryRange): Range to convert
+
+    Returns:
+        str: gdb expression evaluating to the start of the range
+    """
+    if isinstance(memory_range.address, int):
+        return f"0x{memory_range.address:X}"
+    return f"({memory_range.address})"
+
+def capture_printf(
+    bkpt: Breakpoint,
+) -> Tuple[str, List[str]]:
+    """
+    Build the printf format and arguments that print the captures of a breakpoint as one record
+
+    Memory is printed as little endian 8 byte words where possible to keep the amount
+    of reads the stub has to serve low.
+
+    Args:
+        bkpt (Breakpoint): Breakpoint to build the record for
+
+    Returns:
+        Tuple[str, List[str]]: printf format string and its argument expressions
+    """
+    fmt = f"{CAPTURE_PREFIX}:{bkpt.capture_key}"
+    args = []
+    for register in bkpt.registers:
+        if is_float_register(register):
+            fmt += ":%.17g"
+            args.append(f"${register}.f")
+        else:
+            fmt += ":%lu"
+            args.append(f"${register}")
+    for memory_range in bkpt.memory:
+        fmt += ":"
+        address = range_expression(memory_range)
+        word_end = memory_range.size & ~7
+        for offset in range(0, word_end, 8):
+            fmt += "%016lx"
+            args.append(f"*(unsigned long *)({address} + {offset})")
+        for offset in range(word_end, memory_range.size):
+            fmt += "%02x"
+            args.append(f"*(unsigned char *)({address} + {offset})")
+    return fmt + "\n", args
+
+def decode_memory(
+    contents: str,
+    size: int,
+) -> bytes:
+    """
+    Decode memory printed by a capture record
+
+    Args:
+        contents (str): Hex words and bytes as printed by the capture record
+        size (int): Size of the captured range
+
+    Returns:
+        bytes: Captured memory in memory order
+    """
+    word_end = size & ~7
+    data = bytearray()
+    for offset in range(0, word_end * 2, 16):
+        data += bytes.fromhex(contents[offset:offset + 16])[::-1]
+    data += bytes.fromhex(contents[word_end * 2:])
+    return bytes(data)
+
+def parse_capture(
+    payload: str,
+    breakpoints: Dict[int, Breakpoint],
+    timestamp: float,
+) -> Optional[CaptureEvent]:
+    """
+    Parse a console payload printed by an auto-continue breakpoint
+
+    Args:
+        payload (str): Console payload to parse
+        breakpoints (Dict[int, Breakpoint]): Breakpoints by capture_key
+        timestamp (float): Time the record was received
+
+    Returns:
+        Optional[CaptureEvent]: Parsed capture, None if the payload is not a capture record
+        of a known breakpoint
+    """
+    if not payload.startswith(CAPTURE_PREFIX):
+        return None
+    fields = payload.replace("\\n", "").strip().split(":")
+    bkpt = breakpoints.get(int(fields[1]))
+    if bkpt is None:
+        return None
+    values = fields[2:]
+    event = CaptureEvent(bkpt, timestamp)
+    for register, value in zip(bkpt.registers, values):
+        event.registers[register] = float(value) if is_float_register(register) else int(value)
+    for memory_range, value in zip(bkpt.memory, values[len(bkpt.registers):]):
+        event.memory.append(decode_memory(value, memory_range.size))
+    return event
@@ -0,0 +1,455 @@
+"""Columnar on-disk storage of captured breakpoint data"""
+
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+from .capture import CaptureEvent, is_float_register
+from .events import EventBus, Subscription
+from .logs import storage_logger
+
+BACKENDS = ("arrow", "npy")
+
+def table_name(
+    bkpt_name: str,
+) -> str:
+    """
+    Directory name of the table of a breakpoint
+
+    Args:
+        bkpt_name (str): Name of the breakpoint
+
+    Returns:
+        str: Breakpoint name with anything unsafe in file names replaced
+    """
+    return re.sub(r"[^\w.-]", "_", bkpt_name)
+
+def chunk_paths(
+    directory: str,
+    bkpt_name: str,
+) -> List[str]:
+    """
+    List the written chunks of the table of a breakpoint
+
+    Args:
+        directory (str): Directory of the store
+        bkpt_name (str): Name of the breakpoint
+
+    Returns:
+        List[str]: Paths of the chunks, in the order they were written
+    """
+    table = os.path.join(directory, table_name(bkpt_name))
+    if not os.path.isdir(table):
+        return []
+    return [
+        os.path.join(table, entry) for entry in sorted(os.listdir(table))
+        if entry.startswith("chunk-") and not entry.endswith(".tmp")
+    ]
+
+def arrow_to_numpy(
+    array,
+) -> np.ndarray:
+    """
+    View an arrow array as a numpy array, without copying where possible
+
+    Args:
+        array (pyarrow.Array): Array to view
+
+    Returns:
+        np.ndarray: Equivalent numpy array
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if pa.types.is_fixed_size_binary(array.type):
+        width = array.type.byte_width
+        return np.frombuffer(array.buffers()[1], dtype = np.dtype((np.void, width)),
+                             count = len(array), offset = array.offset * width)
+    if pa.types.is_fixed_size_list(array.type):
+        return arrow_to_numpy(array.flatten()).reshape(len(array), array.type.list_size)
+    return array.to_numpy(zero_copy_only = False)
+
+def numpy_to_arrow(
+    column: np.ndarray,
+):
+    """
+    Convert a column to an arrow array
+
+    Args:
+        column (np.ndarray): Column to convert
+
+    Returns:
+        pyarrow.Array: Equivalent arrow array
+    """
+    if column.dtype.kind == "V":
+        return pa.FixedSizeBinaryArray.from_buffers(
+            pa.binary(column.dtype.itemsize), len(column),
+            [None, pa.py_buffer(np.ascontiguousarray(column).tobytes())]
+        )
+    if column.ndim > 1:
+        width = int(np.prod(column.shape[1:]))
+        return pa.FixedSizeListArray.from_arrays(
+            numpy_to_arrow(np.ascontiguousarray(column).reshape(-1)), width
+        )
+    return pa.array(column)
+
+def read_chunks(
+    directory: str,
+    bkpt_name: str,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Iterate over the chunks of the table of a breakpoint, memory-mapped instead of read
+
+    Args:
+        directory (str): Directory of the store
+        bkpt_name (str): Name of the breakpoint
+
+    Yields:
+        Dict[str, np.ndarray]: Columns of each chunk by name
+    """
+    for path in chunk_paths(directory, bkpt_name):
+        if path.endswith(".arrow"):
+            if pa is None:
+                raise ImportError(f"pyarrow is required to read {path}")
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            yield {name: arrow_to_numpy(table.column(name)) for name in table.column_names}
+        else:
+            yield {
+                entry[:-len(".npy")]: np.load(os.path.join(path, entry), mmap_mode = "r")
+                for entry in sorted(os.listdir(path)) if entry.endswith(".npy")
+            }
+
+def read_columns(
+    directory: str,
+    bkpt_name: str,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Read the whole table of a breakpoint
+
+    Args:
+        directory (str): Directory of the store
+        bkpt_name (str): Name of the breakpoint
+        columns (Optional[List[str]], optional): Columns to read, None for every column.
+        Defaults to None
+
+    Returns:
+        Dict[str, np.ndarray]: Columns by name, concatenated over every chunk
+    """
+    parts: Dict[str, List[np.ndarray]] = {}
+    for chunk in read_chunks(directory, bkpt_name):
+        for name, column in chunk.items():
+            if columns is None or name in columns:
+                parts.setdefault(name, []).append(column)
+    return {name: np.concatenate(part) for name, part in parts.items()}
+
+class ColumnarSink:
+    """Appends captured breakpoint data to a table per breakpoint, written in chunks by a thread"""
+    def __init__(
+        self,
+        directory: str,
+        chunk_rows: int = 65536,
+        flush_interval: float = 5.0,
+        struct_dtypes: Optional[Dict[str, List[Optional[np.dtype]]]] = None,
+        backend: Optional[str] = None,
+        max_pending_rows: int = 1 << 20,
+    ):
+        """
+        Open a store and start its flushing thread
+
+        Every table has a "timestamp" column, a column per captured register and a column per
+        captured memory range named "memory0", "memory1" and so on. Memory ranges given a
+        structured dtype are split into a column per field instead, e.g. "memory0.species"
+
+        Args:
+            directory (str): Directory to store the tables in
+            chunk_rows (int, optional): Rows of a table to collect before writing them as a
+            chunk. Defaults to 65536
+            flush_interval (float, optional): Maximum seconds a row waits before being
+            written in a smaller chunk. Defaults to 5.0
+            struct_dtypes (Optional[Dict[str, List[Optional[np.dtype]]]], optional): numpy
+            structured dtype of each memory range by breakpoint name, None for ranges stored
+            as raw bytes. Defaults to None
+            backend (Optional[str], optional): "arrow" to write Arrow IPC files, "npy" to write
+            a .npy file per column. Defaults to "arrow" if pyarrow is installed, else "npy"
+            max_pending_rows (int, optional): Rows of all tables to queue at most, put blocks
+            until the flushing thread caught up once it is reached. Defaults to 1 << 20
+        """
+        if backend is None:
+            backend = "npy" if pa is None else "arrow"
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}")
+        if backend == "arrow" and pa is None:
+            raise ImportError("pyarrow is required for the arrow backend")
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.struct_dtypes: Dict[str, List[Optional[np.dtype]]] = {
+            name: [None if dtype is None else self.struct_dtype(dtype) for dtype in dtypes]
+            for name, dtypes in ({} if struct_dtypes is None else struct_dtypes).items()
+        }
+        self.mismatched: Set[Tuple[str, int]] = set()
+        self.backend = backend
+        self.max_pending_rows = max_pending_rows
+        self.pending: Dict[str, List[CaptureEvent]] = {}
+        self.pending_rows = 0
+        self.pending_since: Dict[str, float] = {}
+        self.next_chunk: Dict[str, int] = {}
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+        self.flusher = threading.Thread(target = self.flush_loop, daemon = True)
+        self.flusher.start()
+
+    @staticmethod
+    def struct_dtype(
+        dtype,
+    ) -> np.dtype:
+        """
+        Check that a memory range can be split into columns by a dtype
+
+        Args:
+            dtype (Any): Anything np.dtype accepts
+
+        Returns:
+            np.dtype: The structured dtype
+        """
+        try:
+            dtype = np.dtype(dtype)
+        except TypeError as error:
+            raise ValueError(f"Invalid struct dtype {dtype!r}") from error
+        if dtype.names is None:
+            raise ValueError(f"{dtype} is not a structured dtype")
+        return dtype
+
+    def put(
+        self,
+        event: CaptureEvent,
+    ):
+        """
+        Queue the row of a captured event, waiting while max_pending_rows rows are queued
+
+        Args:
+            event (CaptureEvent): Event to store
+        """
+        with self.condition:
+            while self.pending_rows >= self.max_pending_rows and not self.closed:
+                self.condition.notify_all()
+                self.condition.wait()
+            name = event.bkpt.name
+            rows = self.pending.setdefault(name, [])
+            if not rows:
+                self.pending_since[name] = time.monotonic()
+            rows.append(event)
+            self.pending_rows += 1
+            if len(rows) >= self.chunk_rows:
+                self.condition.notify_all()
+
+    def subscribe(
+        self,
+        events: EventBus,
+        maxsize: int = 65536,
+    ) -> Subscription:
+        """
+        Store every event published by a session
+
+        Args:
+            events (EventBus): Event bus of the session, e.g. GdbProcess.events
+            maxsize (int, optional): Maximum amount of events queued for the sink, the
+            session blocks instead of dropping events once it is reached. Defaults to 65536
+
+        Returns:
+            Subscription: Subscription feeding the sink
+        """
+        return events.subscribe(self.put, maxsize, "block")
+
+    def flush_loop(
+        self,
+    ):
+        """
+        Write chunks of tables that are full or waited for flush_interval until closed
+        """
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                full = self.pending_rows >= self.max_pending_rows
+                due = [
+                    name for name, rows in self.pending.items()
+                    if rows and (full or len(rows) >= self.chunk_rows
+                                 or now - self.pending_since[name] >= self.flush_interval)
+                ]
+                if not due:
+                    if self.closed:
+                        return
+                    self.condition.wait(self.flush_interval / 4)
+                    continue
+                batches = {name: self.take(name) for name in due}
+            for name, rows in batches.items():
+                self.write_safely(name, rows)
+
+    def take(
+        self,
+        name: str,
+    ) -> List[CaptureEvent]:
+        """
+        Take up to chunk_rows pending rows of a table, called with the condition held
+
+        Args:
+            name (str): Name of the breakpoint of the table
+
+        Returns:
+            List[CaptureEvent]: Rows taken
+        """
+        rows = self.pending[name]
+        taken, self.pending[name] = rows[:self.chunk_rows], rows[self.chunk_rows:]
+        self.pending_since[name] = time.monotonic()
+        self.pending_rows -= len(taken)
+        self.condition.notify_all()
+        return taken
+
+    def flush(
+        self,
+    ):
+        """
+        Write every pending row now
+        """
+        with self.condition:
+            batches = []
+            for name in list(self.pending):
+                while self.pending[name]:
+                    batches.append((name, self.take(name)))
+        for name, rows in batches:
+            self.write_safely(name, rows)
+
+    def close(
+        self,
+    ):
+        """
+        Write every pending row and stop the flushing thread
+        """
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.flusher.join()
+
+    def columns(
+        self,
+        rows: List[CaptureEvent],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Convert rows of a table to columns
+
+        Args:
+            rows (List[CaptureEvent]): Events of the same breakpoint
+
+        Returns:
+            Dict[str, np.ndarray]: Columns by name
+        """
+        bkpt = rows[0].bkpt
+        columns = {'timestamp': np.fromiter((event.timestamp for event in rows),
+                                            dtype = np.float64, count = len(rows))}
+        for register in bkpt.registers:
+            if is_float_register(register):
+                dtype, default = np.float64, np.nan
+            else:
+                # registers are captured unsigned, so pointers and negative values overflow int64
+                dtype, default = np.uint64, 0
+            columns[register] = np.fromiter(
+                (event.registers.get(register, default) for event in rows),
+                dtype = dtype, count = len(rows)
+            )
+        struct_dtypes = self.struct_dtypes.get(bkpt.name, [])
+        for i, memory_range in enumerate(bkpt.memory):
+            missing = bytes(memory_range.size)
+            data = b"".join(
+                event.memory[i] if i < len(event.memory) else missing for event in rows
+            )
+            dtype = struct_dtypes[i] if i < len(struct_dtypes) else None
+            if dtype is not None and dtype.itemsize != memory_range.size:
+                if (bkpt.name, i) not in self.mismatched:
+                    self.mismatched.add((bkpt.name, i))
+                    storage_logger.warning("Struct dtype of memory%d of \"%s\" is %d bytes but "
+                                           "the range is %d bytes, storing it as raw bytes",
+                                           i, bkpt.name, dtype.itemsize, memory_range.size)
+                dtype = None
+            if dtype is None:
+                columns[f"memory{i}"] = np.frombuffer(
+                    data, dtype = np.dtype((np.void, memory_range.size))
+                )
+                continue
+            records = np.frombuffer(data, dtype = dtype)
+            for field in dtype.names:
+                columns[f"memory{i}.{field}"] = np.ascontiguousarray(records[field])
+        return columns
+
+    def write_safely(
+        self,
+        name: str,
+        rows: List[CaptureEvent],
+    ):
+        """
+        Write rows of a table as a new chunk, logging and counting them as dropped on failure
+        so the flushing thread keeps running
+
+        Args:
+            name (str): Name of the breakpoint of the table
+            rows (List[CaptureEvent]): Rows to write
+        """
+        try:
+            self.write_rows(name, rows)
+        except Exception: # pylint: disable=broad-except
+            with self.condition:
+                self.rows_dropped += len(rows)
+            storage_logger.exception("Dropped %d rows of \"%s\" that failed to be written",
+                                     len(rows), name)
+
+    def write_rows(
+        self,
+        name: str,
+        rows: List[CaptureEvent],
+    ):
+        """
+        Write rows of a table as a new chunk
+
+        Args:
+            name (str): Name of the breakpoint of the table
+            rows (List[CaptureEvent]): Rows to write
+        """
+        columns = self.columns(rows)
+        with self.write_lock:
+            table = os.path.join(self.directory, table_name(name))
+            if name not in self.next_chunk:
+                os.makedirs(table, exist_ok = True)
+                self.next_chunk[name] = len(chunk_paths(self.directory, name))
+            path = os.path.join(table, f"chunk-{self.next_chunk[name]:06d}")
+            self.next_chunk[name] += 1
+            if self.backend == "arrow":
+                path += ".arrow"
+                batch = pa.record_batch(
+                    [numpy_to_arrow(column) for column in columns.values()],
+                    names = list(columns)
+                )
+                with pa.OSFile(f"{path}.tmp", "wb") as sink:
+                    with pa.ipc.new_file(sink, batch.schema) as writer:
+                        writer.write_batch(batch)
+            else:
+                shutil.rmtree(f"{path}.tmp", ignore_errors = True)
+                os.makedirs(f"{path}.tmp")
+                for column_name, column in columns.items():
+                    np.save(os.path.join(f"{path}.tmp", f"{column_name}.npy"), column)
+            # readers never see a chunk that is only partly written
+            os.replace(f"{path}.tmp", path)
+            self.rows_written += len(rows)
@@ -0,0 +1,132 @@
+"""Coverage of code addresses using one-shot breakpoints"""
+
+from typing import Iterable
+import numpy as np
+
+from .breakpoint import Breakpoint
+from .capture import CaptureEvent
+
+class Coverage:
+    """Hit bitmap of code addresses in main filled in by one-shot auto-continue breakpoints"""
+    def __init__(
+        self,
+        addresses: Iterable[int],
+        name: str = "Coverage",
+    ):
+        """
+        Create one-shot breakpoints for a list of basic block or function addresses
+
+        Every breakpoint is deleted by gdb on its first hit and continues through its
+        breakpoint commands, so the overhead decays to zero as more of the addresses are covered
+
+        Args:
+            addresses (Iterable[int]): Addresses in main to cover, in the same form
+            as Breakpoint addresses (e.g. 0x7100D317BC)
+            name (str, optional): Name prefix of the created breakpoints. Defaults to "Coverage"
+        """
+        self.addresses: np.ndarray = np.unique(np.fromiter(addresses, dtype = np.uint64))
+        self.hits: np.ndarray = np.zeros(len(self.addresses), dtype = bool)
+        self.breakpoints = [
+            Breakpoint(
+                int(address),
+                f"{name} 0x{int(address):X}",
+                auto_continue = True,
+                temporary = True,
+                on_capture = self.on_capture,
+                stored_information = {'coverage_index': index},
+            )
+            for index, address in enumerate(self.addresses)
+        ]
+
+    def install(
+        self,
+        gdbprocess,
+    ):
+        """
+        Install the coverage breakpoints
+
+        Args:
+            gdbprocess (GdbProcess): Process to install the breakpoints in
+        """
+        gdbprocess.add_breakpoints(self.breakpoints)
+
+    def remove(
+        self,
+        gdbprocess,
+    ):
+        """
+        Delete the coverage breakpoints that were not hit yet
+
+        Args:
+            gdbprocess (GdbProcess): Process the breakpoints were installed in
+        """
+        gdbprocess.delete_many([bkpt for bkpt in self.breakpoints if bkpt.active])
+
+    def on_capture(
+        self,
+        gdbprocess,
+        bkpt: Breakpoint,
+        event: CaptureEvent,
+    ):
+        """
+        Mark the address of a hit coverage breakpoint
+
+        Args:
+            gdbprocess (GdbProcess): Process the breakpoint belongs to
+            bkpt (Breakpoint): Breakpoint that was hit
+            event (CaptureEvent): Capture of the hit
+        """
+        self.hits[bkpt.stored_information['coverage_index']] = True
+        bkpt.active = False
+
+    def __getitem__(
+        self,
+        address: int,
+    ) -> bool:
+        """
+        Check if an address was hit
+
+        Args:
+            address (int): Covered address
+
+        Returns:
+            bool: Whether or not the address was hit
+        """
+        index = np.searchsorted(self.addresses, address)
+        if index == len(self.addresses) or self.addresses[index] != address:
+            raise KeyError(f"0x{address:X} is not a covered address")
+        return bool(self.hits[index])
+
+    def hit_addresses(
+        self,
+    ) -> np.ndarray:
+        """
+        Addresses that were hit
+
+        Returns:
+            np.ndarray: Sorted hit addresses
+        """
+        return self.addresses[self.hits]
+
+    def ratio(
+        self,
+    ) -> float:
+        """
+        Fraction of the addresses that were hit
+
+        Returns:
+            float: Fraction of hit addresses
+        """
+        return float(self.hits.mean()) if len(self.hits) else 0.0
+
+    def save(
+        self,
+        path: str,
+    ):
+        """
+        Save the addresses and hit bitmap to a .npz file
+
+        Args:
+            path (str): Path to save to
+        """
+        np.savez_compressed(path, addresses = self.addresses, hits = self.hits)
@@ -0,0 +1,623 @@
+"""Long-lived daemon sharing one attached gdb session with short-lived scripts"""
+
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from .breakpoint import Breakpoint, MemoryRange, Watchpoint
+from .capture import CaptureEvent
+from .exceptions import DaemonException
+from .gdbprocess import GdbProcess
+from .logs import daemon_logger
+
+DEFAULT_PORT = 22226
+BREAKPOINT_FIELDS = ("address", "name", "registers", "auto_continue", "temporary",
+                     "ignore_count", "sample_every", "max_hits")
+
+Address = Union[str, Tuple[str, int]]
+
+def default_address(
+    ip_address: str,
+) -> Address:
+    """
+    Address the daemon of a console listens on by default
+
+    Args:
+        ip_address (str): Local IP address of the Nintendo Switch console
+
+    Returns:
+        Address: Path of a Unix socket, or (host, port) of a local TCP socket where
+        Unix sockets are not available
+    """
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.gettempdir(), f"pygdbnx-{ip_address}.sock")
+    return ("127.0.0.1", DEFAULT_PORT)
+
+def breakpoint_from_spec(
+    spec: dict,
+) -> Breakpoint:
+    """
+    Build a breakpoint from its json description
+
+    Args:
+        spec (dict): Fields of the breakpoint, with memory as a list of [address, size]
+        and watch_type set for watchpoints
+
+    Returns:
+        Breakpoint: The described breakpoint
+    """
+    fields = {key: spec[key] for key in BREAKPOINT_FIELDS if key in spec}
+    fields['memory'] = [MemoryRange(address, size) for address, size in spec.get('memory', [])]
+    if "watch_type" in spec:
+        return Watchpoint(watch_type = spec['watch_type'], **fields)
+    return Breakpoint(**fields)
+
+def breakpoint_to_json(
+    bkpt: Breakpoint,
+) -> dict:
+    """
+    Describe the state of a breakpoint as json
+
+    Args:
+        bkpt (Breakpoint): Breakpoint to describe
+
+    Returns:
+        dict: State of the breakpoint
+    """
+    return {
+        'bkpt_no': bkpt.bkpt_no,
+        'name': bkpt.name,
+        'address': bkpt.address,
+        'active': bkpt.active,
+        'times_hit': bkpt.times_hit,
+        'times_handled': bkpt.times_handled,
+    }
+
+def event_to_json(
+    event: CaptureEvent,
+) -> dict:
+    """
+    Describe a capture event as json
+
+    Args:
+        event (CaptureEvent): Event to describe
+
+    Returns:
+        dict: The event, with memory as hex strings
+    """
+    return {
+        'hit_no': event.hit_no,
+        'bkpt_no': event.bkpt.bkpt_no,
+        'name': event.bkpt.name,
+        'timestamp': event.timestamp,
+        'registers': event.registers,
+        'memory': [memory.hex() for memory in event.memory],
+    }
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves json-lines requests of one client connection"""
+    def handle(
+        self,
+    ):
+        session_daemon: SessionDaemon = self.server.session_daemon
+        for line in self.rfile:
+            request = json.loads(line)
+            if request.get('method') == "subscribe":
+                session_daemon.stream_events(self.wfile, **request.get('params', {}))
+                return
+            self.wfile.write(json.dumps(session_daemon.handle(request)).encode() + b"\n")
+
+class SessionDaemon:
+    """Keeps one attached GdbProcess and serves it to short-lived clients over a local socket
+
+    Requests are json lines of the form {"id": 1, "method": "read_memory", "params": {...}},
+    answered with {"id": 1, "result": ...} or {"id": 1, "error": "..."}. Requests of all
+    clients are serialized, and while the target runs breakpoints are handled between them.
+    gdb runs with mi-async on, and requests that need a halted target interrupt it and
+    resume it once they are done.
+    """
+    # requests that need neither gdb nor a halted target
+    RUNNING_METHODS = ("bases", "breakpoints", "resume", "interrupt")
+    def __init__(
+        self,
+        gdbprocess: GdbProcess,
+        address: Optional[Address] = None,
+        poll_interval: float = 0.05,
+    ):
+        """
+        Create a daemon for an attached gdb process
+
+        Args:
+            gdbprocess (GdbProcess): Attached gdb process to share
+            address (Optional[Address], optional): Unix socket path or (host, port) to listen on.
+            Defaults to default_address(gdbprocess.ip_address)
+            poll_interval (float, optional): Seconds to wait for gdb output at a time before
+            checking for queued requests. Defaults to 0.05
+        """
+        self.gdbprocess = gdbprocess
+        self.address = address if address is not None else default_address(gdbprocess.ip_address)
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.waiting_lock = threading.Lock()
+        self.running = False
+        self.stopped = threading.Event()
+        self.server: Optional[socketserver.BaseServer] = None
+
+    def serve_forever(
+        self,
+    ):
+        """
+        Listen for clients and handle breakpoints until shutdown is called
+        """
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            # pylint: disable=no-member
+            self.server = socketserver.ThreadingUnixStreamServer(self.address, _RequestHandler)
+        else:
+            self.server = socketserver.ThreadingTCPServer(self.address, _RequestHandler)
+        self.server.daemon_threads = True
+        self.server.session_daemon = self
+        self.gdbprocess.set_async_execution()
+        threading.Thread(target = self.run_target, daemon = True).start()
+        daemon_logger.info("Serving session with %s on %s", self.gdbprocess.ip_address,
+                           self.address)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def shutdown(
+        self,
+    ):
+        """
+        Stop serving clients
+        """
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+
+    def run_target(
+        self,
+    ):
+        """
+        Handle breakpoints while the target runs, one stop at a time so queued requests
+        get in between
+        """
+        while not self.stopped.is_set():
+            if not self.running or self.waiting:
+                self.stopped.wait(self.poll_interval)
+                continue
+            with self.lock:
+                if self.running and not self.waiting:
+                    self.gdbprocess.handle_next_break(self.poll_interval)
+                    self.gdbprocess.check_throttle()
+
+    def handle(
+        self,
+        request: dict,
+    ) -> dict:
+        """
+        Handle a single request
+
+        Args:
+            request (dict): Decoded json request
+
+        Returns:
+            dict: Response to send back
+        """
+        handler = getattr(self, f"rpc_{request.get('method')}", None)
+        if handler is None:
+            return {'id': request.get('id'), 'error': f"Unknown method {request.get('method')}"}
+        try:
+            with self.waiting_lock:
+                self.waiting += 1
+            with self.lock:
+                with self.waiting_lock:
+                    self.waiting -= 1
+                paused = self.running and request.get('method') not in self.RUNNING_METHODS
+                if paused:
+                    self.gdbprocess.interrupt()
+                try:
+                    return {'id': request.get('id'), 'result': handler(**request.get('params', {}))}
+                finally:
+                    if paused and self.running:
+                        self.gdbprocess.resume_execution()
+        except Exception as exception: # pylint: disable=broad-except
+            return {'id': request.get('id'), 'error': f"{type(exception).__name__}: {exception}"}
+
+    def stream_events(
+        self,
+        wfile,
+        maxsize: int = 1024,
+        policy: str = "drop_oldest",
+    ):
+        """
+        Send every published event to a client until it disconnects
+
+        Args:
+            wfile (BinaryIO): Stream of the client connection
+            maxsize (int, optional): Maximum amount of events queued for the client.
+            Defaults to 1024
+            policy (str, optional): Backpressure policy, see Subscription. Defaults to "drop_oldest"
+        """
+        subscription = self.gdbprocess.events.subscribe(maxsize = maxsize, policy = policy)
+        try:
+            while not self.stopped.is_set():
+                event = subscription.get(timeout = 1.0)
+                line = b"\n" if event is None else json.dumps(event_to_json(event)).encode() + b"\n"
+                wfile.write(line)
+        except OSError:
+            pass
+        finally:
+            self.gdbprocess.events.unsubscribe(subscription)
+
+    def rpc_bases(
+        self,
+    ) -> dict:
+        """Base addresses of the attached process"""
+        return {
+            'main_base': self.gdbprocess.main_base,
+            'main_max': self.gdbprocess.main_max,
+            'heap_base': self.gdbprocess.heap_base,
+            'heap_max': self.gdbprocess.heap_max,
+            'stack_base': self.gdbprocess.stack_base,
+            'stack_max': self.gdbprocess.stack_max,
+        }
+
+    def rpc_read_memory(
+        self,
+        address: int,
+        size: int,
+    ) -> str:
+        """Read memory as a hex string"""
+        return self.gdbprocess.read_memory(address, size).hex()
+
+    def rpc_read_int(
+        self,
+        address: int,
+        size: str = "g",
+    ) -> int:
+        """Read an integer"""
+        return self.gdbprocess.read_int(address, size)
+
+    def rpc_write_int(
+        self,
+        address: int,
+        value: int,
+        size: str = "g",
+    ):
+        """Write an integer"""
+        self.gdbprocess.write_int(address, value, size)
+
+    def rpc_read_register(
+        self,
+        register: str,
+    ) -> Union[int, float]:
+        """Read a register"""
+        return self.gdbprocess.read_register(register)
+
+    def rpc_write_register(
+        self,
+        register: str,
+        value: Union[int, float],
+        type_string: str = "int",
+    ):
+        """Write a register"""
+        self.gdbprocess.write_register(register, value, type_string)
+
+    def rpc_evaluate(
+        self,
+        expression: str,
+    ) -> int:
+        """Evaluate a gdb expression"""
+        return self.gdbprocess.evaluate(expression)
+
+    def rpc_add_breakpoints(
+        self,
+        specs: List[dict],
+    ) -> List[int]:
+        """Add breakpoints described as json, returning their numbers"""
+        bkpts = [breakpoint_from_spec(spec) for spec in specs]
+        self.gdbprocess.add_breakpoints(bkpts)
+        return [bkpt.bkpt_no for bkpt in bkpts]
+
+    def rpc_breakpoints(
+        self,
+    ) -> List[dict]:
+        """State of every breakpoint added so far"""
+        return [breakpoint_to_json(bkpt) for bkpt in self.gdbprocess.active_breakpoints]
+
+    def lookup(
+        self,
+        bkpt_nos: List[int],
+    ) -> List[Breakpoint]:
+        """
+        Look up breakpoints by number
+
+        Args:
+            bkpt_nos (List[int]): Numbers of the breakpoints
+
+        Returns:
+            List[Breakpoint]: The breakpoints
+        """
+        breakpoints_by_no = self.gdbprocess.breakpoints_by_no
+        unknown = [bkpt_no for bkpt_no in bkpt_nos if bkpt_no not in breakpoints_by_no]
+        if unknown:
+            raise ValueError(f"No breakpoints numbered {unknown}")
+        return [breakpoints_by_no[bkpt_no] for bkpt_no in bkpt_nos]
+
+    def rpc_enable(
+        self,
+        bkpt_nos: List[int],
+    ):
+        """Enable breakpoints by number"""
+        self.gdbprocess.enable_many(self.lookup(bkpt_nos))
+
+    def rpc_disable(
+        self,
+        bkpt_nos: List[int],
+    ):
+        """Disable breakpoints by number"""
+        self.gdbprocess.disable_many(self.lookup(bkpt_nos))
+
+    def rpc_delete(
+        self,
+        bkpt_nos: List[int],
+    ):
+        """Delete breakpoints by number"""
+        self.gdbprocess.delete_many(self.lookup(bkpt_nos))
+
+    def rpc_resume(
+        self,
+    ):
+        """Resume the target and start handling breakpoints"""
+        if not self.running:
+            self.gdbprocess.resume_execution()
+            self.running = True
+
+    def rpc_interrupt(
+        self,
+    ):
+        """Halt the target"""
+        if self.running:
+            self.running = False
+            self.gdbprocess.interrupt()
+
+class DaemonClient:
+    """Client of a SessionDaemon"""
+    def __init__(
+        self,
+        address: Optional[Address] = None,
+        ip_address: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Connect to a session daemon
+
+        Args:
+            address (Optional[Address], optional): Unix socket path or (host, port) of the daemon.
+            Defaults to default_address(ip_address)
+            ip_address (Optional[str], optional): Local IP address of the console the daemon
+            is attached to, used to find its default address. Defaults to None
+            timeout (Optional[float], optional): Socket timeout in seconds. Defaults to None
+        """
+        if address is None:
+            if ip_address is None:
+                raise ValueError("Either address or ip_address of the daemon is needed")
+            address = default_address(ip_address)
+        self.address = address
+        self.timeout = timeout
+        self.next_id = 1
+        self.socket = self.open()
+        self.rfile = self.socket.makefile("rb")
+
+    def open(
+        self,
+    ) -> socket.socket:
+        """
+        Open a new connection to the daemon
+
+        Returns:
+            socket.socket: The connected socket
+        """
+        if isinstance(self.address, str):
+            # pylint: disable=no-member
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        connection.connect(self.address)
+        return connection
+
+    def call(
+        self,
+        method: str,
+        **params,
+    ) -> Any:
+        """
+        Call a method of the daemon
+
+        Args:
+            method (str): Name of the method
+            **params: Parameters of the method
+
+        Returns:
+            Any: Result of the method
+        """
+        request_id = self.next_id
+        self.next_id += 1
+        self.socket.sendall(
+            json.dumps({'id': request_id, 'method': method, 'params': params}).encode() + b"\n"
+        )
+        line = self.rfile.readline()
+        if not line:
+            raise DaemonException("Daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonException(response['error'])
+        return response['result']
+
+    def bases(
+        self,
+    ) -> Dict[str, int]:
+        """
+        Read the base addresses of the attached process
+
+        Returns:
+            Dict[str, int]: main/heap/stack bases and maximums
+        """
+        return self.call("bases")
+
+    def read_memory(
+        self,
+        address: int,
+        size: int,
+    ) -> bytes:
+        """
+        Read a range of memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+
+        Returns:
+            bytes: Bytes read from address
+        """
+        return bytes.fromhex(self.call("read_memory", address = address, size = size))
+
+    def read_int(
+        self,
+        address: int,
+        size: str = "g",
+    ) -> int:
+        """
+        Read an integer
+
+        Args:
+            address (int): Address to read from
+            size (str, optional): GDB size of int to read. Defaults to "g"
+
+        Returns:
+            int: Integer read from address
+        """
+        return self.call("read_int", address = address, size = size)
+
+    def write_int(
+        self,
+        address: int,
+        value: int,
+        size: str = "g",
+    ):
+        """
+        Write an integer
+
+        Args:
+            address (int): Address to write to
+            value (int): Value to write to memory
+            size (str, optional): GDB size of int to write. Defaults to "g"
+        """
+        self.call("write_int", address = address, value = value, size = size)
+
+    def read_register(
+        self,
+        register: str,
+    ) -> Union[int, float]:
+        """
+        Read a register
+
+        Args:
+            register (str): Register to read from
+
+        Returns:
+            Union[int, float]: Value read from register
+        """
+        return self.call("read_register", register = register)
+
+    def evaluate(
+        self,
+        expression: str,
+    ) -> int:
+        """
+        Evaluate a gdb expression as an integer
+
+        Args:
+            expression (str): Expression to evaluate (e.g. "$sp + 0x18")
+
+        Returns:
+            int: Value of the expression
+        """
+        return self.call("evaluate", expression = expression)
+
+    def add_breakpoints(
+        self,
+        specs: List[dict],
+    ) -> List[int]:
+        """
+        Add breakpoints to the shared session
+
+        Args:
+            specs (List[dict]): Breakpoints as json, see breakpoint_from_spec
+
+        Returns:
+            List[int]: Numbers of the added breakpoints
+        """
+        return self.call("add_breakpoints", specs = specs)
+
+    def resume(
+        self,
+    ):
+        """
+        Resume the target
+        """
+        self.call("resume")
+
+    def interrupt(
+        self,
+    ):
+        """
+        Halt the target
+        """
+        self.call("interrupt")
+
+    def events(
+        self,
+        maxsize: int = 1024,
+        policy: str = "drop_oldest",
+    ) -> Iterator[dict]:
+        """
+        Iterate over the events published by the daemon on a connection of its own
+
+        Args:
+            maxsize (int, optional): Maximum amount of events queued by the daemon. Defaults to 1024
+            policy (str, optional): Backpressure policy, see Subscription. Defaults to "drop_oldest"
+
+        Yields:
+            dict: Events as produced by event_to_json
+        """
+        connection = self.open()
+        connection.settimeout(None)
+        connection.sendall(json.dumps({
+            'method': "subscribe",
+            'params': {'maxsize': maxsize, 'policy': policy},
+        }).encode() + b"\n")
+        with connection, connection.makefile("rb") as rfile:
+            for line in rfile:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(
+        self,
+    ):
+        """
+        Close the connection to the daemon
+        """
+        self.rfile.close()
+        self.socket.close()
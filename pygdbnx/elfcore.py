@@ -0,0 +1,121 @@
+"""Streaming writer of AArch64 ELF core files readable by stock gdb"""
+
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+ELF_HEADER = struct.Struct("<16sHHIQQQIHHHHHH")
+PROGRAM_HEADER = struct.Struct("<IIQQQQQQ")
+NOTE_HEADER = struct.Struct("<III")
+ET_CORE = 4
+EM_AARCH64 = 183
+PT_LOAD = 1
+PT_NOTE = 4
+PF_RWX = 7
+NT_PRSTATUS = 1
+PAGE_SIZE = 0x1000
+# x0-x30, sp, pc and pstate in the order of elf_gregset_t
+GREGS = [f"x{i}" for i in range(31)] + ["sp", "pc", "cpsr"]
+
+def prstatus(
+    registers: Dict[str, int],
+    process_id: Optional[int] = None,
+) -> bytes:
+    """
+    Build the NT_PRSTATUS note of a halted thread
+
+    Args:
+        registers (Dict[str, int]): Register values by gdb name, missing ones are written as 0
+        process_id (Optional[int], optional): Process id to record. Defaults to None
+
+    Returns:
+        bytes: The note, header and name included
+    """
+    pid = process_id or 0
+    # signal info, current signal, pending and held signals, pid, ppid, pgrp, sid and times
+    desc = struct.pack("<iiih2xQQiiii64x", 5, 0, 0, 5, 0, 0, pid, 0, pid, pid)
+    desc += struct.pack("<34Q", *(registers.get(name, 0) & (1 << 64) - 1 for name in GREGS))
+    # no floating point registers follow
+    desc += struct.pack("<i4x", 0)
+    name = b"CORE\0\0\0\0"
+    return NOTE_HEADER.pack(5, len(desc), NT_PRSTATUS) + name + desc
+
+class CoreWriter:
+    """Streams memory to a core file, placing the program headers after the memory"""
+    def __init__(
+        self,
+        path: str,
+        registers: Dict[str, int],
+        process_id: Optional[int] = None,
+    ):
+        """
+        Start writing a core file, which only appears at path once finished
+
+        Args:
+            path (str): File to write the core to
+            registers (Dict[str, int]): Registers of the halted thread by gdb name
+            process_id (Optional[int], optional): Process id to record. Defaults to None
+        """
+        self.path = path
+        self.file = open(f"{path}.tmp", "wb")
+        note = prstatus(registers, process_id)
+        self.file.write(bytes(ELF_HEADER.size))
+        self.note = (ELF_HEADER.size, len(note))
+        self.file.write(note)
+        self.offset = ELF_HEADER.size + len(note)
+        # address, offset and size of every load segment
+        self.segments: List[Tuple[int, int, int]] = []
+
+    def add(
+        self,
+        address: int,
+        data: bytes,
+    ):
+        """
+        Append memory read from the process, merged with the previous memory if contiguous
+
+        Args:
+            address (int): Address the memory was read at
+            data (bytes): Memory read
+        """
+        last_address, last_offset, last_size = self.segments[-1] if self.segments else (0, 0, 0)
+        if self.segments and last_address + last_size == address:
+            self.segments[-1] = (last_address, last_offset, last_size + len(data))
+        else:
+            # keep segments page aligned in the file like the kernel does
+            padding = -self.offset % PAGE_SIZE
+            self.file.write(bytes(padding))
+            self.offset += padding
+            self.segments.append((address, self.offset, len(data)))
+        self.file.write(data)
+        self.offset += len(data)
+
+    def finish(
+        self,
+    ):
+        """
+        Write the program headers and ELF header and move the core into place
+        """
+        padding = -self.offset % 8
+        self.file.write(bytes(padding))
+        program_header_offset = self.offset + padding
+        self.file.write(PROGRAM_HEADER.pack(PT_NOTE, 0, self.note[0], 0, 0, self.note[1], 0, 4))
+        for address, offset, size in self.segments:
+            self.file.write(PROGRAM_HEADER.pack(PT_LOAD, PF_RWX, offset, address, 0, size, size,
+                                                PAGE_SIZE))
+        ident = b"\x7fELF" + bytes([2, 1, 1, 0]) + bytes(8)
+        self.file.seek(0)
+        self.file.write(ELF_HEADER.pack(ident, ET_CORE, EM_AARCH64, 1, 0, program_header_offset,
+                                        0, 0, ELF_HEADER.size, PROGRAM_HEADER.size,
+                                        len(self.segments) + 1, 64, 0, 0))
+        self.file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def abort(
+        self,
+    ):
+        """
+        Discard the partly written core
+        """
+        self.file.close()
+        os.remove(f"{self.path}.tmp")
@@ -0,0 +1,349 @@
+"""Append-only log of breakpoint events with a sparse index for random access"""
+
+import bisect
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .capture import CaptureEvent
+
+# size of the body, hit number, timestamp and breakpoint number of a record
+RECORD_HEADER = struct.Struct("<IQdI")
+# hit number, timestamp and offset of an indexed record
+INDEX_ENTRY = struct.Struct("<Qdq")
+
+@dataclass
+class LoggedEvent:
+    """Breakpoint event read back from an event log"""
+    hit_no: int
+    timestamp: float
+    bkpt_no: int
+    name: str
+    registers: Dict[str, Union[int, float]] = field(default_factory=lambda : {})
+    memory: List[bytes] = field(default_factory=lambda : [])
+    offset: int = 0
+
+def encode_event(
+    event: CaptureEvent,
+) -> bytes:
+    """
+    Encode an event as a log record
+
+    Args:
+        event (CaptureEvent): Event to encode
+
+    Returns:
+        bytes: Record header followed by the name, registers and memory of the event
+    """
+    name = event.bkpt.name.encode()
+    body = bytearray(struct.pack("<H", len(name)) + name)
+    body += struct.pack("<H", len(event.registers))
+    for register, value in event.registers.items():
+        register = register.encode()
+        body += struct.pack("<B", len(register)) + register
+        if isinstance(value, float):
+            body += b"d" + struct.pack("<d", value)
+        elif -1 << 63 <= value < 1 << 63:
+            body += b"q" + struct.pack("<q", value)
+        else:
+            body += b"Q" + struct.pack("<Q", value)
+    body += struct.pack("<H", len(event.memory))
+    for memory in event.memory:
+        body += struct.pack("<I", len(memory)) + memory
+    header = RECORD_HEADER.pack(len(body), event.hit_no or 0, event.timestamp,
+                                event.bkpt.bkpt_no or 0)
+    return header + body
+
+class EventLog:
+    """Writes events to an append-only log and every index_interval-th record to its index"""
+    def __init__(
+        self,
+        path: str,
+        index_interval: int = 1024,
+    ):
+        """
+        Open a log for appending, creating it if it does not exist
+
+        Hit numbers must keep growing across the sessions appending to a log for its index
+        to work, so last_hit_no is read back from an existing log for the next session to
+        continue from, and a record left incomplete by a crash is cut off
+
+        Args:
+            path (str): Log file, the index is written next to it with the suffix ".idx"
+            index_interval (int, optional): Records between index entries. Defaults to 1024
+        """
+        self.path = path
+        self.index_interval = index_interval
+        self.last_hit_no = self.recover()
+        self.file = open(path, "ab")
+        self.index_file = open(f"{path}.idx", "ab")
+        self.offset = self.file.tell()
+        # the first record after opening is always indexed
+        self.since_index = index_interval
+
+    def recover(
+        self,
+    ) -> int:
+        """
+        Find the last hit number of an existing log, cutting off an incomplete last record
+        along with index entries pointing past the complete records
+
+        Returns:
+            int: Hit number of the last record, 0 for a new or empty log
+        """
+        if not os.path.exists(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        index_path = f"{self.path}.idx"
+        index = b""
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                index = index_file.read()
+        index = index[:len(index) - len(index) % INDEX_ENTRY.size]
+        offsets = [entry[2] for entry in INDEX_ENTRY.iter_unpack(index)]
+        with open(self.path, "rb") as log_file:
+            while True:
+                # the index entry of a record is written first, so it may point at a record
+                # that never made it to the log
+                start = offsets[-1] if offsets else 0
+                last_hit_no, end = 0, start
+                log_file.seek(start)
+                while end + RECORD_HEADER.size <= size:
+                    header = log_file.read(RECORD_HEADER.size)
+                    body_size, hit_no, _, _ = RECORD_HEADER.unpack(header)
+                    if end + RECORD_HEADER.size + body_size > size:
+                        break
+                    last_hit_no = hit_no
+                    end += RECORD_HEADER.size + body_size
+                    log_file.seek(end)
+                if end > start or not offsets:
+                    break
+                offsets.pop()
+        if end != size:
+            os.truncate(self.path, end)
+        index_size = len(offsets) * INDEX_ENTRY.size
+        if os.path.exists(index_path) and os.path.getsize(index_path) != index_size:
+            os.truncate(index_path, index_size)
+        return last_hit_no
+
+    def append(
+        self,
+        event: CaptureEvent,
+    ):
+        """
+        Append an event
+
+        Args:
+            event (CaptureEvent): Event to append, numbered by the session that published it
+            after last_hit_no
+        """
+        if event.hit_no is not None:
+            if event.hit_no <= self.last_hit_no:
+                raise ValueError(f"Hit {event.hit_no} is not after the last logged hit "
+                                 f"{self.last_hit_no}, the index needs growing hit numbers")
+            self.last_hit_no = event.hit_no
+        record = encode_event(event)
+        if self.since_index >= self.index_interval:
+            self.index_file.write(INDEX_ENTRY.pack(event.hit_no or 0, event.timestamp, self.offset))
+            self.since_index = 0
+        self.file.write(record)
+        self.offset += len(record)
+        self.since_index += 1
+
+    def flush(
+        self,
+    ):
+        """
+        Make every appended event visible to readers
+        """
+        # records first, so readers never find index entries past the end of the log
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(
+        self,
+    ):
+        """
+        Flush and close the log
+        """
+        self.flush()
+        self.file.close()
+        self.index_file.close()
+
+class EventLogReader:
+    """Random access to an event log through a memory map and its sparse index"""
+    def __init__(
+        self,
+        path: str,
+    ):
+        """
+        Open a log for reading
+
+        Timestamps are expected to grow along with hit numbers, as they do for the events
+        of a single session
+
+        Args:
+            path (str): Log file written by EventLog
+        """
+        self.path = path
+        self.map: Optional[mmap.mmap] = None
+        self.size = 0
+        self.hit_nos: List[int] = []
+        self.timestamps: List[float] = []
+        self.offsets: List[int] = []
+        self.refresh()
+
+    def refresh(
+        self,
+    ):
+        """
+        Map the log and load its index again to see events appended since opening
+        """
+        self.close()
+        self.size = os.path.getsize(self.path)
+        if self.size:
+            with open(self.path, "rb") as log_file:
+                self.map = mmap.mmap(log_file.fileno(), 0, access = mmap.ACCESS_READ)
+        index = b""
+        if os.path.exists(f"{self.path}.idx"):
+            with open(f"{self.path}.idx", "rb") as index_file:
+                index = index_file.read()
+        index = index[:len(index) - len(index) % INDEX_ENTRY.size]
+        entries = [entry for entry in INDEX_ENTRY.iter_unpack(index) if entry[2] < self.size]
+        self.hit_nos = [entry[0] for entry in entries]
+        self.timestamps = [entry[1] for entry in entries]
+        self.offsets = [entry[2] for entry in entries]
+
+    def close(
+        self,
+    ):
+        """
+        Unmap the log
+        """
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+    def read(
+        self,
+        offset: int,
+    ) -> Tuple[Optional[LoggedEvent], int]:
+        """
+        Decode the record at an offset
+
+        Args:
+            offset (int): Offset of the record
+
+        Returns:
+            Tuple[Optional[LoggedEvent], int]: The event, None if the record is incomplete,
+            and the offset of the next record
+        """
+        if offset + RECORD_HEADER.size > self.size:
+            return None, offset
+        size, hit_no, timestamp, bkpt_no = RECORD_HEADER.unpack_from(self.map, offset)
+        position = offset + RECORD_HEADER.size
+        end = position + size
+        if end > self.size:
+            return None, offset
+        data = self.map
+        length = struct.unpack_from("<H", data, position)[0]
+        position += 2
+        name = data[position:position + length].decode()
+        position += length
+        event = LoggedEvent(hit_no, timestamp, bkpt_no, name, offset = offset)
+        count = struct.unpack_from("<H", data, position)[0]
+        position += 2
+        for _ in range(count):
+            length = data[position]
+            register = data[position + 1:position + 1 + length].decode()
+            position += 1 + length
+            kind = chr(data[position])
+            event.registers[register] = struct.unpack_from(f"<{kind}", data, position + 1)[0]
+            position += 9
+        count = struct.unpack_from("<H", data, position)[0]
+        position += 2
+        for _ in range(count):
+            length = struct.unpack_from("<I", data, position)[0]
+            event.memory.append(data[position + 4:position + 4 + length])
+            position += 4 + length
+        return event, end
+
+    def scan(
+        self,
+        offset: int = 0,
+    ) -> Iterator[LoggedEvent]:
+        """
+        Iterate over the events from an offset until the end of the log
+
+        Args:
+            offset (int, optional): Offset of the first record. Defaults to 0
+
+        Yields:
+            LoggedEvent: Each event
+        """
+        while True:
+            event, offset = self.read(offset)
+            if event is None:
+                return
+            yield event
+
+    def __iter__(
+        self,
+    ) -> Iterator[LoggedEvent]:
+        """
+        Iterate over every event
+
+        Returns:
+            Iterator[LoggedEvent]: Every event, in the order they were logged
+        """
+        return self.scan()
+
+    def get(
+        self,
+        hit_no: int,
+    ) -> Optional[LoggedEvent]:
+        """
+        Find the event of a hit number
+
+        Args:
+            hit_no (int): Hit number of the event
+
+        Returns:
+            Optional[LoggedEvent]: The event, None if it was not logged
+        """
+        i = bisect.bisect_right(self.hit_nos, hit_no) - 1
+        for event in self.scan(self.offsets[i] if i >= 0 else 0):
+            if event.hit_no == hit_no:
+                return event
+            if event.hit_no > hit_no:
+                return None
+        return None
+
+    def between(
+        self,
+        start: float,
+        end: float,
+        bkpt: Optional[Union[int, str]] = None,
+    ) -> Iterator[LoggedEvent]:
+        """
+        Iterate over the events logged within a time range
+
+        Args:
+            start (float): Timestamp of the first events to include
+            end (float): Timestamp of the last events to include
+            bkpt (Optional[Union[int, str]], optional): Number or name of the breakpoint
+            to include events of, None for every breakpoint. Defaults to None
+
+        Yields:
+            LoggedEvent: Each matching event
+        """
+        i = bisect.bisect_left(self.timestamps, start) - 1
+        for event in self.scan(self.offsets[i] if i >= 0 else 0):
+            if event.timestamp > end:
+                return
+            if event.timestamp < start:
+                continue
+            if bkpt is None or bkpt in (event.bkpt_no, event.name):
+                yield event
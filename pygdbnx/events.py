@@ -0,0 +1,202 @@
+"""Distribution of breakpoint events to independent subscribers"""
+
+import collections
+import threading
+from typing import Callable, List, Optional
+
+from .capture import CaptureEvent
+from .logs import events_logger
+
+class Subscription:
+    """Bounded queue of events consumed independently by one subscriber"""
+    POLICIES = ("block", "drop_oldest", "coalesce")
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        policy: str = "drop_oldest",
+        block_timeout: Optional[float] = None,
+    ):
+        """
+        Create a new subscription
+
+        Args:
+            maxsize (int, optional): Maximum amount of queued events. Defaults to 1024
+            policy (str, optional): What to do when the queue is full. "block" waits for the
+            subscriber, "drop_oldest" drops the oldest event and "coalesce" only keeps the latest
+            event of each breakpoint. Defaults to "drop_oldest"
+            block_timeout (Optional[float], optional): Seconds to block for with the "block"
+            policy before dropping the oldest event, None to block forever. Defaults to None
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy {policy}, "
+                             f"expected one of {self.POLICIES}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.events = collections.OrderedDict() if policy == "coalesce" else collections.deque()
+        self.sequence = 0
+
+    def __len__(
+        self,
+    ) -> int:
+        """
+        Amount of queued events
+
+        Returns:
+            int: Amount of queued events
+        """
+        return len(self.events)
+
+    def put(
+        self,
+        event: CaptureEvent,
+    ):
+        """
+        Queue an event according to the backpressure policy
+
+        Args:
+            event (CaptureEvent): Event to queue
+        """
+        with self.condition:
+            if self.closed:
+                return
+            if self.policy == "coalesce":
+                if event.bkpt.bkpt_no in self.events:
+                    self.dropped += 1
+                elif len(self.events) >= self.maxsize:
+                    self.events.popitem(last = False)
+                    self.dropped += 1
+                self.events[event.bkpt.bkpt_no] = event
+            else:
+                if self.policy == "block" and len(self.events) >= self.maxsize:
+                    self.condition.wait_for(
+                        lambda: len(self.events) < self.maxsize or self.closed,
+                        self.block_timeout
+                    )
+                if len(self.events) >= self.maxsize:
+                    self.events.popleft()
+                    self.dropped += 1
+                self.events.append(event)
+            self.condition.notify_all()
+
+    def get(
+        self,
+        timeout: Optional[float] = None,
+    ) -> Optional[CaptureEvent]:
+        """
+        Take the oldest queued event
+
+        Args:
+            timeout (Optional[float], optional): Seconds to wait for an event,
+            None to wait until one arrives. Defaults to None
+
+        Returns:
+            Optional[CaptureEvent]: Oldest event, None if timed out or closed
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.events or self.closed, timeout):
+                return None
+            if not self.events:
+                return None
+            if self.policy == "coalesce":
+                event = self.events.popitem(last = False)[1]
+            else:
+                event = self.events.popleft()
+            self.condition.notify_all()
+            return event
+
+    def __iter__(
+        self,
+    ):
+        """
+        Iterate over events until the subscription is closed
+        """
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def close(
+        self,
+    ):
+        """
+        Stop the subscription, waking up anything waiting on it
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class EventBus:
+    """Publishes breakpoint events to any number of bounded subscriptions"""
+    def __init__(
+        self,
+    ):
+        self.subscriptions: List[Subscription] = []
+
+    def subscribe(
+        self,
+        callback: Optional[Callable] = None,
+        maxsize: int = 1024,
+        policy: str = "drop_oldest",
+        block_timeout: Optional[float] = None,
+    ) -> Subscription:
+        """
+        Subscribe to events
+
+        Args:
+            callback (Optional[Callable], optional): Function called with every event from a
+            thread of its own. Exceptions it raises are logged and the next event is passed
+            to it regardless. If None, events have to be taken from the returned subscription.
+            Defaults to None
+            maxsize (int, optional): Maximum amount of queued events. Defaults to 1024
+            policy (str, optional): Backpressure policy, see Subscription. Defaults to "drop_oldest"
+            block_timeout (Optional[float], optional): Seconds to block for with the "block"
+            policy. Defaults to None
+
+        Returns:
+            Subscription: The new subscription
+        """
+        subscription = Subscription(maxsize, policy, block_timeout)
+        self.subscriptions.append(subscription)
+        if callback is not None:
+            def consume():
+                for event in subscription:
+                    try:
+                        callback(event)
+                    except Exception: # pylint: disable=broad-except
+                        # a dead consumer would block publish forever with the "block" policy
+                        events_logger.exception("Subscriber failed on event of \"%s\"",
+                                                event.bkpt.name)
+            threading.Thread(target = consume, daemon = True).start()
+        return subscription
+
+    def unsubscribe(
+        self,
+        subscription: Subscription,
+    ):
+        """
+        Remove and close a subscription
+
+        Args:
+            subscription (Subscription): Subscription to remove
+        """
+        self.subscriptions.remove(subscription)
+        subscription.close()
+
+    def publish(
+        self,
+        event: CaptureEvent,
+    ):
+        """
+        Queue an event for every subscription
+
+        Args:
+            event (CaptureEvent): Event to publish
+        """
+        for subscription in self.subscriptions:
+            subscription.put(event)
@@ -5,3 +5,15 @@ class GDBNotFoundException(Exception):
 
 class WaitApplicationException(Exception):
     """Raised when `monitor wait application` fails"""
+
+class GdbCommandException(Exception):
+    """Raised when gdb responds to a command with an error"""
+
+class MemoryReadException(GdbCommandException):
+    """Raised when memory can not be read"""
+
+class DaemonException(Exception):
+    """Raised when a session daemon fails to handle a request"""
+
+class ConnectionLost(GdbCommandException):
+    """Raised when the connection to the switch is lost and can not be restored"""
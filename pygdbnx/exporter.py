@@ -0,0 +1,256 @@
+"""Export of session metrics in the Prometheus text format"""
+
+import http.server
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+from .stats import BUCKETS, Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_PORT = 9464
+
+def escape_label(
+    value,
+) -> str:
+    """
+    Escape a label value for the Prometheus text format
+
+    Args:
+        value (Any): Label value
+
+    Returns:
+        str: Escaped label value
+    """
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(
+    labels: Dict[str, object],
+) -> str:
+    """
+    Format labels for a sample line
+
+    Args:
+        labels (Dict[str, object]): Label names and values
+
+    Returns:
+        str: Labels within braces, empty if there are none
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        f"{name}=\"{escape_label(value)}\"" for name, value in labels.items()
+    ) + "}"
+
+class MetricsExporter:
+    """Serves the metrics of sessions over HTTP or writes them to a file for node_exporter"""
+    def __init__(
+        self,
+        sessions: Union[object, Iterable[object]],
+    ):
+        """
+        Create an exporter
+
+        Command latency and halt time distributions are only exported for sessions created
+        with collect_stats
+
+        Args:
+            sessions (Union[GdbProcess, Iterable[GdbProcess]]): Session or sessions to export
+            metrics of, labelled by their console
+        """
+        if hasattr(sessions, "active_breakpoints"):
+            sessions = [sessions]
+        self.sessions = list(sessions)
+        self.server: Optional[http.server.ThreadingHTTPServer] = None
+        self.writer: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def render(
+        self,
+    ) -> str:
+        """
+        Render the current metrics of every session
+
+        Returns:
+            str: Metrics in the Prometheus text format
+        """
+        families: Dict[str, List[str]] = {}
+
+        def add(
+            name: str,
+            kind: str,
+            help_text: str,
+            labels: Dict[str, object],
+            value: float,
+        ):
+            if name not in families:
+                families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            families[name].append(f"{name}{format_labels(labels)} {value}")
+
+        def add_histogram(
+            name: str,
+            help_text: str,
+            labels: Dict[str, object],
+            histogram: Histogram,
+        ):
+            if name not in families:
+                families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            lines = families[name]
+            cumulative = 0
+            for bound, count in zip(list(BUCKETS) + ["+Inf"], list(histogram.buckets)):
+                cumulative += count
+                bucket_labels = format_labels({**labels, 'le': bound})
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram.total}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        for session in self.sessions:
+            console = {'console': session.ip_address}
+            seen = set()
+            for bkpt in list(session.active_breakpoints):
+                # the same breakpoint is listed under each number it was installed with
+                if id(bkpt) in seen:
+                    continue
+                seen.add(id(bkpt))
+                labels = {**console, 'breakpoint': bkpt.name, 'number': bkpt.bkpt_no}
+                add("pygdbnx_breakpoint_hits_total", "counter",
+                    "Hits of each breakpoint counted by gdb", labels, bkpt.times_hit)
+                add("pygdbnx_breakpoint_handled_total", "counter",
+                    "Hits of each breakpoint that halted for python", labels, bkpt.times_handled)
+                add("pygdbnx_breakpoint_active", "gauge",
+                    "Whether or not each breakpoint is enabled", labels, int(bkpt.active))
+            add("pygdbnx_reconnects_total", "counter",
+                "Times the connection to the console was restored", console,
+                getattr(session, "reconnects", 0))
+            rtt = getattr(session, "rtt", None)
+            if rtt is not None and rtt.srtt is not None:
+                add("pygdbnx_round_trip_seconds", "gauge",
+                    "Smoothed round-trip time of commands", console, rtt.srtt)
+            events = getattr(session, "events", None)
+            for index, subscription in enumerate(list(getattr(events, "subscriptions", []))):
+                labels = {**console, 'subscription': index, 'policy': subscription.policy}
+                add("pygdbnx_subscription_queue_depth", "gauge",
+                    "Events queued for each subscriber", labels, len(subscription))
+                add("pygdbnx_subscription_dropped_total", "counter",
+                    "Events dropped by the backpressure policy of each subscriber", labels,
+                    subscription.dropped)
+            statistics = getattr(session, "statistics", None)
+            if statistics is None:
+                continue
+            for kind, stats in list(statistics.commands.items()):
+                labels = {**console, 'kind': kind}
+                add("pygdbnx_commands_total", "counter",
+                    "Commands sent to gdb by kind", labels, stats.count)
+                add("pygdbnx_command_errors_total", "counter",
+                    "Commands that failed by kind", labels, stats.errors)
+                add("pygdbnx_command_sent_bytes_total", "counter",
+                    "Bytes of commands written to gdb by kind", labels, stats.bytes_sent)
+                add("pygdbnx_memory_moved_bytes_total", "counter",
+                    "Bytes of target memory read or written by kind", labels, stats.bytes_moved)
+                add_histogram("pygdbnx_command_seconds",
+                              "Seconds from sending a command until its result was read",
+                              labels, stats.latency)
+            for phase, histogram in statistics.halts.items():
+                add_histogram("pygdbnx_halt_seconds",
+                              "Seconds the target spent halted for a breakpoint by phase",
+                              {**console, 'phase': phase}, histogram)
+        return "".join("\n".join(lines) + "\n" for lines in families.values())
+
+    def serve(
+        self,
+        port: int = DEFAULT_PORT,
+        host: str = "127.0.0.1",
+    ) -> http.server.ThreadingHTTPServer:
+        """
+        Serve the metrics at /metrics from a thread of its own
+
+        Args:
+            port (int, optional): Port to listen on. Defaults to DEFAULT_PORT
+            host (str, optional): Address to listen on. Defaults to "127.0.0.1"
+
+        Returns:
+            http.server.ThreadingHTTPServer: The running server
+        """
+        exporter = self
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            """Answers scrapes of /metrics"""
+            def do_GET(
+                self,
+            ):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(
+                self,
+                format,
+                *args,
+            ):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target = self.server.serve_forever, daemon = True).start()
+        return self.server
+
+    def write_file(
+        self,
+        path: str,
+    ):
+        """
+        Write the metrics to a file, replacing it atomically
+
+        Args:
+            path (str): File to write, e.g. a .prom file in node_exporter's textfile directory
+        """
+        with open(f"{path}.tmp", "w", encoding = "utf-8") as metrics_file:
+            metrics_file.write(self.render())
+        os.replace(f"{path}.tmp", path)
+
+    def write_periodically(
+        self,
+        path: str,
+        interval: float = 15.0,
+    ) -> threading.Thread:
+        """
+        Rewrite the metrics file every interval seconds from a thread of its own
+
+        Args:
+            path (str): File to write
+            interval (float, optional): Seconds between writes. Defaults to 15.0
+
+        Returns:
+            threading.Thread: The writer thread
+        """
+        def write_loop():
+            while True:
+                self.write_file(path)
+                if self.stopped.wait(interval):
+                    return
+
+        self.stopped.clear()
+        self.writer = threading.Thread(target = write_loop, daemon = True)
+        self.writer.start()
+        return self.writer
+
+    def stop(
+        self,
+    ):
+        """
+        Stop serving and writing metrics
+        """
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
@@ -1,16 +1,35 @@
 """Wrapper around pygdbmi.GdbController for easier switch connection"""
 
+import re
 import struct
-from typing import Optional, List, Union
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, List, Tuple, Union
 import os.path
 import pygdbmi.gdbcontroller
 import pygdbmi.constants
 
 from .breakpoint import Breakpoint, Watchpoint
-from .exceptions import GDBNotFoundException, WaitApplicationException
+from .capture import CaptureEvent, parse_capture
+from .elfcore import CoreWriter
+from .eventlog import EventLog
+from .events import EventBus
+from .layoutcache import SIGNATURE_SIZE, LayoutCache, build_id
+from .logs import analysis_logger, breakpoint_logger, connection_logger
+from .reader import MiReader
+from .router import RecordRouter
+from .rtt import RttEstimator
+from .session import SwitchSession
+from .snapshot import SnapshotWriter
+from .snapshotstore import SnapshotStore
+from .stats import SessionStats
+from .throttle import OverheadThrottle
+from .hooks import CommandCall, CommandHooks
+from .exceptions import ConnectionLost, GDBNotFoundException, GdbCommandException, \
+    MemoryReadException, WaitApplicationException
 
 
-class GdbProcess(pygdbmi.gdbcontroller.GdbController):
+class GdbProcess(SwitchSession, pygdbmi.gdbcontroller.GdbController):
     """Wrapper around pygdbmi.GdbController for easier switch connection"""
     def __init__(
         self,
@@ -20,6 +39,14 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         path_to_gdb: Optional[str] = "aarch64-none-elf-gdb.exe",
         time_to_check_for_additional_output_sec: float =
             pygdbmi.constants.DEFAULT_TIME_TO_CHECK_FOR_ADDITIONAL_OUTPUT_SEC,
+        throttle: Optional[OverheadThrottle] = None,
+        executor: Optional[Executor] = None,
+        background_reader: bool = False,
+        layout_cache: Optional[LayoutCache] = None,
+        auto_reconnect: bool = False,
+        adaptive_timeouts: bool = False,
+        collect_stats: bool = False,
+        event_log: Optional[EventLog] = None,
     ):
         """
         Create new gdb process and connect to the switch
@@ -30,8 +57,8 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
             breakpoints (Optional[List[Breakpoint]], optional): List of breakpoints
             to apply on start of process.
 
-            wait_for_application (bool): Whether or not to hook as soon as the game runs.
-            Defaults to False
+            wait_for_application (bool): Whether or not to wait for a game to be launched
+            and attach to it before it starts running. Defaults to False
 
             path_to_gdb (Optional[str], optional): Path to gdb executable to run.
             Defaults to "aarch64-none-elf-gdb.exe"
@@ -40,65 +67,242 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
             wait this amout of time before exiting (exits before timeout is reached to save time).
             If <= 0, full timeout time is used.
             Defaults to pygdbmi.constants.DEFAULT_TIME_TO_CHECK_FOR_ADDITIONAL_OUTPUT_SEC
+
+            throttle (Optional[OverheadThrottle], optional): Throttle keeping the time the
+            target spends halted for breakpoints within a budget. It is checked between halts
+            as well once set_async_execution turned mi-async on. Defaults to None
+
+            executor (Optional[Executor], optional): Executor to run the on_analysis phase
+            of breakpoints in. A ThreadPoolExecutor is created when first needed if None.
+            Defaults to None
+
+            background_reader (bool, optional): Whether or not to read gdb output on a
+            thread of its own, so that responses are handed over as soon as they are parsed
+            instead of after time_to_check_for_additional_output_sec of silence.
+            Defaults to False
+
+            layout_cache (Optional[LayoutCache], optional): Cache of process layouts. When given,
+            the process last attached to on the console is attached to again directly if
+            it is still running. Defaults to None
+
+            auto_reconnect (bool, optional): Whether or not wait_for_break should reconnect
+            and restore breakpoints when the connection to the switch is lost instead of
+            raising ConnectionLost. Defaults to False
+
+            adaptive_timeouts (bool, optional): Whether or not to derive command timeouts and
+            the time to check for additional output from the measured round-trip time of
+            commands instead of using fixed values. Defaults to False
+
+            collect_stats (bool, optional): Whether or not to count commands and record their
+            latency along with where the time of each halt goes, see stats. Defaults to False
+
+            event_log (Optional[EventLog], optional): Log to append every breakpoint event to,
+            including hits of breakpoints that capture nothing. Hits are numbered on from the
+            last hit already in the log. Defaults to None
         """
         if not os.path.exists(path_to_gdb):
             raise GDBNotFoundException(f"GDB executable not found at {path_to_gdb}."
                                         " Either specify the direct path to gdb,"
                                         " or place it next to the script you are executing")
         super().__init__([path_to_gdb,"--interpreter=mi3"], time_to_check_for_additional_output_sec)
-        self.ip_address = ip_address
-        self.active_breakpoints = []
-        self.main_base: int = None
-        self.main_max: int = None
-        self.heap_base: int = None
-        self.heap_max: int = None
-        self.stack_base: int = None
-        self.stack_max: int = None
-        self.bkpt_no = 1
+        self.reader: Optional[MiReader] = None
+        # without a reader, records no command claimed are queued here for get_gdb_response
+        self.router = RecordRouter()
+        self.unclaimed: List[dict] = []
+        self.async_execution = False
+        self.target_running = False
+        self.rtt: Optional[RttEstimator] = None
+        self.command_hooks: Optional[CommandHooks] = None
+        self.statistics: Optional[SessionStats] = None
+        if collect_stats:
+            self.statistics = SessionStats()
+            self.add_command_hook(post = self.statistics.record_command)
+        if adaptive_timeouts:
+            self.rtt = RttEstimator(initial_drain = time_to_check_for_additional_output_sec,
+                                    max_drain = max(time_to_check_for_additional_output_sec, 0.01))
+        if background_reader:
+            self.reader = MiReader(self.gdb_process.stdout, self.gdb_process.stderr)
+            self.reader.start()
+        self.init_session(ip_address)
+        self.throttle = throttle
+        self.executor = executor
+        self.layout_cache = layout_cache
+        self.auto_reconnect = auto_reconnect
+        self.reconnects = 0
+        self.events = EventBus()
+        self.event_log = event_log
+        if event_log is not None:
+            self.hit_no = event_log.last_hit_no
         self.clear_responses()
         self.connect()
         if wait_for_application:
-            self.wait_for_application()
-        self.attach()
-        self.get_bases()
+            self.attach(process_id = self.wait_for_application())
+            self.get_bases()
+            if layout_cache is not None:
+                self.layout_cache.store(self.ip_address, self.layout(self.read_build_id()))
+        elif layout_cache is None:
+            self.attach()
+            self.get_bases()
+        else:
+            self.attach_cached()
         self.write("set step-mode on")
         if breakpoints is not None:
-            for item in breakpoints:
-                self.add_breakpoint(item)
+            self.add_breakpoints(breakpoints)
 
     def wait_for_application(
         self,
-    ):
+        timeout: float = 3600.0,
+        poll_interval: float = 0.05,
+        process_name: str = "Application",
+    ) -> int:
         """
-        Hang until a game is run
+        Hang until a game is launched
+
+        The stub reports the process id of the game as soon as it is created, while it is still
+        suspended. Stubs that can not wait for applications have their process list polled instead
+
+        Args:
+            timeout (float, optional): Seconds to wait before giving up. Defaults to 3600.0
+            poll_interval (float, optional): Seconds between reads of the process list when
+            polling. Defaults to 0.05
+            process_name (str, optional): Name of switch process to look for when polling.
+            Defaults to "Application"
+
+        Returns:
+            int: Process id of the launched game
         """
-        response = self.filter_response(self.write("monitor wait application"), "log")
-        print("Waiting for application to launch...")
-        if len(response) > 1 and "not supported by this target" in response[1]['payload']:
-            raise WaitApplicationException("Failed to wait for application, " \
-                                           "please restart Nintendo Switch")
+        connection_logger.info("Waiting for application to launch...")
         try:
-            input("Press Enter when the console is hanging: ")
-            self.clear_responses()
-        except pygdbmi.constants.GdbTimeoutError as timeout:
+            response = self.execute("monitor wait application", timeout)
+        except pygdbmi.constants.GdbTimeoutError as timeout_error:
             raise WaitApplicationException("Timed out while waiting for application, " \
-                                           "please restart Nintendo Switch") from timeout
+                                           "please restart Nintendo Switch") from timeout_error
+        for line in response:
+            match = re.search(r"attach (0x[0-9a-fA-F]+)", str(line['payload']))
+            if match is not None:
+                return int(match.group(1), 16)
+        if any("not supported by this target" in str(line['payload']) for line in response):
+            return self.poll_for_application(process_name, timeout, poll_interval)
+        raise WaitApplicationException("Failed to wait for application, " \
+                                       "please restart Nintendo Switch")
+
+    def poll_for_application(
+        self,
+        process_name: str = "Application",
+        timeout: float = 3600.0,
+        poll_interval: float = 0.05,
+    ) -> int:
+        """
+        Poll the process list until a new process of name process_name appears
+
+        Args:
+            process_name (str, optional): Name of switch process to look for.
+            Defaults to "Application"
+            timeout (float, optional): Seconds to wait before giving up. Defaults to 3600.0
+            poll_interval (float, optional): Seconds between reads of the process list.
+            Defaults to 0.05
+
+        Returns:
+            int: Process id of the new process
+        """
+        known_process_id = self.parse_process_id(self.execute("info os processes"), process_name)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            process_id = self.parse_process_id(self.execute("info os processes"), process_name)
+            if process_id is not None and process_id != known_process_id:
+                return process_id
+        raise WaitApplicationException("Timed out while waiting for application")
 
     def clear_responses(
         self,
-    ):
+    ) -> List[dict]:
         """
         Clear all cached gdb responses by sending an empty string
+
+        Returns:
+            List[dict]: The cleared mi3 responses
         """
-        self.write("")
+        return self.write("")
 
     def resume_execution(
         self,
     ):
         """
         Resume program execution by sending the continue command
+
+        The response is left for wait_for_break so that breakpoints hit and captures
+        printed right after resuming are not discarded
         """
-        self.write("continue")
+        command = "continue &" if self.async_execution else "continue"
+        self.target_running = True
+        if self.command_hooks is None:
+            self.write(command, read_response = False)
+            return
+        call = self.command_hooks.before(command)
+        self.write(command, read_response = False)
+        self.command_hooks.after(call)
+
+    def set_async_execution(
+        self,
+        enabled: bool = True,
+    ):
+        """
+        Make gdb keep reading commands while the target runs, so it can be interrupted
+
+        Must be called while the target is halted
+
+        Args:
+            enabled (bool, optional): Whether or not to turn mi-async on. Defaults to True
+        """
+        self.execute(f"-gdb-set mi-async {'on' if enabled else 'off'}")
+        self.async_execution = enabled
+
+    def interrupt(
+        self,
+        timeout: float = 10.0,
+    ):
+        """
+        Halt the running target, dealing with breakpoints hit until it stopped
+
+        gdb only reads commands while the target runs with mi-async on, see set_async_execution
+
+        Args:
+            timeout (float, optional): Seconds to wait for the target to stop. Defaults to 10.0
+        """
+        if not self.async_execution:
+            raise GdbCommandException("Interrupting a running target needs mi-async, "
+                                      "see set_async_execution")
+        self.execute("-exec-interrupt")
+        deadline = time.monotonic() + timeout
+        while self.target_running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.handle_next_break(remaining, resume = False):
+                raise pygdbmi.constants.GdbTimeoutError(
+                    f"Target did not stop after {timeout} seconds"
+                )
+
+    def track_execution(
+        self,
+        response: List[dict],
+    ):
+        """
+        Follow whether the target runs from the *running and *stopped records of a response
+
+        Args:
+            response (List[dict]): mi3 response to follow
+        """
+        for line in response:
+            if line['type'] != "notify":
+                continue
+            if line['message'] == "running":
+                self.target_running = True
+            elif line['message'] == "stopped":
+                payload = line['payload'] or {}
+                bkpt = self.breakpoints_by_no.get(int(payload.get('bkptno', 0)))
+                # temporary auto-continue breakpoints continue through their commands
+                if bkpt is None or not bkpt.auto_continue:
+                    self.target_running = False
 
     def connect(
         self,
@@ -106,12 +310,86 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         """
         Connect to the switch with the ip address stored in self.ip_address
         """
-        self.write(f"target extended-remote {self.ip_address}:22225", read_response=False)
-        self.log_response(self.wait_for_response())
+        response = self.execute(f"target extended-remote {self.ip_address}:22225", 10.0)
+        if response[-1]['message'] == "error":
+            raise ConnectionLost(f"Failed to connect to {self.ip_address}: "
+                                 f"{response[-1]['payload']['msg']}")
+        self.log_response(response)
+
+    def reconnect(
+        self,
+        max_attempts: Optional[int] = None,
+        initial_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        """
+        Restore the session after the connection to the switch was lost
+
+        Connecting is retried with exponential backoff, the process is attached to again and
+        every breakpoint gdb still knows about is installed again in one batch. The Breakpoint
+        objects, along with their stored_information, are kept
+
+        Args:
+            max_attempts (Optional[int], optional): Attempts before raising ConnectionLost,
+            None to retry forever. Defaults to None
+            initial_delay (float, optional): Seconds to wait after the first failed attempt.
+            Defaults to 0.5
+            max_delay (float, optional): Maximum seconds to wait between attempts.
+            Defaults to 30.0
+        """
+        bkpts = self.installed_breakpoints(self.execute("-break-list")[-1])
+        bases = (self.main_base, self.heap_base)
+        delay = initial_delay
+        attempt = 1
+        while True:
+            try:
+                self.execute("disconnect")
+                self.connect()
+                response = None
+                if self.process_id is not None:
+                    response = self.execute(f"attach {self.process_id}", 10.0)
+                if response is None or response[-1]['message'] == "error":
+                    self.attach()
+                else:
+                    self.log_response(response)
+                self.get_bases()
+                break
+            except (GdbCommandException, pygdbmi.constants.GdbTimeoutError) as error:
+                if max_attempts is not None and attempt >= max_attempts:
+                    raise ConnectionLost(f"Failed to reconnect to {self.ip_address} "
+                                         f"after {attempt} attempts") from error
+                connection_logger.warning("Reconnecting failed (%s), retrying in %.1f seconds",
+                                          error, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, max_delay)
+                attempt += 1
+        self.reconnects += 1
+        if (self.main_base, self.heap_base) != bases:
+            connection_logger.warning("Bases changed while disconnected, "
+                                      "breakpoints are moved to the new main base")
+        self.reinstall_breakpoints(bkpts)
+
+    def reinstall_breakpoints(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Replace every breakpoint in gdb with bkpts, installed in one batch
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to install
+        """
+        self.execute("-break-delete")
+        self.breakpoints_by_no.clear()
+        self.active_breakpoints = []
+        for bkpt in bkpts:
+            bkpt.times_hit = 0
+        self.add_breakpoints(bkpts, restore = True)
 
     def attach(
         self,
         process_name: str = "Application",
+        process_id: Optional[int] = None,
     ):
         """
         Attach to process of name process_name
@@ -119,14 +397,63 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         Args:
             process_name (str, optional): Name of switch process to attach to.
             Defaults to "Application"
+            process_id (Optional[int], optional): Process id to attach to, looked up by
+            process_name if None. Defaults to None
         """
-        self.write("info os processes", read_response = False)
-        processes = self.wait_for_response()
-        for line in reversed(processes): # sort by latest process started
-            if line['type'] == "console" and process_name in line["payload"]:
-                process_id = int(line["payload"].split(" ",1)[0])
-                self.log_response(self.write(f"attach {process_id}"))
-                break
+        if process_id is None:
+            process_id = self.parse_process_id(self.execute("info os processes"), process_name)
+        if process_id is not None:
+            self.process_id = process_id
+            self.log_response(self.execute(f"attach {process_id}", 10.0))
+
+    def attach_cached(
+        self,
+        process_name: str = "Application",
+    ) -> bool:
+        """
+        Attach to the process last attached to on this console using self.layout_cache,
+        falling back to attach and get_bases if it is no longer running
+
+        Args:
+            process_name (str, optional): Name of switch process to attach to when
+            the cached process is gone. Defaults to "Application"
+
+        Returns:
+            bool: Whether or not the cached layout was used
+        """
+        layout = self.layout_cache.last(self.ip_address)
+        if layout is not None:
+            try:
+                response = self.execute(f"attach {layout.process_id}", 10.0)
+            except pygdbmi.constants.GdbTimeoutError:
+                connection_logger.info("Attaching to cached process %d timed out",
+                                       layout.process_id)
+                response = None
+            if response is not None and response[-1]['message'] != "error":
+                self.log_response(response)
+                self.apply_layout(layout)
+                if self.read_build_id() == layout.build:
+                    return True
+                connection_logger.info("Cached layout is outdated")
+                self.execute("detach")
+        self.attach(process_name)
+        self.get_bases()
+        self.layout_cache.store(self.ip_address, self.layout(self.read_build_id()))
+        return False
+
+    def read_build_id(
+        self,
+    ) -> Optional[str]:
+        """
+        Identify the build of the attached title by the start of its main module
+
+        Returns:
+            Optional[str]: Build id, None if the main module could not be read
+        """
+        try:
+            return build_id(self.read_memory(self.main_base, SIGNATURE_SIZE))
+        except MemoryReadException:
+            return None
 
     def get_bases(
         self,
@@ -134,17 +461,7 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         """
         Read the base addresses of sections of the switch's memory
         """
-        self.write("monitor get base", read_response = False)
-        for line in self.filter_response(self.wait_for_response("target"), "target"):
-            if "Heap" in line['payload']:
-                self.heap_base, self.heap_max = \
-                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[4:6])
-            elif "Stack" in line['payload']:
-                self.stack_base, self.stack_max = \
-                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[3:5])
-            elif ".nss" in line['payload']:
-                self.main_base, self.main_max = \
-                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[2:4])
+        self.apply_bases(self.execute("monitor get base"))
 
     def read_instruction(
         self,
@@ -169,11 +486,10 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
             address += self.main_base
         elif offset_heap:
             address += self.heap_base
-        self.write(f"x/1iw {address}", read_response = False)
         return self.filter_response(
-            self.get_gdb_response(),
+            self.execute(f"x/1iw {address}"),
             "console"
-            )[0]['payload'].split(":")[1].replace("\\t","\t").replace("\\n","")
+            )[0]['payload'].split(":")[1].replace("\\t","\t").replace("\\n","").rstrip("\n")
 
     def read_int(
         self,
@@ -200,11 +516,7 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
             address += self.main_base
         elif offset_heap:
             address += self.heap_base
-        self.write(f"x/1x{size} {address}", read_response = False)
-        return int(self.filter_response(
-            self.wait_for_response(),
-            "console"
-            )[0]['payload'].split("0x")[-1][:-2].replace(":",""),16)
+        return int.from_bytes(self.read_memory(address, self.INT_SIZES[size]), "little")
 
     def read_bytes(
         self,
@@ -227,15 +539,46 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         Returns:
             bytes: Bytes read from address
         """
-        if size == "b":
-            struct_size = "B"
-        elif size == "h":
-            struct_size = "H"
-        elif size == "w":
-            struct_size = "I"
-        elif size == "g":
-            struct_size = "Q"
-        return struct.pack(struct_size, self.read_int(address, size, offset_main, offset_heap))
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        return self.read_memory(address, self.INT_SIZES[size])
+
+    def read_memory(
+        self,
+        address: int,
+        size: int,
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ) -> bytes:
+        """
+        Read a range of memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+
+        Returns:
+            bytes: Bytes read from address
+        """
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        result = self.execute(f"-data-read-memory-bytes {address} {size}")[-1]
+        if result['message'] == "error":
+            raise MemoryReadException(f"Failed to read 0x{size:X} bytes at 0x{address:X}: "
+                                      f"{result['payload']['msg']}")
+        contents = "".join(block['contents'] for block in result['payload']['memory'])
+        if len(contents) != size * 2:
+            raise MemoryReadException(f"Only part of 0x{size:X} bytes at 0x{address:X} "
+                                      "could be read")
+        return bytes.fromhex(contents)
 
     def read_float(
         self,
@@ -380,16 +723,200 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         Returns:
             Union[int, float]: Value read from register
         """
-        self.write(f"info register ${register}", read_response = False)
-        if register != "sp" and (register.startswith("s") or register.startswith("d")):
-            return float(self.filter_response(
-                self.get_gdb_response(),
-                "console"
-                )[0]['payload'].split("f = ")[-1].split(",")[0])
-        return int(self.filter_response(
-            self.get_gdb_response(),
-            "console"
-            )[0]['payload'].split(" ")[-1].replace("\n", "").replace("\\n",""), 0)
+        return self.parse_register(register, self.execute(f"info register ${register}"))
+
+    def read_registers(
+        self,
+    ) -> Dict[str, int]:
+        """
+        Read every general purpose and system register at once
+
+        Returns:
+            Dict[str, int]: Value of each register by name
+        """
+        return self.parse_registers(self.execute("info registers"))
+
+    def memory_regions(
+        self,
+    ) -> List[Tuple[str, int, int]]:
+        """
+        List the modules, heap and stack of the attached process
+
+        Returns:
+            List[Tuple[str, int, int]]: Name, address and size of each region
+        """
+        return self.parse_regions(self.execute("monitor get info"))
+
+    def read_regions(
+        self,
+        regions: Optional[List[Tuple[str, int, int]]] = None,
+        chunk_size: int = 0x10000,
+    ) -> Iterator[Tuple[str, int, bytes]]:
+        """
+        Read whole regions of memory in pipelined chunks, skipping chunks that can not be read
+
+        Args:
+            regions (Optional[List[Tuple[str, int, int]]], optional): Name, address and size
+            of each region to read. Defaults to memory_regions()
+            chunk_size (int, optional): Bytes read by each command. Defaults to 0x10000
+
+        Yields:
+            Tuple[str, int, bytes]: Region name, address and contents of each readable chunk
+        """
+        if regions is None:
+            regions = self.memory_regions()
+        chunks = [
+            (name, chunk, min(chunk_size, address + size - chunk))
+            for name, address, size in regions
+            for chunk in range(address, address + size, chunk_size)
+        ]
+        for i in range(0, len(chunks), self.BATCH_SIZE):
+            batch = chunks[i:i + self.BATCH_SIZE]
+            results = self.write_batch(
+                [f"-data-read-memory-bytes {address} {size}" for _, address, size in batch]
+            )
+            for (name, address, size), result in zip(batch, results):
+                if result['message'] == "error":
+                    continue
+                for block in result['payload']['memory']:
+                    yield name, int(block['begin'], 16), bytes.fromhex(block['contents'])
+
+    def dump_snapshot(
+        self,
+        path: str,
+        regions: Optional[List[Tuple[str, int, int]]] = None,
+        chunk_size: int = 0x10000,
+        extra_registers: Optional[List[str]] = None,
+    ):
+        """
+        Write the memory and registers of the halted process to a snapshot file,
+        to be read by OfflineGdbProcess
+
+        Args:
+            path (str): File to write the snapshot to
+            regions (Optional[List[Tuple[str, int, int]]], optional): Name, address and size
+            of each region to capture. Defaults to memory_regions()
+            chunk_size (int, optional): Bytes read by each command. Defaults to 0x10000
+            extra_registers (Optional[List[str]], optional): Registers not listed by
+            `info registers` to capture as well, e.g. "s0". Defaults to None
+        """
+        writer = SnapshotWriter(path)
+        try:
+            for name, address, data in self.read_regions(regions, chunk_size):
+                writer.add(name, address, data)
+            metadata = self.snapshot_metadata(extra_registers)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.finish(metadata)
+
+    def store_snapshot(
+        self,
+        store: SnapshotStore,
+        name: Optional[str] = None,
+        regions: Optional[List[Tuple[str, int, int]]] = None,
+        chunk_size: int = 0x10000,
+        extra_registers: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Add the memory and registers of the halted process to a snapshot store, only storing
+        pages that no stored snapshot holds already
+
+        Args:
+            store (SnapshotStore): Store to add the snapshot to
+            name (Optional[str], optional): Name of the snapshot. Defaults to the number of
+            the snapshot
+            regions (Optional[List[Tuple[str, int, int]]], optional): Name, address and size
+            of each region to capture. Defaults to memory_regions()
+            chunk_size (int, optional): Bytes read by each command, a multiple of the page
+            size of the store. Defaults to 0x10000
+            extra_registers (Optional[List[str]], optional): Registers not listed by
+            `info registers` to capture as well, e.g. "s0". Defaults to None
+
+        Returns:
+            str: Name of the snapshot, to be opened with store.open
+        """
+        if regions is None:
+            regions = self.memory_regions()
+        metadata = self.snapshot_metadata(extra_registers)
+        # streamed, so only a chunk at a time is held in memory
+        return store.add(regions, self.read_regions(regions, chunk_size), metadata, name)
+
+    def snapshot_metadata(
+        self,
+        extra_registers: Optional[List[str]] = None,
+    ) -> dict:
+        """
+        Describe the halted process for a snapshot
+
+        Args:
+            extra_registers (Optional[List[str]], optional): Registers not listed by
+            `info registers` to capture as well. Defaults to None
+
+        Returns:
+            dict: Layout and registers of the process
+        """
+        registers = self.read_registers()
+        for register in extra_registers or []:
+            registers[register] = self.read_register(register)
+        return {
+            'ip_address': self.ip_address,
+            'process_id': self.process_id,
+            'title': self.title,
+            'main_base': self.main_base,
+            'main_max': self.main_max,
+            'heap_base': self.heap_base,
+            'heap_max': self.heap_max,
+            'stack_base': self.stack_base,
+            'stack_max': self.stack_max,
+            'timestamp': time.time(),
+            'registers': registers,
+        }
+
+    def dump_core(
+        self,
+        path: str,
+        regions: Optional[List[Tuple[str, int, int]]] = None,
+        chunk_size: int = 0x10000,
+    ):
+        """
+        Write the memory and registers of the halted process to an AArch64 ELF core file,
+        to be loaded by gdb with `core-file`
+
+        Args:
+            path (str): File to write the core to
+            regions (Optional[List[Tuple[str, int, int]]], optional): Name, address and size
+            of each region to capture. Defaults to memory_regions()
+            chunk_size (int, optional): Bytes read by each command. Defaults to 0x10000
+        """
+        writer = CoreWriter(path, self.read_registers(), self.process_id)
+        try:
+            # core files do not name their segments
+            for _, address, data in self.read_regions(regions, chunk_size):
+                writer.add(address, data)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.finish()
+
+    def evaluate(
+        self,
+        expression: str,
+    ) -> int:
+        """
+        Evaluate a gdb expression as an integer
+
+        Args:
+            expression (str): Expression to evaluate (e.g. "$sp + 0x18")
+
+        Returns:
+            int: Value of the expression
+        """
+        result = self.execute(f"-data-evaluate-expression {self.mi_quote(expression)}")[-1]
+        if result['message'] == "error":
+            raise GdbCommandException(f"Failed to evaluate {expression}: "
+                                      f"{result['payload']['msg']}")
+        return int(result['payload']['value'].split(" ")[0], 0)
 
     def write_register(
         self,
@@ -417,127 +944,735 @@ class GdbProcess(pygdbmi.gdbcontroller.GdbController):
         Args:
             bkpt (Breakpoint): Breakpoint object to activate
         """
-        bkpt.bkpt_no = self.bkpt_no
-        self.active_breakpoints.append(bkpt)
-        if isinstance(bkpt, Watchpoint):
-            self.write(f"{bkpt.watch_type} * 0x{bkpt.address:X}")
-        else:
-            self.write(f"b * 0x{self.main_base + (bkpt.address & 0xFFFFFFFF):X}")
-        if not bkpt.active:
-            self.write(f"disable {bkpt.bkpt_no}")
-        self.bkpt_no += 1
+        self.add_breakpoints([bkpt])
+
+    def add_breakpoints(
+        self,
+        bkpts: List[Breakpoint],
+        restore: bool = False,
+    ):
+        """
+        Activate many breakpoints at once by pipelining the gdb commands that install them
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoint objects to activate
+            restore (bool, optional): Whether or not the breakpoints were installed before and
+            keep their remaining ignore counts and hit budgets. Defaults to False
+        """
+        results = self.write_batch(self.insert_commands(bkpts))
+        commands, error = self.register_breakpoints(bkpts, results, restore)
+        self.write_batch(commands)
+        if error is not None:
+            raise error
+
+    def ignore_hits(
+        self,
+        bkpt: Breakpoint,
+        count: int,
+    ):
+        """
+        Have gdb skip the next count hits of a breakpoint without stopping for python
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to ignore hits of
+            count (int): Amount of hits to ignore
+        """
+        bkpt.ignore_remaining = count
+        self.write(f"ignore {bkpt.bkpt_no} {count}")
+
+    def enable_breakpoint(
+        self,
+        bkpt: Breakpoint,
+    ):
+        """
+        Enable a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to enable
+        """
+        self.enable_many([bkpt])
+
+    def disable_breakpoint(
+        self,
+        bkpt: Breakpoint,
+    ):
+        """
+        Disable a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to disable
+        """
+        self.disable_many([bkpt])
+
+    def enable_many(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Enable many breakpoints at once
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to enable
+        """
+        for bkpt in bkpts:
+            bkpt.active = True
+        self.write_batch(self.toggle_commands("enable", bkpts))
+
+    def disable_many(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Disable many breakpoints at once
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to disable
+        """
+        for bkpt in bkpts:
+            bkpt.active = False
+        self.write_batch(self.toggle_commands("disable", bkpts))
+
+    def delete_many(
+        self,
+        bkpts: List[Breakpoint],
+    ):
+        """
+        Delete many breakpoints at once
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to delete
+        """
+        self.forget_breakpoints([bkpt.bkpt_no for bkpt in bkpts])
+        self.write_batch(self.toggle_commands("delete", bkpts))
+
+    def capture(
+        self,
+        bkpt: Breakpoint,
+    ) -> CaptureEvent:
+        """
+        Read the registers and memory declared by a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to capture for
+
+        Returns:
+            CaptureEvent: Captured registers and memory
+        """
+        event = CaptureEvent(bkpt, time.time())
+        for register in bkpt.registers:
+            event.registers[register] = self.read_register(register)
+        for memory_range in bkpt.memory:
+            address = memory_range.address
+            if not isinstance(address, int):
+                address = self.evaluate(address)
+            event.memory.append(self.read_memory(address, memory_range.size))
+        return event
+
+    def dispatch_captures(
+        self,
+        response: List[dict],
+    ):
+        """
+        Deal with capture records printed by auto-continue breakpoints
+
+        Args:
+            response (List[dict]): mi3 response to search for capture records
+        """
+        timestamp = time.time()
+        for line in self.filter_response(response):
+            event = parse_capture(line['payload'], self.captures, timestamp)
+            if event is None:
+                continue
+            event.hit_no = self.next_hit_no()
+            self.count_capture(event.bkpt)
+            if self.throttle is not None:
+                self.throttle.record_capture(event.bkpt)
+            if event.bkpt.on_capture is not None:
+                event.bkpt.on_capture(self, event.bkpt, event)
+            self.publish(event)
+
+    def publish(
+        self,
+        event: CaptureEvent,
+    ):
+        """
+        Append an event to the event log and publish it to every subscriber
+
+        Args:
+            event (CaptureEvent): Event to publish
+        """
+        if self.event_log is not None:
+            self.event_log.append(event)
+        self.events.publish(event)
 
     def wait_for_break(
         self,
         timeout: float = 60.0,
     ):
         """
-        Wait for and deal with a breakpoint being hit
+        Wait for and deal with breakpoints being hit until gdb is silent for timeout seconds
+
+        Args:
+            timeout (float, optional): Time in seconds to wait before timing out. Defaults to 60.0
+        """
+        if self.throttle is None:
+            while self.handle_next_break(timeout):
+                pass
+            return
+        # wake up every window to check the throttle, even if no breakpoint halts for python
+        silent_since = time.monotonic()
+        while True:
+            remaining = silent_since + timeout - time.monotonic()
+            if remaining <= 0:
+                return
+            if self.handle_next_break(min(remaining, self.throttle.window)):
+                silent_since = time.monotonic()
+            self.check_throttle()
+
+    def check_throttle(
+        self,
+    ):
+        """
+        Throttle or release breakpoints between halts, interrupting the running target if
+        the throttle has anything to do
+
+        Breakpoints are only throttled while the target runs if mi-async is on, see
+        set_async_execution, otherwise the throttle waits for the next python halt
+        """
+        if self.throttle is None or self.target_running and not self.async_execution:
+            return
+        if not self.throttle.due():
+            return
+        running = self.target_running
+        if running:
+            self.interrupt()
+        self.throttle.apply(self)
+        if running:
+            self.resume_execution()
+
+    def handle_next_break(
+        self,
+        timeout: float = 60.0,
+        resume: bool = True,
+    ) -> List[dict]:
+        """
+        Wait for the next output of gdb and deal with it, like a single step of wait_for_break
 
         Args:
             timeout (float, optional): Time in seconds to wait before timing out. Defaults to 60.0
+            resume (bool, optional): Whether or not to resume the target after handling a
+            breakpoint it halted at. Defaults to True
+
+        Returns:
+            List[dict]: The mi3 records dealt with, empty if gdb was silent for timeout seconds
         """
         response = self.get_gdb_response(timeout_sec = timeout, raise_error_on_timeout = False)
-        if response is not None:
-            bkpt_hit: Breakpoint = None
-            for line in response:
-                if line['message'] == "breakpoint-modified":
-                    bkpt_info = line['payload']['bkpt']
-                    bkpt_no = int(bkpt_info['number'])
-                    bkpt_hit = self.active_breakpoints[bkpt_no - 1]
-                    break
-            if bkpt_hit is not None:
-                print(f"Breakpoint at \"{bkpt_hit.name}\" hit")
-                if isinstance(bkpt_hit, Watchpoint):
-                    access_address: int = None
-                    while access_address is None:
-                        for line in reversed(response):
-                            if "frame" in line['payload']:
-                                access_address = int(line['payload']['frame']['addr'],16)
-                                break
-                        if access_address is None:
-                            response = self.get_gdb_response(
-                                timeout_sec = timeout,
-                                raise_error_on_timeout = False
-                            )
-                    access_address = 0x7100000000 | (access_address - self.main_base)
-                    print(f"Access address: {access_address:X}")
-                self.clear_responses()
-                if bkpt_hit.on_break is not None:
-                    bkpt_hit.on_break(self, bkpt_hit)
+        if not response:
+            if self.event_log is not None:
+                self.event_log.flush()
+            return response
+        if self.connection_lost(response):
+            if not self.auto_reconnect:
+                raise ConnectionLost(f"Lost connection to {self.ip_address}")
+            self.reconnect()
+            if resume:
                 self.resume_execution()
-                self.wait_for_break()
+            return response
+        self.track_execution(response)
+        halt_start = self.stop_time()
+        self.dispatch_captures(response)
+        bkpt_hit: Breakpoint = None
+        for line in response:
+            if line['message'] == "breakpoint-modified":
+                bkpt = self.count_hits(line['payload']['bkpt'])
+                if bkpt_hit is None:
+                    bkpt_hit = bkpt
+            elif line['message'] == "breakpoint-deleted":
+                self.forget_breakpoint(int(line['payload']['id']))
+        if bkpt_hit is None:
+            return response
+        bkpt_hit.times_handled += 1
+        self.target_running = False
+        breakpoint_logger.debug("Breakpoint at \"%s\" hit", bkpt_hit.name)
+        if isinstance(bkpt_hit, Watchpoint):
+            access_address: int = None
+            while access_address is None:
+                for line in reversed(response):
+                    if "frame" in line['payload']:
+                        access_address = int(line['payload']['frame']['addr'],16)
+                        break
+                if access_address is None:
+                    response = self.get_gdb_response(
+                        timeout_sec = timeout,
+                        raise_error_on_timeout = False
+                    )
+                    self.dispatch_captures(response)
+            access_address = 0x7100000000 | (access_address - self.main_base)
+            breakpoint_logger.debug("Access address: %X", access_address)
+        self.dispatch_captures(self.clear_responses())
+        hit_no = self.next_hit_no()
+        if bkpt_hit.on_capture is not None or self.events.subscriptions \
+                or self.event_log is not None:
+            event = self.capture(bkpt_hit)
+            event.hit_no = hit_no
+            if bkpt_hit.on_capture is not None:
+                bkpt_hit.on_capture(self, bkpt_hit, event)
+            self.publish(event)
+        capture_end = time.perf_counter()
+        if bkpt_hit.on_break is not None:
+            captured = bkpt_hit.on_break(self, bkpt_hit)
+            if bkpt_hit.on_analysis is not None:
+                self.submit_analysis(bkpt_hit, captured)
+        callback_end = time.perf_counter()
+        ignore = 0
+        if self.throttle is not None:
+            self.throttle.record(bkpt_hit, callback_end - halt_start)
+            ignore = self.throttle.apply(self, bkpt_hit)
+        self.write_batch(self.handled_hit_commands(bkpt_hit, ignore))
+        if resume:
+            self.resume_execution()
+        if self.statistics is not None:
+            halt_end = time.perf_counter()
+            self.statistics.record_halt(capture_end - halt_start, callback_end - capture_end,
+                                        halt_end - callback_end, halt_end - halt_start)
+        return response
+
+    def stop_time(
+        self,
+    ) -> float:
+        """
+        Estimate when the target stopped for the response just received
+
+        Returns:
+            float: time.perf_counter() time of the stop
+        """
+        if self.reader is not None:
+            stopped = self.reader.arrival
+        else:
+            # pygdbmi only returns once gdb was silent for the drain window
+            stopped = time.perf_counter() - self.io_manager.time_to_check_for_additional_output_sec
+        if self.rtt is not None and self.rtt.srtt is not None:
+            # the stop reaches gdb from the console about half a round trip later
+            stopped -= self.rtt.srtt / 2
+        return stopped
+
+    def submit_analysis(
+        self,
+        bkpt: Breakpoint,
+        captured,
+    ) -> Future:
+        """
+        Run the on_analysis phase of a breakpoint in the executor
+
+        on_analysis is called with whatever on_break captured while the target was halted,
+        and on_result is called with its result once it is done
+
+        Args:
+            bkpt (Breakpoint): Breakpoint the data was captured for
+            captured (Any): Data returned by on_break
+
+        Returns:
+            Future: Future of the result of on_analysis
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor()
+        future = self.executor.submit(bkpt.on_analysis, captured)
+
+        def on_done(future: Future):
+            exception = future.exception()
+            if exception is not None:
+                analysis_logger.error("Analysis of \"%s\" failed", bkpt.name, exc_info = exception)
+            elif bkpt.on_result is not None:
+                bkpt.on_result(bkpt, future.result())
+
+        future.add_done_callback(on_done)
+        return future
 
     def wait_for_response(
         self,
         target_type: Optional[str] = "console",
-        timeout: float = 1.0,
+        timeout: Optional[float] = None,
     ) -> List[dict]:
         """
         Wait until response from gdb of type target_type
 
         Args:
             target_type (Optional[str], optional): mi3 type to wait for. Defaults to "console".
-            timeout (float): Amount of seconds to wait each time before timing out. Defaults to 1.0
+            timeout (Optional[float], optional): Amount of seconds to wait each time before
+            timing out. Defaults to command_timeout()
 
         Returns:
             List[dict]: First mi3 response line of type target_type
         """
         found = False
         while not found:
-            response = self.get_gdb_response(timeout_sec = timeout)
+            response = self.get_gdb_response(timeout_sec = self.command_timeout(timeout))
             for line in response:
                 if line['type'] == target_type:
                     found = True
                     break
         return response
 
-    def log_response(
+    def get_gdb_response(
+        self,
+        timeout_sec: float = pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC,
+        raise_error_on_timeout: bool = True,
+    ) -> List[dict]:
+        """
+        Get the mi3 records gdb sent that no command is waiting for
+
+        Args:
+            timeout_sec (float, optional): Time in seconds to wait for a record.
+            Defaults to pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC
+            raise_error_on_timeout (bool, optional): Whether or not to raise
+            pygdbmi.constants.GdbTimeoutError if nothing was received. Defaults to True
+
+        Returns:
+            List[dict]: mi3 records
+        """
+        if self.reader is None:
+            if self.unclaimed:
+                response, self.unclaimed = self.unclaimed, []
+                return response
+            return super().get_gdb_response(timeout_sec, raise_error_on_timeout)
+        response = self.reader.get(timeout_sec)
+        if not response and raise_error_on_timeout:
+            raise pygdbmi.constants.GdbTimeoutError(
+                f"Did not get response from gdb after {timeout_sec} seconds"
+            )
+        return response
+
+    def write(
+        self,
+        mi_cmd_to_write: Union[str, List[str]],
+        timeout_sec: float = pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC,
+        raise_error_on_timeout: bool = True,
+        read_response: bool = True,
+    ) -> List[dict]:
+        """
+        Write commands to gdb
+
+        Args:
+            mi_cmd_to_write (Union[str, List[str]]): Command or commands to write
+            timeout_sec (float, optional): Time in seconds to wait for a response.
+            Defaults to pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC
+            raise_error_on_timeout (bool, optional): Whether or not to raise
+            pygdbmi.constants.GdbTimeoutError if nothing was received. Defaults to True
+            read_response (bool, optional): Whether or not to read the response. Defaults to True
+
+        Returns:
+            List[dict]: mi3 records read, empty if read_response is False
+        """
+        if self.command_hooks is None or not read_response \
+                or not isinstance(mi_cmd_to_write, str) or not mi_cmd_to_write:
+            return self.write_unhooked(mi_cmd_to_write, timeout_sec, raise_error_on_timeout,
+                                       read_response)
+        call = self.command_hooks.before(mi_cmd_to_write)
+        try:
+            response = self.write_unhooked(mi_cmd_to_write, timeout_sec, raise_error_on_timeout,
+                                           read_response)
+        except Exception as error:
+            self.command_hooks.after(call, error = error)
+            raise
+        self.command_hooks.after(call, response)
+        return response
+
+    def write_unhooked(
+        self,
+        mi_cmd_to_write: Union[str, List[str]],
+        timeout_sec: float = pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC,
+        raise_error_on_timeout: bool = True,
+        read_response: bool = True,
+    ) -> List[dict]:
+        """
+        Write commands to gdb without calling command hooks
+
+        Args:
+            mi_cmd_to_write (Union[str, List[str]]): Command or commands to write
+            timeout_sec (float, optional): Time in seconds to wait for a response.
+            Defaults to pygdbmi.constants.DEFAULT_GDB_TIMEOUT_SEC
+            raise_error_on_timeout (bool, optional): Whether or not to raise
+            pygdbmi.constants.GdbTimeoutError if nothing was received. Defaults to True
+            read_response (bool, optional): Whether or not to read the response. Defaults to True
+
+        Returns:
+            List[dict]: mi3 records read, empty if read_response is False
+        """
+        if self.reader is None:
+            return super().write(mi_cmd_to_write, timeout_sec, raise_error_on_timeout,
+                                 read_response)
+        super().write(mi_cmd_to_write, timeout_sec, raise_error_on_timeout, False)
+        if not read_response:
+            return []
+        return self.get_gdb_response(timeout_sec, raise_error_on_timeout)
+
+    def add_command_hook(
+        self,
+        pre: Optional[Callable[[CommandCall], None]] = None,
+        post: Optional[Callable[[CommandCall], None]] = None,
+    ):
+        """
+        Register hooks called around every command sent to gdb
+
+        pre is called with the CommandCall right before the command is written, post once its
+        result was read or waiting for it failed. Anything pre stores in call.context is kept
+        for post. Commands are not wrapped at all while no hooks are registered
+
+        Args:
+            pre (Optional[Callable[[CommandCall], None]], optional): Pre-command hook.
+            Defaults to None
+            post (Optional[Callable[[CommandCall], None]], optional): Post-command hook.
+            Defaults to None
+        """
+        if self.command_hooks is None:
+            self.command_hooks = CommandHooks()
+        if pre is not None:
+            self.command_hooks.pre.append(pre)
+        if post is not None:
+            self.command_hooks.post.append(post)
+
+    def remove_command_hook(
+        self,
+        pre: Optional[Callable[[CommandCall], None]] = None,
+        post: Optional[Callable[[CommandCall], None]] = None,
+    ):
+        """
+        Unregister hooks registered with add_command_hook
+
+        Args:
+            pre (Optional[Callable[[CommandCall], None]], optional): Pre-command hook.
+            Defaults to None
+            post (Optional[Callable[[CommandCall], None]], optional): Post-command hook.
+            Defaults to None
+        """
+        if self.command_hooks is None:
+            return
+        if pre is not None:
+            self.command_hooks.pre.remove(pre)
+        if post is not None:
+            self.command_hooks.post.remove(post)
+        if not self.command_hooks:
+            self.command_hooks = None
+
+    def stats(
+        self,
+    ) -> dict:
+        """
+        Summarize the statistics collected since the session started or reset_stats was called
+
+        Returns:
+            dict: Count, errors, bytes sent, bytes of memory moved and latency histogram of
+            each kind of command under "commands", and histograms of the time halts spent
+            capturing, in on_break, resuming and in total under "halts". Empty if the
+            session was created without collect_stats
+        """
+        if self.statistics is None:
+            return {}
+        return self.statistics.snapshot()
+
+    def reset_stats(
         self,
-        response: List[dict],
-        detailed: Optional[bool] = False,
     ):
         """
-        Log a mi3 response List[dict]
+        Discard the statistics collected so far
+        """
+        if self.statistics is not None:
+            self.remove_command_hook(post = self.statistics.record_command)
+            self.statistics = SessionStats()
+            self.add_command_hook(post = self.statistics.record_command)
+
+    def command_timeout(
+        self,
+        timeout: Optional[float] = None,
+    ) -> float:
+        """
+        Timeout to use for a command
 
         Args:
-            response (List[dict]): mi3 response to log
-            detailed (bool, optional): Whether or not to log full response. Defaults to False
+            timeout (Optional[float], optional): Timeout requested by the caller. Defaults to None
+
+        Returns:
+            float: timeout if given, otherwise derived from the round-trip time when
+            adaptive timeouts are enabled, otherwise 1.0
+        """
+        if timeout is not None:
+            return timeout
+        if self.rtt is not None:
+            return self.rtt.timeout()
+        return 1.0
+
+    def record_round_trip(
+        self,
+        elapsed: float,
+    ):
         """
-        if detailed:
-            print(response)
+        Update the round-trip time estimate and the timeouts derived from it
+
+        Args:
+            elapsed (float): Seconds from sending a command until its result was read
+        """
+        if self.rtt is None:
+            return
+        if self.reader is None:
+            # the result was only returned once no more output came for the drain window
+            elapsed -= self.io_manager.time_to_check_for_additional_output_sec
+            self.rtt.sample(max(elapsed, 0.0))
+            self.io_manager.time_to_check_for_additional_output_sec = self.rtt.drain_window()
         else:
-            for line in self.extract_payloads(self.filter_response(response)):
-                print(line)
+            self.rtt.sample(elapsed)
 
-    @staticmethod
-    def filter_response(
-        response: List[dict],
-        target_type: Optional[str] = "console",
+    def execute(
+        self,
+        command: str,
+        timeout: Optional[float] = None,
     ) -> List[dict]:
         """
-        Filter mi3 response down to only that of target_type
+        Send a command to gdb and wait for the records it caused
 
         Args:
-            response (List[dict]): mi3 response to filter
-            target_type (Optional[str], optional): mi3 type to filter for. Defaults to "console"
+            command (str): gdb command to send
+            timeout (Optional[float], optional): Amount of seconds to wait each time before
+            timing out. Commands given a timeout are expected to be slow and are not used
+            to estimate the round-trip time. Defaults to command_timeout()
 
         Returns:
-            List[dict]: Filtered mi3 response
+            List[dict]: Stream records of the command followed by its result record
         """
-        return [line for line in response if line['type'] == target_type]
+        sampled = timeout is None
+        timeout = self.command_timeout(timeout)
+        token = self.next_token()
+        call: Optional[CommandCall] = None
+        if self.command_hooks is not None:
+            call = self.command_hooks.before(command, token)
+        start = time.perf_counter()
+        try:
+            records = self.send_command(command, token, timeout)
+        except Exception as error:
+            if call is not None:
+                self.command_hooks.after(call, error = error)
+            raise
+        if sampled:
+            self.record_round_trip(time.perf_counter() - start)
+        if call is not None:
+            self.command_hooks.after(call, records)
+        return records
 
-    @staticmethod
-    def extract_payloads(
-        response: List[dict],
-    ) -> List[str]:
+    def send_command(
+        self,
+        command: str,
+        token: int,
+        timeout: float,
+    ) -> List[dict]:
+        """
+        Send a command to gdb with a token and wait for its result record
+
+        Args:
+            command (str): gdb command to send
+            token (int): Token to send the command with
+            timeout (float): Amount of seconds to wait each time before timing out
+
+        Returns:
+            List[dict]: Stream records of the command followed by its result record
+        """
+        if self.reader is not None:
+            self.reader.expect(token)
+            self.write(f"{token}{command}", read_response = False)
+            records = self.reader.wait(token, timeout)
+        else:
+            self.router.expect(token)
+            self.write(f"{token}{command}", read_response = False)
+            records = self.poll_results([token], timeout)[token]
+        return records
+
+    def poll_results(
+        self,
+        tokens: List[int],
+        timeout: float,
+    ) -> Dict[int, List[dict]]:
         """
-        Extract only the payloads of a mi3 response
+        Read gdb output until every claimed command completed, without a background reader
+
+        Records no command claimed, like captures and notifications, are queued for
+        get_gdb_response instead of being dropped
+
+        Args:
+            tokens (List[int]): Tokens of the commands, claimed with self.router
+            timeout (float): Amount of seconds to wait each time before timing out
+
+        Returns:
+            Dict[int, List[dict]]: Stream records of each command followed by its result record
+        """
+        results = {}
+        try:
+            while len(results) < len(tokens):
+                for line in super().get_gdb_response(timeout_sec = timeout):
+                    routed = self.router.route(line)
+                    if routed is None:
+                        continue
+                    token, records = routed
+                    if token is None:
+                        self.unclaimed.append(records[0])
+                    else:
+                        results[token] = records
+        except Exception:
+            self.router.abandon()
+            raise
+        return results
+
+    def write_batch(
+        self,
+        commands: List[str],
+        timeout: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        Pipeline commands to gdb and wait for all of their result records
+
+        Commands are written BATCH_SIZE at a time so neither pipe to gdb fills up while
+        the other side is blocked writing
 
         Args:
-            response (List[dict]): mi3 response to extract from
+            commands (List[str]): gdb commands to send
+            timeout (Optional[float], optional): Amount of seconds to wait each time before
+            timing out. Defaults to command_timeout()
 
         Returns:
-            List[str]: Extracted payloads
+            List[dict]: mi3 result record of each command, in order
         """
-        return [line["payload"] for line in response if line["payload"] != ""]
+        timeout = self.command_timeout(timeout)
+        results = []
+        for i in range(0, len(commands), self.BATCH_SIZE):
+            tokens = [self.next_token() for _ in commands[i:i + self.BATCH_SIZE]]
+            for token in tokens:
+                if self.reader is not None:
+                    self.reader.expect(token)
+                else:
+                    self.router.expect(token)
+            calls = None
+            if self.command_hooks is not None:
+                calls = {
+                    token: self.command_hooks.before(command, token)
+                    for token, command in zip(tokens, commands[i:])
+                }
+            self.write(
+                [f"{token}{command}" for token, command in zip(tokens, commands[i:])],
+                read_response = False
+            )
+            pending = {}
+            try:
+                if self.reader is not None:
+                    for token in tokens:
+                        pending[token] = self.reader.wait(token, timeout)[-1]
+                        if calls is not None:
+                            self.command_hooks.after(calls.pop(token), [pending[token]])
+                else:
+                    for token, records in self.poll_results(tokens, timeout).items():
+                        pending[token] = records[-1]
+                        if calls is not None:
+                            self.command_hooks.after(calls.pop(token), [pending[token]])
+            except Exception as error:
+                if calls is not None:
+                    for call in calls.values():
+                        self.command_hooks.after(call, error = error)
+                raise
+            results.extend(pending[token] for token in tokens)
+        return results
@@ -0,0 +1,107 @@
+"""Hooks called before and after every command sent to gdb"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+@dataclass
+class CommandCall:
+    """A command sent to gdb, as seen by command hooks"""
+    command: str
+    token: Optional[int]
+    start: float
+    end: Optional[float] = None
+    records: Optional[List[dict]] = None
+    error: Optional[BaseException] = None
+    context: dict = field(default_factory=lambda : {})
+
+    @property
+    def elapsed(
+        self,
+    ) -> Optional[float]:
+        """
+        Seconds from sending the command until its result was read
+
+        Returns:
+            Optional[float]: Elapsed seconds, None before the command finished
+        """
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def result_size(
+        self,
+    ) -> int:
+        """
+        Size of what gdb sent back for the command, computed when first asked for
+
+        Returns:
+            int: Total length of the payloads of the records of the command
+        """
+        if not self.records:
+            return 0
+        return sum(len(str(record['payload'])) for record in self.records
+                   if record['payload'] is not None)
+
+class CommandHooks:
+    """Pre-command and post-command hooks of a session"""
+    def __init__(
+        self,
+    ):
+        self.pre: List[Callable[[CommandCall], None]] = []
+        self.post: List[Callable[[CommandCall], None]] = []
+
+    def __len__(
+        self,
+    ) -> int:
+        """
+        Amount of registered hooks
+
+        Returns:
+            int: Amount of pre-command and post-command hooks
+        """
+        return len(self.pre) + len(self.post)
+
+    def before(
+        self,
+        command: str,
+        token: Optional[int] = None,
+    ) -> CommandCall:
+        """
+        Call the pre-command hooks for a command about to be sent
+
+        Args:
+            command (str): gdb command without token
+            token (Optional[int], optional): Token the command is sent with, None for
+            commands sent without one. Defaults to None
+
+        Returns:
+            CommandCall: Call to hand to after once the command finished
+        """
+        call = CommandCall(command, token, time.perf_counter())
+        for hook in self.pre:
+            hook(call)
+        # time spent in pre-command hooks is not part of the command
+        call.start = time.perf_counter()
+        return call
+
+    def after(
+        self,
+        call: CommandCall,
+        records: Optional[List[dict]] = None,
+        error: Optional[BaseException] = None,
+    ):
+        """
+        Call the post-command hooks for a command that finished
+
+        Args:
+            call (CommandCall): Call returned by before
+            records (Optional[List[dict]], optional): Records of the command, the result
+            record last. None if they were not read. Defaults to None
+            error (Optional[BaseException], optional): Exception raised while waiting for
+            the result. Defaults to None
+        """
+        call.end = time.perf_counter()
+        call.records = records
+        call.error = error
+        for hook in self.post:
+            hook(call)
@@ -0,0 +1,115 @@
+"""On-disk cache of the process layout found when attaching"""
+
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+SIGNATURE_SIZE = 0x100
+
+def build_id(
+    signature: bytes,
+) -> str:
+    """
+    Identify the build of a title by the start of its main module
+
+    Args:
+        signature (bytes): First SIGNATURE_SIZE bytes of the main module
+
+    Returns:
+        str: Hex digest identifying the build
+    """
+    return hashlib.sha1(signature).hexdigest()
+
+@dataclass
+class Layout:
+    """Process id and memory layout of a title build as found when attaching"""
+    title: str
+    build: str
+    process_id: int
+    main_base: int
+    main_max: int
+    heap_base: int
+    heap_max: int
+    stack_base: int
+    stack_max: int
+
+class LayoutCache:
+    """Layouts stored on disk by title and build, along with the last layout seen per console"""
+    def __init__(
+        self,
+        path: Optional[str] = None,
+    ):
+        """
+        Open a layout cache
+
+        Args:
+            path (Optional[str], optional): json file to store layouts in.
+            Defaults to ~/.cache/pygdbnx/layouts.json
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".cache", "pygdbnx", "layouts.json")
+        self.path = path
+        self.layouts = {}
+        self.consoles = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding = "utf-8") as cache_file:
+                contents = json.load(cache_file)
+            self.layouts = contents.get('layouts', {})
+            self.consoles = contents.get('consoles', {})
+
+    def get(
+        self,
+        title: str,
+        build: str,
+    ) -> Optional[Layout]:
+        """
+        Get the cached layout of a title build
+
+        Args:
+            title (str): Program id of the title
+            build (str): Build id as returned by build_id
+
+        Returns:
+            Optional[Layout]: Cached layout, None if the build was never seen
+        """
+        layout = self.layouts.get(f"{title}:{build}")
+        return None if layout is None else Layout(**layout)
+
+    def last(
+        self,
+        ip_address: str,
+    ) -> Optional[Layout]:
+        """
+        Get the layout last seen on a console, usable without connecting to it
+
+        Args:
+            ip_address (str): Local IP address of the console
+
+        Returns:
+            Optional[Layout]: Cached layout, None if nothing was attached to on the console
+        """
+        key = self.consoles.get(ip_address)
+        return None if key is None else Layout(**self.layouts[key])
+
+    def store(
+        self,
+        ip_address: str,
+        layout: Layout,
+    ):
+        """
+        Store the layout found on a console and write the cache to disk
+
+        Args:
+            ip_address (str): Local IP address of the console
+            layout (Layout): Layout found
+        """
+        key = f"{layout.title}:{layout.build}"
+        self.layouts[key] = dataclasses.asdict(layout)
+        self.consoles[ip_address] = key
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok = True)
+        with open(f"{self.path}.tmp", "w", encoding = "utf-8") as cache_file:
+            json.dump({'layouts': self.layouts, 'consoles': self.consoles}, cache_file, indent = 1)
+        os.replace(f"{self.path}.tmp", self.path)
@@ -0,0 +1,138 @@
+"""Loggers of each subsystem and a handler keeping recent records in memory"""
+
+import collections
+import logging
+import sys
+from typing import List, Optional, TextIO
+
+# without a NullHandler, warnings and failed analyses still reach stderr through
+# logging.lastResort when the application configured no logging at all
+logger = logging.getLogger("pygdbnx")
+# connecting, attaching and the responses of gdb to them
+connection_logger = logging.getLogger("pygdbnx.connection")
+# breakpoints being hit, logged on every hit so only at DEBUG level
+breakpoint_logger = logging.getLogger("pygdbnx.breakpoints")
+throttle_logger = logging.getLogger("pygdbnx.throttle")
+analysis_logger = logging.getLogger("pygdbnx.analysis")
+daemon_logger = logging.getLogger("pygdbnx.daemon")
+events_logger = logging.getLogger("pygdbnx.events")
+storage_logger = logging.getLogger("pygdbnx.storage")
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the latest records in memory, formatting them only when they are inspected"""
+    def __init__(
+        self,
+        capacity: int = 10000,
+        level: int = logging.NOTSET,
+    ):
+        """
+        Create a handler without any records
+
+        Args:
+            capacity (int, optional): Amount of records to keep, older ones are dropped.
+            Defaults to 10000
+            level (int, optional): Minimum level of records to keep. Defaults to logging.NOTSET
+        """
+        super().__init__(level)
+        self.buffer = collections.deque(maxlen = capacity)
+
+    def emit(
+        self,
+        record: logging.LogRecord,
+    ):
+        """
+        Keep a record
+
+        Args:
+            record (logging.LogRecord): Record to keep
+        """
+        self.buffer.append(record)
+
+    def records(
+        self,
+    ) -> List[logging.LogRecord]:
+        """
+        Get the kept records
+
+        Returns:
+            List[logging.LogRecord]: Records, oldest first
+        """
+        return list(self.buffer)
+
+    def lines(
+        self,
+    ) -> List[str]:
+        """
+        Format the kept records
+
+        Returns:
+            List[str]: Formatted records, oldest first
+        """
+        return [self.format(record) for record in self.records()]
+
+    def dump(
+        self,
+        stream: Optional[TextIO] = None,
+    ):
+        """
+        Write the kept records to a stream, e.g. after something went wrong
+
+        Args:
+            stream (Optional[TextIO], optional): Stream to write to. Defaults to sys.stderr
+        """
+        stream = sys.stderr if stream is None else stream
+        for line in self.lines():
+            stream.write(line + "\n")
+        stream.flush()
+
+    def clear(
+        self,
+    ):
+        """
+        Drop every kept record
+        """
+        self.buffer.clear()
+
+def add_ring_buffer(
+    capacity: int = 10000,
+    level: int = logging.DEBUG,
+) -> RingBufferHandler:
+    """
+    Keep the latest records of every pygdbnx logger in memory
+
+    Lowering the level makes the loggers create records for messages that are otherwise
+    skipped, including one for every breakpoint hit at logging.DEBUG
+
+    Args:
+        capacity (int, optional): Amount of records to keep. Defaults to 10000
+        level (int, optional): Minimum level of records to keep. Defaults to logging.DEBUG
+
+    Returns:
+        RingBufferHandler: The added handler
+    """
+    handler = RingBufferHandler(capacity, level)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    return handler
+
+def log_to_console(
+    level: int = logging.INFO,
+) -> logging.Handler:
+    """
+    Print the records of every pygdbnx logger to stderr, like the library used to print
+
+    Args:
+        level (int, optional): Minimum level of records to print, logging.DEBUG to include
+        every breakpoint hit. Defaults to logging.INFO
+
+    Returns:
+        logging.Handler: The added handler
+    """
+    handler = logging.StreamHandler()
+    handler.setLevel(level)
+    logger.addHandler(handler)
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    return handler
@@ -0,0 +1,203 @@
+"""Driving the sessions of many consoles from one asyncio event loop"""
+
+import asyncio
+import copy
+import dataclasses
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from .asyncgdbprocess import AsyncGdbProcess
+from .breakpoint import Breakpoint
+from .capture import CaptureEvent
+from .exceptions import GdbCommandException
+
+@dataclass
+class ConsoleEvent:
+    """Breakpoint event tagged with the console it happened on"""
+    console: str
+    event: CaptureEvent
+
+class SessionManager:
+    """Drives an AsyncGdbProcess per console and merges their events into one stream"""
+    def __init__(
+        self,
+        path_to_gdb: Optional[str] = "aarch64-none-elf-gdb.exe",
+        maxsize: int = 0,
+    ):
+        """
+        Create a manager without any consoles
+
+        Args:
+            path_to_gdb (Optional[str], optional): Path to gdb executable to run for each console.
+            Defaults to "aarch64-none-elf-gdb.exe"
+            maxsize (int, optional): Maximum amount of merged events not taken yet, the
+            sessions stop reading events while it is reached. 0 for no limit. Defaults to 0
+        """
+        self.path_to_gdb = path_to_gdb
+        self.sessions: Dict[str, AsyncGdbProcess] = {}
+        self.pumps: Dict[str, asyncio.Task] = {}
+        self.maxsize = maxsize
+        self.queue: asyncio.Queue = None
+
+    async def add_console(
+        self,
+        ip_address: str,
+        breakpoints: Optional[List[Breakpoint]] = None,
+        process_name: str = "Application",
+    ) -> AsyncGdbProcess:
+        """
+        Connect to a console and start forwarding its events
+
+        Args:
+            ip_address (str): Local IP address of the Nintendo Switch console
+            breakpoints (Optional[List[Breakpoint]], optional): Breakpoints to apply to
+            this console only. Defaults to None
+            process_name (str, optional): Name of switch process to attach to.
+            Defaults to "Application"
+
+        Returns:
+            AsyncGdbProcess: Session of the console
+        """
+        if self.queue is None:
+            self.queue = asyncio.Queue(self.maxsize)
+        session = await AsyncGdbProcess.create(ip_address, breakpoints, self.path_to_gdb,
+                                               process_name)
+        self.sessions[ip_address] = session
+        self.pumps[ip_address] = asyncio.ensure_future(self.pump(ip_address, session))
+        return session
+
+    async def add_consoles(
+        self,
+        ip_addresses: Iterable[str],
+        process_name: str = "Application",
+    ) -> List[AsyncGdbProcess]:
+        """
+        Connect to many consoles concurrently
+
+        Args:
+            ip_addresses (Iterable[str]): Local IP addresses of the consoles
+            process_name (str, optional): Name of switch process to attach to.
+            Defaults to "Application"
+
+        Returns:
+            List[AsyncGdbProcess]: Sessions of the consoles, in order
+        """
+        return list(await asyncio.gather(
+            *(self.add_console(ip_address, process_name = process_name)
+              for ip_address in ip_addresses)
+        ))
+
+    async def pump(
+        self,
+        ip_address: str,
+        session: AsyncGdbProcess,
+    ):
+        """
+        Forward the events of one session to the merged stream
+
+        Args:
+            ip_address (str): Console of the session
+            session (AsyncGdbProcess): Session to forward events of
+        """
+        try:
+            async for event in session.events():
+                await self.queue.put(ConsoleEvent(ip_address, event))
+        except GdbCommandException:
+            # gdb exited while an event was being captured
+            pass
+        finally:
+            await self.queue.put(ConsoleEvent(ip_address, None))
+
+    async def broadcast_breakpoints(
+        self,
+        bkpts: List[Breakpoint],
+        consoles: Optional[Iterable[str]] = None,
+    ) -> Dict[str, List[Breakpoint]]:
+        """
+        Install copies of the same breakpoints on many consoles
+
+        Each console gets its own copies, so hit counts and stored_information are kept per
+        console while callbacks are shared
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to install
+            consoles (Optional[Iterable[str]], optional): Consoles to install them on,
+            None for every console. Defaults to None
+
+        Returns:
+            Dict[str, List[Breakpoint]]: Installed copies by console
+        """
+        consoles = list(self.sessions if consoles is None else consoles)
+        # deepcopy would also copy whatever the callbacks are bound to
+        copies = {
+            console: [
+                dataclasses.replace(bkpt,
+                                    stored_information = copy.deepcopy(bkpt.stored_information))
+                for bkpt in bkpts
+            ]
+            for console in consoles
+        }
+        await asyncio.gather(
+            *(self.sessions[console].add_breakpoints(copies[console]) for console in consoles)
+        )
+        return copies
+
+    async def resume(
+        self,
+        console: str,
+    ):
+        """
+        Resume one console
+
+        Args:
+            console (str): IP address of the console
+        """
+        await self.sessions[console].resume()
+
+    async def resume_all(
+        self,
+    ):
+        """
+        Resume every console
+        """
+        await asyncio.gather(*(session.resume() for session in self.sessions.values()))
+
+    async def events(
+        self,
+    ) -> AsyncIterator[ConsoleEvent]:
+        """
+        Iterate over the events of every console until all of their gdb processes exit
+
+        As with AsyncGdbProcess.events, a console halted at a breakpoint stays halted
+        until it is resumed
+
+        Yields:
+            ConsoleEvent: Event of each breakpoint hit, tagged with its console
+        """
+        while self.pumps:
+            console_event: ConsoleEvent = await self.queue.get()
+            if console_event.event is None:
+                self.pumps.pop(console_event.console, None)
+                self.sessions.pop(console_event.console, None)
+                continue
+            yield console_event
+
+    async def remove_console(
+        self,
+        console: str,
+    ):
+        """
+        Exit the gdb process of a console
+
+        Args:
+            console (str): IP address of the console
+        """
+        await self.sessions[console].exit()
+
+    async def exit(
+        self,
+    ):
+        """
+        Exit the gdb process of every console
+        """
+        await asyncio.gather(*(session.exit() for session in list(self.sessions.values())))
@@ -0,0 +1,258 @@
+"""Fast parsing of the mi3 records pygdbnx sees constantly"""
+
+import re
+from typing import Optional, Tuple, Union
+from pygdbmi import gdbmiparser
+try:
+    # pygdbmi >= 0.11 unescapes every c-string, stream payloads included
+    from pygdbmi.gdbescapes import unescape as gdb_unescape
+except ImportError:
+    gdb_unescape = None
+
+_STREAM_TYPES = {"~": "console", "&": "log", "@": "target"}
+_STREAM_RE = re.compile(r'[~&@]"(.*)"', re.DOTALL)
+_RECORD_RE = re.compile(r"(\d*)([\^*=])([\w-]+)(?:,(.*))?$", re.DOTALL)
+_MEMORY_RE = re.compile(
+    r'memory=\[\{begin="(0x[0-9a-f]+)",offset="(0x[0-9a-f]+)",'
+    r'end="(0x[0-9a-f]+)",contents="([0-9a-f]*)"\}\]$'
+)
+_REGISTER_VALUES_RE = re.compile(
+    r'register-values=\[((?:\{number="\d+",value="(?:[^"\\]|\\.)*"\},?)*)\]$'
+)
+_REGISTER_VALUE_RE = re.compile(r'\{number="(\d+)",value="((?:[^"\\]|\\.)*)"\}')
+_KEY_RE = re.compile(r"([\w-]+)=")
+_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+class MiRecord:
+    """Parsed mi3 record, indexable like the dicts pygdbmi returns"""
+    __slots__ = ("type", "message", "payload", "token", "stream")
+
+    def __init__(
+        self,
+        record_type: str,
+        message: Optional[str],
+        payload: Union[dict, str, None],
+        token: Optional[int] = None,
+    ):
+        self.type = record_type
+        self.message = message
+        self.payload = payload
+        self.token = token
+        self.stream = "stdout"
+
+    def __getitem__(
+        self,
+        key: str,
+    ):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError) as error:
+            raise KeyError(key) from error
+
+    def __setitem__(
+        self,
+        key: str,
+        value,
+    ):
+        setattr(self, key, value)
+
+    def __contains__(
+        self,
+        key: str,
+    ) -> bool:
+        return key in self.__slots__
+
+    def get(
+        self,
+        key: str,
+        default = None,
+    ):
+        """
+        Get a field of the record, dict style
+
+        Args:
+            key (str): Field to get
+            default (Any, optional): Value returned for unknown fields. Defaults to None
+
+        Returns:
+            Any: Value of the field
+        """
+        return getattr(self, key, default)
+
+    def __repr__(
+        self,
+    ) -> str:
+        return (f"MiRecord(type={self.type!r}, message={self.message!r}, "
+                f"payload={self.payload!r}, token={self.token!r})")
+
+def _unescape(
+    text: str,
+) -> str:
+    """
+    Unescape the contents of a c-string in results the way the installed pygdbmi does
+
+    Args:
+        text (str): Contents of an mi3 c-string
+
+    Returns:
+        str: Unescaped string
+    """
+    if "\\" not in text:
+        return text
+    if gdb_unescape is not None:
+        return gdb_unescape(text)
+    # older versions drop the backslash of every escaped character
+    return _ESCAPE_RE.sub(r"\1", text)
+
+def _parse_value(
+    text: str,
+    pos: int,
+) -> Tuple[Union[dict, list, str], int]:
+    """
+    Parse an mi3 value (c-string, tuple or list)
+
+    Args:
+        text (str): Text being parsed
+        pos (int): Position of the value in text
+
+    Returns:
+        Tuple[Union[dict, list, str], int]: Parsed value and the position right after it
+    """
+    char = text[pos]
+    if char == '"':
+        match = _STRING_RE.match(text, pos)
+        if match is None:
+            raise ValueError(f"Unterminated string at {pos}")
+        return _unescape(match.group(1)), match.end()
+    if char == "{":
+        return _parse_results(text, pos + 1, "}")
+    if char == "[":
+        values = []
+        pos += 1
+        while text[pos] != "]":
+            if text[pos] == ",":
+                pos += 1
+                continue
+            key = _KEY_RE.match(text, pos)
+            if key is not None:
+                # lists of results lose their keys, same as with pygdbmi
+                pos = key.end()
+            value, pos = _parse_value(text, pos)
+            values.append(value)
+        return values, pos + 1
+    raise ValueError(f"Unexpected {char!r} at {pos}")
+
+def _parse_results(
+    text: str,
+    pos: int,
+    end: Optional[str],
+) -> Tuple[dict, int]:
+    """
+    Parse comma separated key=value results
+
+    Args:
+        text (str): Text being parsed
+        pos (int): Position of the first result
+        end (Optional[str]): Character closing the results, None for the end of text
+
+    Returns:
+        Tuple[dict, int]: Parsed results and the position right after them
+    """
+    results = {}
+    length = len(text)
+    while True:
+        if pos >= length:
+            if end is not None:
+                raise ValueError(f"Missing {end!r}")
+            return results, pos
+        if text[pos] == end:
+            return results, pos + 1
+        if text[pos] == ",":
+            pos += 1
+            continue
+        key = _KEY_RE.match(text, pos)
+        if key is None:
+            raise ValueError(f"Expected key at {pos}")
+        value, pos = _parse_value(text, key.end())
+        name = key.group(1)
+        if name not in results:
+            results[name] = value
+        elif isinstance(results[name], list):
+            results[name].append(value)
+        else:
+            results[name] = [results[name], value]
+
+def _parse_payload(
+    payload: str,
+) -> dict:
+    """
+    Parse the results of a result or async record, with shortcuts for memory and
+    register reads
+
+    Args:
+        payload (str): Text after the first comma of the record
+
+    Returns:
+        dict: Parsed results
+    """
+    if payload.startswith("memory="):
+        match = _MEMORY_RE.match(payload)
+        if match is not None:
+            begin, offset, end, contents = match.groups()
+            return {'memory': [{'begin': begin, 'offset': offset, 'end': end,
+                                'contents': contents}]}
+    elif payload.startswith("register-values="):
+        match = _REGISTER_VALUES_RE.match(payload)
+        if match is not None:
+            return {'register-values': [
+                {'number': number, 'value': _unescape(value)}
+                for number, value in _REGISTER_VALUE_RE.findall(match.group(1))
+            ]}
+    return _parse_results(payload, 0, None)[0]
+
+def parse_response(
+    line: str,
+) -> Union[MiRecord, dict]:
+    """
+    Parse a line of mi3 output
+
+    Console, result and async records are parsed here, anything unusual is handed to
+    pygdbmi's general purpose parser
+
+    Args:
+        line (str): Line of gdb output, without the newline
+
+    Returns:
+        Union[MiRecord, dict]: Parsed record
+    """
+    if not line:
+        return gdbmiparser.parse_response(line)
+    first = line[0]
+    if first in _STREAM_TYPES:
+        match = _STREAM_RE.match(line)
+        if match is not None:
+            payload = match.group(1)
+            if gdb_unescape is not None and "\\" in payload:
+                payload = gdb_unescape(payload)
+            return MiRecord(_STREAM_TYPES[first], None, payload)
+        return gdbmiparser.parse_response(line)
+    match = _RECORD_RE.match(line)
+    if match is None:
+        return gdbmiparser.parse_response(line)
+    token, kind, message, payload = match.groups()
+    try:
+        if payload is None:
+            if kind != "^":
+                return gdbmiparser.parse_response(line)
+            parsed = None
+        else:
+            parsed = _parse_payload(payload)
+    except (ValueError, IndexError):
+        return gdbmiparser.parse_response(line)
+    return MiRecord(
+        "result" if kind == "^" else "notify",
+        message,
+        parsed,
+        int(token) if token else None,
+    )
@@ -0,0 +1,232 @@
+"""Read-only stand-in for GdbProcess served from a snapshot instead of a console"""
+
+import ast
+import operator
+import re
+from typing import Any, Dict, Optional, Union
+
+try:
+    import capstone
+except ImportError:
+    capstone = None
+
+from .breakpoint import Breakpoint
+from .capture import is_float_register
+from .exceptions import GdbCommandException
+from .gdbprocess import GdbProcess
+from .session import SwitchSession
+from .snapshot import Snapshot
+from .snapshotstore import StoredSnapshot
+
+OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.USub: operator.neg,
+    ast.Invert: operator.invert,
+}
+# names gdb accepts for registers `info registers` lists under another name
+REGISTER_ALIASES = {"fp": "x29", "lr": "x30"}
+W_REGISTER = re.compile(r"w(\d+|sp)$")
+
+class OfflineGdbProcess(SwitchSession):
+    """Serves the read helpers of GdbProcess from a snapshot, at memory speed"""
+    # helpers of GdbProcess that only build on read_memory, read_register and write
+    read_int = GdbProcess.read_int
+    read_bytes = GdbProcess.read_bytes
+    read_float = GdbProcess.read_float
+    write_int = GdbProcess.write_int
+    write_bytes = GdbProcess.write_bytes
+    write_float = GdbProcess.write_float
+    write_register = GdbProcess.write_register
+    read_current_instruction = GdbProcess.read_current_instruction
+    read_program_counter = GdbProcess.read_program_counter
+    read_return_address = GdbProcess.read_return_address
+    capture = GdbProcess.capture
+
+    def __init__(
+        self,
+        path: Union[str, StoredSnapshot],
+    ):
+        """
+        Open a snapshot written by GdbProcess.dump_snapshot
+
+        Args:
+            path (Union[str, StoredSnapshot]): Snapshot file, or snapshot opened from a
+            SnapshotStore
+        """
+        self.snapshot = Snapshot(path) if isinstance(path, str) else path
+        metadata = self.snapshot.metadata
+        self.init_session(metadata.get('ip_address'))
+        self.process_id = metadata['process_id']
+        self.title = metadata['title']
+        self.main_base, self.main_max = metadata['main_base'], metadata['main_max']
+        self.heap_base, self.heap_max = metadata['heap_base'], metadata['heap_max']
+        self.stack_base, self.stack_max = metadata['stack_base'], metadata['stack_max']
+        self.registers: Dict[str, Union[int, float]] = metadata['registers']
+        self.disassembler = None
+
+    def read_memory(
+        self,
+        address: int,
+        size: int,
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ) -> bytes:
+        """
+        Read a range of memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+
+        Returns:
+            bytes: Bytes read from address
+        """
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        return self.snapshot.read(address, size)
+
+    def read_register(
+        self,
+        register: str,
+    ) -> Union[int, float]:
+        """
+        Read value of register as it was when the snapshot was taken, the same way
+        GdbProcess.read_register reads it from a console
+
+        Args:
+            register (str): Register to read from
+
+        Returns:
+            Union[int, float]: Value read from register, unsigned unless it is a floating
+            point register
+        """
+        name = REGISTER_ALIASES.get(register, register)
+        mask = 0xFFFFFFFFFFFFFFFF
+        match = W_REGISTER.match(name)
+        if match is not None:
+            # the lower half of the x register, or of sp for wsp
+            name = "sp" if match.group(1) == "sp" else f"x{match.group(1)}"
+            mask = 0xFFFFFFFF
+        if name not in self.registers:
+            raise GdbCommandException(f"Register {register} was not captured")
+        value = self.registers[name]
+        if is_float_register(register):
+            return float(value)
+        return int(value) & mask
+
+    def read_instruction(
+        self,
+        address: int,
+        offset_main: Optional[bool] = False,
+        offset_heap: Optional[bool] = False,
+    ) -> str:
+        """
+        Disassemble instruction at address, requires capstone
+
+        Args:
+            address (int): Address to read from
+            offset_main (bool, optional): Whether or not to offset address by
+            self.main_base. Defaults to False
+            offset_heap (bool, optional): Whether or not to offset address by
+            self.heap_base. Defaults to False
+
+        Returns:
+            str: Instruction information, formatted like gdb's
+        """
+        if capstone is None:
+            raise ImportError("capstone is required to disassemble instructions offline")
+        if offset_main:
+            address += self.main_base
+        elif offset_heap:
+            address += self.heap_base
+        if self.disassembler is None:
+            self.disassembler = capstone.Cs(capstone.CS_ARCH_ARM64, capstone.CS_MODE_ARM)
+        for instruction in self.disassembler.disasm(self.read_memory(address, 4), address, 1):
+            return f"\t{instruction.mnemonic}\t{instruction.op_str}"
+        return "\t.inst\t0x" + self.read_memory(address, 4)[::-1].hex()
+
+    def evaluate(
+        self,
+        expression: str,
+    ) -> int:
+        """
+        Evaluate an integer expression of registers and constants (e.g. "$sp + 0x18")
+
+        Args:
+            expression (str): Expression to evaluate
+
+        Returns:
+            int: Value of the expression
+        """
+        def evaluate_node(node: ast.AST) -> int:
+            if isinstance(node, ast.Expression):
+                return evaluate_node(node.body)
+            if isinstance(node, ast.Constant) and isinstance(node.value, int):
+                return node.value
+            if isinstance(node, ast.Name) and node.id.startswith("REGISTER_"):
+                return int(self.read_register(node.id[len("REGISTER_"):]))
+            if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+                return OPERATORS[type(node.op)](evaluate_node(node.left), evaluate_node(node.right))
+            if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+                return OPERATORS[type(node.op)](evaluate_node(node.operand))
+            raise GdbCommandException(f"Failed to evaluate {expression}: unsupported offline")
+
+        try:
+            tree = ast.parse(re.sub(r"\$(\w+)", r"REGISTER_\1", expression), mode = "eval")
+        except SyntaxError as error:
+            raise GdbCommandException(f"Failed to evaluate {expression}") from error
+        return evaluate_node(tree)
+
+    def write(
+        self,
+        mi_cmd_to_write: Any,
+        *args,
+        **kwargs,
+    ):
+        """
+        Snapshots are read-only, writing always fails
+
+        Args:
+            mi_cmd_to_write (Any): Command that would have been written
+        """
+        raise GdbCommandException(f"Can not run {mi_cmd_to_write} on a read-only snapshot")
+
+    def replay(
+        self,
+        bkpt: Breakpoint,
+    ) -> Any:
+        """
+        Call the on_break callback of a breakpoint as if it was hit when the snapshot was taken
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to call on_break of
+
+        Returns:
+            Any: What on_break returned
+        """
+        bkpt.times_hit += 1
+        bkpt.times_handled += 1
+        return bkpt.on_break(self, bkpt)
+
+    def close(
+        self,
+    ):
+        """
+        Close the snapshot
+        """
+        self.snapshot.close()
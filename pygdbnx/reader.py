@@ -0,0 +1,217 @@
+"""Background reading of gdb output"""
+
+import collections
+import os
+import threading
+import time
+from typing import IO, Dict, List, Optional
+from pygdbmi import gdbmiparser
+import pygdbmi.constants
+
+from .miparser import parse_response
+from .router import RecordRouter
+
+def make_blocking(
+    file_obj: IO,
+):
+    """
+    Undo pygdbmi making a pipe non-blocking so a thread can block reading it
+
+    Args:
+        file_obj (IO): Pipe to make blocking
+    """
+    if os.name == "nt":
+        # pylint: disable=import-outside-toplevel
+        import msvcrt
+        from ctypes import byref, windll, wintypes
+        handle = msvcrt.get_osfhandle(file_obj.fileno())
+        windll.kernel32.SetNamedPipeHandleState(handle, byref(wintypes.DWORD(0)), None, None)
+    else:
+        os.set_blocking(file_obj.fileno(), True)
+
+class MiReader(threading.Thread):
+    """Drains gdb output on a thread of its own, parsing and routing records as lines arrive"""
+    def __init__(
+        self,
+        stdout: IO[bytes],
+        stderr: Optional[IO[bytes]] = None,
+    ):
+        """
+        Create a reader for the output pipes of a gdb process
+
+        Args:
+            stdout (IO[bytes]): stdout pipe of gdb
+            stderr (Optional[IO[bytes]], optional): stderr pipe of gdb, drained by
+            a second thread so gdb never blocks on it. Defaults to None
+        """
+        super().__init__(daemon = True)
+        self.stdout = stdout
+        self.stderr = stderr
+        self.router = RecordRouter()
+        self.condition = threading.Condition()
+        self.results: Dict[int, List[dict]] = {}
+        self.notifications: "collections.deque[dict]" = collections.deque()
+        self.first_arrival = time.perf_counter()
+        self.arrival = self.first_arrival
+        self.closed = False
+
+    def start(
+        self,
+    ):
+        """
+        Start reading stdout, and stderr if given
+        """
+        make_blocking(self.stdout)
+        if self.stderr is not None:
+            make_blocking(self.stderr)
+            threading.Thread(target = self.drain_stderr, daemon = True).start()
+        super().start()
+
+    def run(
+        self,
+    ):
+        """
+        Read gdb stdout until it closes
+        """
+        incomplete = b""
+        try:
+            while True:
+                data = os.read(self.stdout.fileno(), 65536)
+                if not data:
+                    break
+                *lines, incomplete = (incomplete + data).split(b"\n")
+                records = [
+                    parse_response(line)
+                    for line in (raw.decode(errors = "replace").rstrip("\r") for raw in lines)
+                    if line and not gdbmiparser.response_is_finished(line)
+                ]
+                if records:
+                    self.route(records)
+        except OSError:
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+
+    def drain_stderr(
+        self,
+    ):
+        """
+        Read gdb stderr until it closes, queueing its lines as unclaimed output records
+        """
+        try:
+            while True:
+                data = os.read(self.stderr.fileno(), 65536)
+                if not data:
+                    break
+                with self.condition:
+                    self.mark_arrival()
+                    self.notifications.append({
+                        'type': "output",
+                        'message': None,
+                        'payload': data.decode(errors = "replace"),
+                        'stream': "stderr",
+                    })
+                    self.condition.notify_all()
+        except OSError:
+            pass
+
+    def route(
+        self,
+        records: List[dict],
+    ):
+        """
+        Route parsed records and wake up anything waiting for them
+
+        Args:
+            records (List[dict]): Parsed mi3 records in the order gdb sent them
+        """
+        with self.condition:
+            for record in records:
+                record['stream'] = "stdout"
+                routed = self.router.route(record)
+                if routed is None:
+                    continue
+                token, routed_records = routed
+                if token is None:
+                    self.mark_arrival()
+                    self.notifications.append(routed_records[0])
+                else:
+                    self.results[token] = routed_records
+            self.condition.notify_all()
+
+    def mark_arrival(
+        self,
+    ):
+        """
+        Remember when the first of the queued unclaimed records arrived, called with
+        the condition held before queueing a record
+        """
+        if not self.notifications:
+            self.first_arrival = time.perf_counter()
+
+    def expect(
+        self,
+        token: int,
+    ):
+        """
+        Claim the records of a command before it is sent
+
+        Args:
+            token (int): Token the command will be sent with
+        """
+        with self.condition:
+            self.router.expect(token)
+
+    def wait(
+        self,
+        token: int,
+        timeout: float,
+    ) -> List[dict]:
+        """
+        Wait for the records of a claimed command
+
+        Args:
+            token (int): Token the command was sent with
+            timeout (float): Seconds to wait before timing out
+
+        Returns:
+            List[dict]: Stream records of the command followed by its result record
+        """
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: token in self.results or self.closed,
+                timeout
+            ) or token not in self.results:
+                raise pygdbmi.constants.GdbTimeoutError(
+                    f"Did not get a result for token {token} after {timeout} seconds"
+                )
+            return self.results.pop(token)
+
+    def get(
+        self,
+        timeout: float,
+    ) -> List[dict]:
+        """
+        Wait for unclaimed records and take every one that has arrived
+
+        The time.perf_counter() time the first of them arrived is left in self.arrival
+
+        Args:
+            timeout (float): Seconds to wait for the first record
+
+        Returns:
+            List[dict]: Unclaimed records, empty if timed out
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not self.notifications and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            records = list(self.notifications)
+            self.notifications.clear()
+            self.arrival = self.first_arrival
+            return records
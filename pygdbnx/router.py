@@ -0,0 +1,71 @@
+"""Matching of mi3 records to the commands that caused them"""
+
+import collections
+from typing import List, Optional, Tuple
+
+from .capture import CAPTURE_PREFIX
+
+STREAM_TYPES = ("console", "log", "target")
+
+class RecordRouter:
+    """Assigns mi3 records to in-flight commands by token, independent of how gdb is read"""
+    def __init__(
+        self,
+    ):
+        self.pending: "collections.OrderedDict[int, List[dict]]" = collections.OrderedDict()
+
+    def expect(
+        self,
+        token: int,
+    ):
+        """
+        Register a command that was sent to gdb with token
+
+        Args:
+            token (int): Token the command is sent with
+        """
+        self.pending[token] = []
+
+    def route(
+        self,
+        record: dict,
+    ) -> Optional[Tuple[Optional[int], List[dict]]]:
+        """
+        Route a parsed mi3 record
+
+        gdb runs commands in order, so stream records belong to the oldest in-flight command
+        until its result record arrives. Capture records and async records are never claimed.
+
+        Args:
+            record (dict): Parsed mi3 record
+
+        Returns:
+            Optional[Tuple[Optional[int], List[dict]]]: (token, records) once a command has
+            completed, (None, [record]) for an unclaimed record, None if the record was kept
+            for an in-flight command
+        """
+        if record['type'] == "result" and record['token'] in self.pending:
+            records = self.pending.pop(record['token'])
+            records.append(record)
+            return record['token'], records
+        if (
+            self.pending
+            and record['type'] in STREAM_TYPES
+            and not str(record['payload']).startswith(CAPTURE_PREFIX)
+        ):
+            next(iter(self.pending.values())).append(record)
+            return None
+        return None, [record]
+
+    def abandon(
+        self,
+    ) -> List[int]:
+        """
+        Forget every in-flight command, e.g. because gdb exited
+
+        Returns:
+            List[int]: Tokens of the forgotten commands
+        """
+        tokens = list(self.pending)
+        self.pending.clear()
+        return tokens
@@ -0,0 +1,90 @@
+"""Round-trip time estimation for deriving timeouts"""
+
+from typing import Optional
+
+class RttEstimator:
+    """Smoothed round-trip time and its variation, updated like TCP's retransmission timer"""
+    def __init__(
+        self,
+        initial_timeout: float = 1.0,
+        initial_drain: float = 0.2,
+        min_timeout: float = 1.0,
+        max_timeout: float = 30.0,
+        min_drain: float = 0.01,
+        max_drain: float = 0.2,
+        alpha: float = 1 / 8,
+        beta: float = 1 / 4,
+        k: float = 4.0,
+    ):
+        """
+        Create an estimator without any samples
+
+        Args:
+            initial_timeout (float, optional): Command timeout before the first sample.
+            Defaults to 1.0
+            initial_drain (float, optional): Drain window before the first sample. Defaults to 0.2
+            min_timeout (float, optional): Lower bound of command timeouts. Defaults to 1.0
+            max_timeout (float, optional): Upper bound of command timeouts. Defaults to 30.0
+            min_drain (float, optional): Lower bound of drain windows. Defaults to 0.01
+            max_drain (float, optional): Upper bound of drain windows. Defaults to 0.2
+            alpha (float, optional): Gain of the smoothed round-trip time. Defaults to 1/8
+            beta (float, optional): Gain of the round-trip time variation. Defaults to 1/4
+            k (float, optional): Variations added to the smoothed round-trip time for
+            timeouts. Defaults to 4.0
+        """
+        self.initial_timeout = initial_timeout
+        self.initial_drain = initial_drain
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_drain = min_drain
+        self.max_drain = max_drain
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.samples = 0
+
+    def sample(
+        self,
+        rtt: float,
+    ):
+        """
+        Update the estimate with a measured round-trip time
+
+        Args:
+            rtt (float): Seconds between sending a command and receiving its result
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+        self.samples += 1
+
+    def timeout(
+        self,
+    ) -> float:
+        """
+        Time to wait for the result of a command before giving up
+
+        Returns:
+            float: Timeout in seconds
+        """
+        if self.srtt is None:
+            return self.initial_timeout
+        return min(max(self.srtt + self.k * self.rttvar, self.min_timeout), self.max_timeout)
+
+    def drain_window(
+        self,
+    ) -> float:
+        """
+        Time to keep reading after output arrived, in case more of the same response follows
+
+        Returns:
+            float: Drain window in seconds
+        """
+        if self.srtt is None:
+            return self.initial_drain
+        return min(max(self.srtt + 2 * self.rttvar, self.min_drain), self.max_drain)
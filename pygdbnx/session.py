@@ -0,0 +1,659 @@
+"""State and gdb command building shared by GdbProcess and AsyncGdbProcess"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+from .breakpoint import Breakpoint, Watchpoint
+from .capture import capture_printf, is_float_register
+from .exceptions import GdbCommandException
+from .layoutcache import Layout
+from .logs import connection_logger
+
+REGISTER_LINE = re.compile(r"(\w+)\s+(0x[0-9a-fA-F]+)")
+REGION_LINE = re.compile(r"(0x[0-9a-fA-F]+) - (0x[0-9a-fA-F]+)\s*(\S*)")
+
+
+class SwitchSession:
+    """State of a gdb session attached to a switch process, independent of how gdb is driven"""
+    BATCH_SIZE = 256
+    CONNECTION_LOST_MESSAGES = ("Remote connection closed", "Remote communication error",
+                                "Remote target disconnected")
+    INT_SIZES = {"b": 1, "h": 2, "w": 4, "g": 8}
+
+    def init_session(
+        self,
+        ip_address: str,
+    ):
+        """
+        Initialize the state of a session that has not connected yet
+
+        Args:
+            ip_address (str): Local IP address of the Nintendo Switch console
+        """
+        self.ip_address = ip_address
+        self.active_breakpoints: List[Breakpoint] = []
+        self.breakpoints_by_no: Dict[int, Breakpoint] = {}
+        self.captures: Dict[int, Breakpoint] = {}
+        self.process_id: int = None
+        self.title: str = None
+        self.main_base: int = None
+        self.main_max: int = None
+        self.heap_base: int = None
+        self.heap_max: int = None
+        self.stack_base: int = None
+        self.stack_max: int = None
+        self.capture_key = 1
+        self.token = 1
+        self.hit_no = 0
+
+    def next_hit_no(
+        self,
+    ) -> int:
+        """
+        Number the next breakpoint event of the session
+
+        Returns:
+            int: Hit number, counting every event of every breakpoint from 1
+        """
+        self.hit_no += 1
+        return self.hit_no
+
+    def next_token(
+        self,
+    ) -> int:
+        """
+        Reserve a token to match a mi3 command with its result record
+
+        Returns:
+            int: Reserved token
+        """
+        token = self.token
+        self.token += 1
+        return token
+
+    def insert_command(
+        self,
+        bkpt: Breakpoint,
+    ) -> str:
+        """
+        Build the mi3 command that inserts a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to insert
+
+        Returns:
+            str: mi3 command
+        """
+        if isinstance(bkpt, Watchpoint):
+            watch_flag = {"awatch": "-a ", "rwatch": "-r ", "watch": ""}[bkpt.watch_type]
+            return f"-break-watch {watch_flag}*0x{bkpt.address:X}"
+        location = f"*0x{self.main_base + (bkpt.address & 0xFFFFFFFF):X}"
+        if bkpt.temporary:
+            location = f"-t {location}"
+        if bkpt.auto_continue and not bkpt.temporary:
+            fmt, args = capture_printf(bkpt)
+            return " ".join(
+                [f"-dprintf-insert {location}"] + [self.mi_quote(item) for item in [fmt] + args]
+            )
+        return f"-break-insert {location}"
+
+    def insert_commands(
+        self,
+        bkpts: List[Breakpoint],
+    ) -> List[str]:
+        """
+        Key the captures of breakpoints and build the mi3 commands that insert them
+
+        gdb numbers breakpoints itself, so auto-continue breakpoints tag their capture records
+        with a capture key of their own that is known before they are inserted
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints to insert
+
+        Returns:
+            List[str]: mi3 commands, one per breakpoint
+        """
+        for bkpt in bkpts:
+            if isinstance(bkpt, Watchpoint) and bkpt.auto_continue:
+                raise ValueError(f"Watchpoint \"{bkpt.name}\" cannot auto-continue")
+        for bkpt in bkpts:
+            if bkpt.auto_continue and self.captures.get(bkpt.capture_key) is not bkpt:
+                bkpt.capture_key = self.capture_key
+                self.captures[bkpt.capture_key] = bkpt
+                self.capture_key += 1
+        return [self.insert_command(bkpt) for bkpt in bkpts]
+
+    def register_breakpoints(
+        self,
+        bkpts: List[Breakpoint],
+        results: List[dict],
+        restore: bool = False,
+    ) -> Tuple[List[str], Optional[GdbCommandException]]:
+        """
+        Register inserted breakpoints as active and build the commands that configure them
+
+        Args:
+            bkpts (List[Breakpoint]): Breakpoints passed to insert_commands
+            results (List[dict]): mi3 result records of the insert commands
+            restore (bool, optional): Whether or not the breakpoints were installed before,
+            see setup_commands. Defaults to False
+
+        Returns:
+            Tuple[List[str], Optional[GdbCommandException]]: gdb commands to send next, and
+            the exception to raise after sending them if an insert failed
+        """
+        commands = []
+        error = None
+        inserted = []
+        for bkpt, result in zip(bkpts, results):
+            if result['message'] == "error":
+                bkpt.bkpt_no = None
+                if error is None:
+                    error = GdbCommandException(f"Failed to add breakpoint \"{bkpt.name}\": "
+                                                f"{result['payload']['msg']}")
+                continue
+            # bkpt, wpt, hw-awpt, ... depending on the kind of breakpoint
+            bkpt.bkpt_no = int(next(iter(result['payload'].values()))['number'])
+            self.breakpoints_by_no[bkpt.bkpt_no] = bkpt
+            inserted.append(bkpt)
+        bkpts = inserted
+        self.active_breakpoints.extend(bkpts)
+        for bkpt in bkpts:
+            commands.extend(self.setup_commands(bkpt, restore))
+        inactive = [bkpt for bkpt in bkpts if not bkpt.active]
+        commands.extend(self.toggle_commands("disable", inactive))
+        return commands, error
+
+    def setup_commands(
+        self,
+        bkpt: Breakpoint,
+        restore: bool = False,
+    ) -> List[str]:
+        """
+        Build the gdb commands that configure an inserted breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to configure
+            restore (bool, optional): Whether or not the breakpoint was installed before, e.g.
+            before reconnecting, so its remaining ignore count and hit budget carry over
+            instead of starting over. Defaults to False
+
+        Returns:
+            List[str]: gdb commands
+        """
+        if not restore:
+            bkpt.ignore_remaining = bkpt.ignore_count
+        commands = []
+        if bkpt.auto_continue and bkpt.temporary:
+            commands.append(self.continue_commands(bkpt))
+        if bkpt.auto_continue and bkpt.sample_every > 1:
+            commands.extend(self.sample_commands(bkpt))
+        if bkpt.auto_continue and bkpt.max_hits is not None:
+            # gdb disables the breakpoint itself once the budget is spent, so it stops trapping
+            remaining = bkpt.max_hits - bkpt.times_handled
+            if remaining > 0:
+                commands.append(f"enable count {remaining} {bkpt.bkpt_no}")
+            else:
+                bkpt.active = False
+        if bkpt.ignore_remaining:
+            commands.append(f"ignore {bkpt.bkpt_no} {bkpt.ignore_remaining}")
+        return commands
+
+    def continue_commands(
+        self,
+        bkpt: Breakpoint,
+    ) -> str:
+        """
+        Build the mi3 command that makes a temporary auto-continue breakpoint print its
+        captures and continue by itself
+
+        gdb never deletes a temporary dprintf, as dprintfs never stop, so temporary
+        auto-continue breakpoints are plain temporary breakpoints with commands instead
+
+        Args:
+            bkpt (Breakpoint): Inserted temporary auto-continue breakpoint
+
+        Returns:
+            str: mi3 command
+        """
+        fmt, args = capture_printf(bkpt)
+        printf = ", ".join([f"printf {self.mi_quote(fmt)}"] + args)
+        return " ".join(
+            [f"-break-commands {bkpt.bkpt_no}"]
+            + [self.mi_quote(line) for line in ("silent", printf, "continue")]
+        )
+
+    def sample_commands(
+        self,
+        bkpt: Breakpoint,
+    ) -> List[str]:
+        """
+        Build the gdb commands that make gdb sample an auto-continue breakpoint by sample_every
+
+        Args:
+            bkpt (Breakpoint): Inserted auto-continue breakpoint
+
+        Returns:
+            List[str]: gdb commands, removing the condition if every hit is captured
+        """
+        if bkpt.sample_every <= 1:
+            return [f"condition {bkpt.bkpt_no}"]
+        return [
+            f"set $pygdbnx_hits_{bkpt.bkpt_no} = 0",
+            f"condition {bkpt.bkpt_no} {self.sample_condition(bkpt)}",
+        ]
+
+    def toggle_commands(
+        self,
+        action: str,
+        bkpts: List[Breakpoint],
+    ) -> List[str]:
+        """
+        Build the gdb commands that enable, disable or delete many breakpoints
+
+        Args:
+            action (str): "enable", "disable" or "delete"
+            bkpts (List[Breakpoint]): Breakpoints to apply the action to
+
+        Returns:
+            List[str]: gdb commands
+        """
+        commands = []
+        if action == "enable":
+            # a plain enable would drop the `enable count` budgeting an auto-continue breakpoint
+            plain = []
+            for bkpt in bkpts:
+                if not bkpt.auto_continue or bkpt.max_hits is None:
+                    plain.append(bkpt)
+                elif bkpt.times_handled < bkpt.max_hits:
+                    remaining = bkpt.max_hits - bkpt.times_handled
+                    commands.append(f"enable count {remaining} {bkpt.bkpt_no}")
+            bkpts = plain
+        commands.extend(
+            f"{action} " + " ".join(str(bkpt.bkpt_no) for bkpt in bkpts[i:i + self.BATCH_SIZE])
+            for i in range(0, len(bkpts), self.BATCH_SIZE)
+        )
+        return commands
+
+    @staticmethod
+    def sample_condition(
+        bkpt: Breakpoint,
+    ) -> str:
+        """
+        Build the gdb condition that samples an auto-continue breakpoint
+
+        gdb evaluates the condition itself, so auto-continue breakpoints are sampled
+        without any round trip through python. Their hit budget is left to `enable count`,
+        which only counts hits the condition let through
+
+        Args:
+            bkpt (Breakpoint): Breakpoint to build the condition for
+
+        Returns:
+            str: gdb condition expression
+        """
+        return f"++$pygdbnx_hits_{bkpt.bkpt_no} % {bkpt.sample_every} == 0"
+
+    def handled_hit_commands(
+        self,
+        bkpt: Breakpoint,
+        ignore: int = 0,
+    ) -> List[str]:
+        """
+        Build the gdb commands that sample or budget a breakpoint after one of its hits was handled
+
+        Args:
+            bkpt (Breakpoint): Breakpoint the target is halted at
+            ignore (int, optional): Hits to ignore at least, e.g. by a throttle. gdb keeps a
+            single ignore count, so it is merged with the one sampling needs. Defaults to 0
+
+        Returns:
+            List[str]: gdb commands to send before resuming
+        """
+        if bkpt.max_hits is not None and bkpt.times_handled >= bkpt.max_hits:
+            bkpt.active = False
+            return self.toggle_commands("disable", [bkpt])
+        ignore = max(ignore, bkpt.sample_every - 1)
+        if ignore:
+            bkpt.ignore_remaining = ignore
+            return [f"ignore {bkpt.bkpt_no} {bkpt.ignore_remaining}"]
+        return []
+
+    @staticmethod
+    def count_capture(
+        bkpt: Breakpoint,
+    ):
+        """
+        Count a hit an auto-continue breakpoint printed a capture for
+
+        Args:
+            bkpt (Breakpoint): Breakpoint the capture belongs to
+        """
+        bkpt.times_handled += 1
+        if bkpt.max_hits is not None and bkpt.times_handled >= bkpt.max_hits:
+            # disabled by gdb through `enable count`
+            bkpt.active = False
+
+    def forget_breakpoint(
+        self,
+        bkpt_no: int,
+    ) -> Optional[Breakpoint]:
+        """
+        Forget a breakpoint gdb deleted, e.g. a temporary one after its hit
+
+        Args:
+            bkpt_no (int): gdb number of the breakpoint
+
+        Returns:
+            Optional[Breakpoint]: The breakpoint, None if no breakpoint has that number
+        """
+        forgotten = self.forget_breakpoints([bkpt_no])
+        return forgotten[0] if forgotten else None
+
+    def forget_breakpoints(
+        self,
+        bkpt_nos: List[int],
+    ) -> List[Breakpoint]:
+        """
+        Forget many breakpoints gdb deleted, dropping them from active_breakpoints in one pass
+
+        Args:
+            bkpt_nos (List[int]): gdb numbers of the breakpoints
+
+        Returns:
+            List[Breakpoint]: The breakpoints that had those numbers
+        """
+        forgotten = []
+        for bkpt_no in bkpt_nos:
+            bkpt = self.breakpoints_by_no.pop(bkpt_no, None)
+            if bkpt is not None:
+                bkpt.active = False
+                forgotten.append(bkpt)
+        # breakpoints added again since keep their entry under their new number
+        gone = {id(bkpt) for bkpt in forgotten
+                if self.breakpoints_by_no.get(bkpt.bkpt_no) is not bkpt}
+        if gone:
+            self.active_breakpoints = [bkpt for bkpt in self.active_breakpoints
+                                       if id(bkpt) not in gone]
+        return forgotten
+
+    def count_hits(
+        self,
+        bkpt_info: dict,
+    ) -> Optional[Breakpoint]:
+        """
+        Update the hit counts of a breakpoint from a breakpoint-modified notification
+
+        Args:
+            bkpt_info (dict): bkpt payload of the notification
+
+        Returns:
+            Optional[Breakpoint]: The breakpoint if the notification is a hit that
+            stopped for python, otherwise None
+        """
+        bkpt = self.breakpoints_by_no.get(int(bkpt_info['number']))
+        if bkpt is None:
+            return None
+        times = int(bkpt_info.get('times', bkpt.times_hit))
+        new_hits = times - bkpt.times_hit
+        bkpt.times_hit = times
+        if new_hits <= 0 or bkpt.auto_continue:
+            return None
+        if bkpt.ignore_remaining >= new_hits:
+            bkpt.ignore_remaining -= new_hits
+            return None
+        bkpt.ignore_remaining = 0
+        return bkpt
+
+    @staticmethod
+    def filter_response(
+        response: List[dict],
+        target_type: Optional[str] = "console",
+    ) -> List[dict]:
+        """
+        Filter mi3 response down to only that of target_type
+
+        Args:
+            response (List[dict]): mi3 response to filter
+            target_type (Optional[str], optional): mi3 type to filter for. Defaults to "console"
+
+        Returns:
+            List[dict]: Filtered mi3 response
+        """
+        return [line for line in response if line['type'] == target_type]
+
+    @staticmethod
+    def mi_quote(
+        argument: str,
+    ) -> str:
+        """
+        Quote an argument of a mi3 command as a c-string
+
+        Args:
+            argument (str): Argument to quote
+
+        Returns:
+            str: Quoted argument
+        """
+        return '"' + argument.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+    @staticmethod
+    def extract_payloads(
+        response: List[dict],
+    ) -> List[str]:
+        """
+        Extract only the payloads of a mi3 response
+
+        Args:
+            response (List[dict]): mi3 response to extract from
+
+        Returns:
+            List[str]: Extracted payloads
+        """
+        return [line["payload"] for line in response if line["payload"] != ""]
+
+    def apply_bases(
+        self,
+        response: List[dict],
+    ):
+        """
+        Read the base addresses of sections of the switch's memory from `monitor get base`
+
+        Args:
+            response (List[dict]): mi3 response of `monitor get base`
+        """
+        for line in self.filter_response(response, "target"):
+            if line['payload'].startswith("Program:"):
+                self.title = line['payload'].split()[1].replace("\\n","")
+            elif "Heap" in line['payload']:
+                self.heap_base, self.heap_max = \
+                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[4:6])
+            elif "Stack" in line['payload']:
+                self.stack_base, self.stack_max = \
+                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[3:5])
+            elif ".nss" in line['payload']:
+                self.main_base, self.main_max = \
+                    (int(num, 16) for num in line['payload'].replace(" -","")[:-2].split(" ")[2:4])
+
+    def layout(
+        self,
+        build: str,
+    ) -> Layout:
+        """
+        Describe the layout of the attached process
+
+        Args:
+            build (str): Build id of the title, see layoutcache.build_id
+
+        Returns:
+            Layout: Process id and base addresses of the attached process
+        """
+        return Layout(self.title, build, self.process_id, self.main_base, self.main_max,
+                      self.heap_base, self.heap_max, self.stack_base, self.stack_max)
+
+    def apply_layout(
+        self,
+        layout: Layout,
+    ):
+        """
+        Use a cached layout instead of parsing `monitor get base`
+
+        Args:
+            layout (Layout): Cached layout of the attached process
+        """
+        self.title = layout.title
+        self.process_id = layout.process_id
+        self.main_base, self.main_max = layout.main_base, layout.main_max
+        self.heap_base, self.heap_max = layout.heap_base, layout.heap_max
+        self.stack_base, self.stack_max = layout.stack_base, layout.stack_max
+
+    @staticmethod
+    def connection_lost(
+        response: List[dict],
+    ) -> bool:
+        """
+        Check whether gdb reported losing the connection to the switch
+
+        Args:
+            response (List[dict]): mi3 response to check
+
+        Returns:
+            bool: Whether or not the connection was lost
+        """
+        return any(
+            message in line['payload']
+            for line in response if isinstance(line['payload'], str)
+            for message in SwitchSession.CONNECTION_LOST_MESSAGES
+        )
+
+    def installed_breakpoints(
+        self,
+        result: dict,
+    ) -> List[Breakpoint]:
+        """
+        Find the breakpoints gdb still knows about in the result of `-break-list`
+
+        Args:
+            result (dict): mi3 result record of `-break-list`
+
+        Returns:
+            List[Breakpoint]: Breakpoints still installed, in order
+        """
+        return [
+            self.breakpoints_by_no[int(bkpt_info['number'])]
+            for bkpt_info in result['payload']['BreakpointTable']['body']
+            if bkpt_info['number'].isdigit()
+            and int(bkpt_info['number']) in self.breakpoints_by_no
+        ]
+
+    @staticmethod
+    def parse_process_id(
+        response: List[dict],
+        process_name: str,
+    ) -> Optional[int]:
+        """
+        Find the latest started process of name process_name in `info os processes`
+
+        Args:
+            response (List[dict]): mi3 response of `info os processes`
+            process_name (str): Name of switch process to find
+
+        Returns:
+            Optional[int]: Process id, None if no process has that name
+        """
+        for line in reversed(response): # sort by latest process started
+            if line['type'] == "console" and process_name in line["payload"]:
+                return int(line["payload"].split(" ",1)[0])
+        return None
+
+    @staticmethod
+    def parse_register(
+        register: str,
+        response: List[dict],
+    ) -> Union[int, float]:
+        """
+        Parse the value of a register from `info register`
+
+        Args:
+            register (str): Register that was read
+            response (List[dict]): mi3 response of `info register`
+
+        Returns:
+            Union[int, float]: Value of the register
+        """
+        payload = SwitchSession.filter_response(response, "console")[0]['payload']
+        if is_float_register(register):
+            return float(payload.split("f = ")[-1].split(",")[0])
+        # the hex column, unsigned like the captures printed by auto-continue breakpoints
+        return int(REGISTER_LINE.match(payload).group(2), 16)
+
+    @staticmethod
+    def parse_registers(
+        response: List[dict],
+    ) -> Dict[str, int]:
+        """
+        Parse the values of every register listed by `info registers`
+
+        Args:
+            response (List[dict]): mi3 response of `info registers`
+
+        Returns:
+            Dict[str, int]: Value of each register by name
+        """
+        registers = {}
+        for line in SwitchSession.filter_response(response, "console"):
+            match = REGISTER_LINE.match(line['payload'])
+            if match is not None:
+                registers[match.group(1)] = int(match.group(2), 16)
+        return registers
+
+    @staticmethod
+    def parse_regions(
+        response: List[dict],
+    ) -> List[Tuple[str, int, int]]:
+        """
+        Parse the heap, stack and modules of the attached process from `monitor get info`
+
+        Args:
+            response (List[dict]): mi3 response of `monitor get info`
+
+        Returns:
+            List[Tuple[str, int, int]]: Name, address and size of each region
+        """
+        regions = []
+        for line in SwitchSession.filter_response(response, "target"):
+            payload = line['payload'].replace("\\n", "").strip()
+            match = REGION_LINE.search(payload)
+            if match is None or payload.startswith("Alias"):
+                continue
+            start, end = int(match.group(1), 16), int(match.group(2), 16)
+            # ends are printed inclusive by the stub, keep page-aligned ends exclusive
+            if end & 0xFFF == 0xFFF:
+                end += 1
+            if payload.startswith(("Heap", "Stack")):
+                name = payload.split(":")[0].lower()
+            else:
+                name = match.group(3)
+            if name:
+                regions.append((name, start, end - start))
+        return regions
+
+    def log_response(
+        self,
+        response: List[dict],
+        detailed: Optional[bool] = False,
+    ):
+        """
+        Log a mi3 response List[dict] to the connection logger
+
+        Args:
+            response (List[dict]): mi3 response to log
+            detailed (bool, optional): Whether or not to log full response at DEBUG level.
+            Defaults to False
+        """
+        if detailed:
+            connection_logger.debug("%s", response)
+        elif connection_logger.isEnabledFor(logging.INFO):
+            for line in self.extract_payloads(self.filter_response(response)):
+                connection_logger.info("%s", line)
@@ -0,0 +1,163 @@
+"""Dump files holding the memory regions and registers of a process at a stop"""
+
+import bisect
+import dataclasses
+import json
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .exceptions import MemoryReadException
+
+MAGIC = b"PGNXSNP1"
+# offset of the metadata followed by the magic again, at the very end of the file
+FOOTER = struct.Struct("<Q8s")
+
+@dataclass
+class Region:
+    """Readable range of memory stored in a snapshot"""
+    name: str
+    address: int
+    size: int
+    offset: int = 0
+
+class SnapshotWriter:
+    """Streams regions to a snapshot file, writing its metadata once every region is known"""
+    def __init__(
+        self,
+        path: str,
+    ):
+        """
+        Start writing a snapshot, which only appears at path once finished
+
+        Args:
+            path (str): File to write the snapshot to
+        """
+        self.path = path
+        self.file = open(f"{path}.tmp", "wb")
+        self.file.write(MAGIC)
+        self.offset = len(MAGIC)
+        self.regions: List[Region] = []
+
+    def add(
+        self,
+        name: str,
+        address: int,
+        data: bytes,
+    ):
+        """
+        Append memory read from the process, merged with the previous memory if contiguous
+
+        Args:
+            name (str): Name of the region the memory belongs to
+            address (int): Address the memory was read at
+            data (bytes): Memory read
+        """
+        last = self.regions[-1] if self.regions else None
+        if last is not None and last.name == name and last.address + last.size == address:
+            last.size += len(data)
+        else:
+            self.regions.append(Region(name, address, len(data), self.offset))
+        self.file.write(data)
+        self.offset += len(data)
+
+    def finish(
+        self,
+        metadata: dict,
+    ):
+        """
+        Write the metadata and move the snapshot into place
+
+        Args:
+            metadata (dict): json serializable description of the process, e.g. its layout
+            and registers
+        """
+        metadata = {**metadata, 'regions': [dataclasses.asdict(region) for region in self.regions]}
+        self.file.write(json.dumps(metadata).encode())
+        self.file.write(FOOTER.pack(self.offset, MAGIC))
+        self.file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def abort(
+        self,
+    ):
+        """
+        Discard the partly written snapshot
+        """
+        self.file.close()
+        os.remove(f"{self.path}.tmp")
+
+class Snapshot:
+    """Memory-mapped snapshot file"""
+    def __init__(
+        self,
+        path: str,
+    ):
+        """
+        Open a snapshot
+
+        Args:
+            path (str): Snapshot file written by SnapshotWriter
+        """
+        self.path = path
+        with open(path, "rb") as snapshot_file:
+            self.map = mmap.mmap(snapshot_file.fileno(), 0, access = mmap.ACCESS_READ)
+        metadata_offset, magic = FOOTER.unpack_from(self.map, len(self.map) - FOOTER.size)
+        if self.map[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a snapshot")
+        self.metadata: dict = json.loads(self.map[metadata_offset:len(self.map) - FOOTER.size])
+        self.regions = sorted(
+            (Region(**region) for region in self.metadata['regions']),
+            key = lambda region: region.address
+        )
+        self.starts = [region.address for region in self.regions]
+
+    def region(
+        self,
+        address: int,
+    ) -> Optional[Region]:
+        """
+        Find the region holding an address
+
+        Args:
+            address (int): Address to look up
+
+        Returns:
+            Optional[Region]: Region holding address, None if it was not captured
+        """
+        i = bisect.bisect_right(self.starts, address) - 1
+        if i < 0 or address >= self.regions[i].address + self.regions[i].size:
+            return None
+        return self.regions[i]
+
+    def read(
+        self,
+        address: int,
+        size: int,
+    ) -> bytes:
+        """
+        Read captured memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+
+        Returns:
+            bytes: Bytes captured at address
+        """
+        region = self.region(address)
+        if region is None or address + size > region.address + region.size:
+            raise MemoryReadException(f"0x{size:X} bytes at 0x{address:X} were not captured")
+        start = region.offset + address - region.address
+        return self.map[start:start + size]
+
+    def close(
+        self,
+    ):
+        """
+        Unmap the snapshot
+        """
+        self.map.close()
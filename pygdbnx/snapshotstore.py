@@ -0,0 +1,390 @@
+"""Content-addressed store of snapshots sharing identical pages"""
+
+import bisect
+import collections
+import hashlib
+import json
+import os
+import struct
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from .exceptions import MemoryReadException
+
+DIGEST_SIZE = 16
+# digest of pages that could not be read
+MISSING = bytes(DIGEST_SIZE)
+# digest, offset and length of each page in the pack, and whether it is compressed
+INDEX_ENTRY = struct.Struct(f"<{DIGEST_SIZE}sQIB")
+# page number and digest of each page that changed since the parent snapshot
+CHANGE = struct.Struct(f"<I{DIGEST_SIZE}s")
+
+@dataclass
+class StoredRegion:
+    """Region of a stored snapshot and where its pages start in the page table"""
+    name: str
+    address: int
+    size: int
+    first_page: int = 0
+
+class StoredSnapshot:
+    """Snapshot read back from a SnapshotStore, usable by OfflineGdbProcess"""
+    def __init__(
+        self,
+        store: "SnapshotStore",
+        name: str,
+        metadata: dict,
+        regions: List[StoredRegion],
+        table: bytes,
+    ):
+        """
+        Wrap the resolved page table of a snapshot
+
+        Args:
+            store (SnapshotStore): Store holding the pages
+            name (str): Name of the snapshot
+            metadata (dict): Description of the process, as written by dump_snapshot
+            regions (List[StoredRegion]): Regions of the snapshot, sorted by address
+            table (bytes): Digest of every page of every region
+        """
+        self.store = store
+        self.name = name
+        self.metadata = metadata
+        self.regions = regions
+        self.table = table
+        self.starts = [region.address for region in regions]
+
+    def read(
+        self,
+        address: int,
+        size: int,
+    ) -> bytes:
+        """
+        Read captured memory
+
+        Args:
+            address (int): Address to read from
+            size (int): Amount of bytes to read
+
+        Returns:
+            bytes: Bytes captured at address
+        """
+        i = bisect.bisect_right(self.starts, address) - 1
+        if i < 0 or address + size > self.regions[i].address + self.regions[i].size:
+            raise MemoryReadException(f"0x{size:X} bytes at 0x{address:X} were not captured")
+        region = self.regions[i]
+        page_size = self.store.page_size
+        data = bytearray()
+        offset = address - region.address
+        while len(data) < size:
+            page_no = region.first_page + offset // page_size
+            digest = self.table[page_no * DIGEST_SIZE:(page_no + 1) * DIGEST_SIZE]
+            if digest == MISSING:
+                raise MemoryReadException(f"0x{size:X} bytes at 0x{address:X} were not captured")
+            page = self.store.page(digest)
+            start = offset % page_size
+            chunk = page[start:start + size - len(data)]
+            if not chunk:
+                # short page stored before short pages were treated as unreadable
+                raise MemoryReadException(f"0x{size:X} bytes at 0x{address:X} were not captured")
+            data += chunk
+            offset += len(chunk)
+        return bytes(data)
+
+    def close(
+        self,
+    ):
+        """
+        Nothing to release, the pages belong to the store
+        """
+
+class SnapshotStore:
+    """Stores each unique page of many snapshots once, with a page table per snapshot"""
+    def __init__(
+        self,
+        directory: str,
+        page_size: int = 0x1000,
+        compress: Optional[bool] = None,
+        level: int = 3,
+        keyframe_interval: int = 64,
+        cache_pages: int = 1024,
+    ):
+        """
+        Open a store, creating it if it does not exist
+
+        Page tables are stored as changes since the previous snapshot, with a full page table
+        every keyframe_interval snapshots, so both pages and page tables cost space in
+        proportion to what changed
+
+        Args:
+            directory (str): Directory of the store
+            page_size (int, optional): Size of pages, fixed once the store is created.
+            Defaults to 0x1000
+            compress (Optional[bool], optional): Whether or not to compress new pages with
+            zstandard. Defaults to whether or not zstandard is installed
+            level (int, optional): zstandard compression level. Defaults to 3
+            keyframe_interval (int, optional): Snapshots between full page tables. Defaults to 64
+            cache_pages (int, optional): Amount of decompressed pages kept for reading.
+            Defaults to 1024
+        """
+        if compress is None:
+            compress = zstandard is not None
+        if compress and zstandard is None:
+            raise ImportError("zstandard is required to compress pages")
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.cache_pages = cache_pages
+        self.cache: collections.OrderedDict = collections.OrderedDict()
+        os.makedirs(os.path.join(directory, "snapshots"), exist_ok = True)
+        config_path = os.path.join(directory, "store.json")
+        if os.path.exists(config_path):
+            with open(config_path, "r", encoding = "utf-8") as config_file:
+                page_size = json.load(config_file)['page_size']
+        else:
+            with open(config_path, "w", encoding = "utf-8") as config_file:
+                json.dump({'page_size': page_size}, config_file)
+        self.page_size = page_size
+        self.compressor = zstandard.ZstdCompressor(level = level) if compress else None
+        self.decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+        pack_path = os.path.join(directory, "pages.pack")
+        self.pack = open(pack_path, "ab")
+        self.pack_size = self.pack.tell()
+        self.reader = open(pack_path, "rb")
+        # pages whose data did not make it to the pack before a crash are forgotten
+        self.index: Dict[bytes, Tuple[int, int, bool]] = {}
+        index_path = os.path.join(directory, "pages.idx")
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as index_file:
+                entries = index_file.read()
+            entries = entries[:len(entries) - len(entries) % INDEX_ENTRY.size]
+            for digest, offset, length, compressed in INDEX_ENTRY.iter_unpack(entries):
+                if offset + length <= self.pack_size:
+                    self.index[digest] = (offset, length, bool(compressed))
+        self.index_file = open(index_path, "ab")
+        self.names: List[str] = []
+        names_path = os.path.join(directory, "snapshots.txt")
+        if os.path.exists(names_path):
+            with open(names_path, "r", encoding = "utf-8") as names_file:
+                self.names = names_file.read().split()
+        self.last: Optional[StoredSnapshot] = None
+        self.since_keyframe = 0
+        if self.names:
+            self.last = self.open(self.names[-1])
+
+    def snapshots(
+        self,
+    ) -> List[str]:
+        """
+        List the stored snapshots
+
+        Returns:
+            List[str]: Names of the snapshots, oldest first
+        """
+        return list(self.names)
+
+    def put_page(
+        self,
+        page: bytes,
+    ) -> bytes:
+        """
+        Store a page unless an identical page is stored already
+
+        Args:
+            page (bytes): Contents of the page
+
+        Returns:
+            bytes: Digest of the page
+        """
+        digest = hashlib.blake2b(page, digest_size = DIGEST_SIZE).digest()
+        if digest in self.index:
+            return digest
+        data = page if self.compressor is None else self.compressor.compress(page)
+        self.pack.write(data)
+        self.index[digest] = (self.pack_size, len(data), self.compressor is not None)
+        self.index_file.write(INDEX_ENTRY.pack(digest, self.pack_size, len(data),
+                                               self.compressor is not None))
+        self.pack_size += len(data)
+        return digest
+
+    def page(
+        self,
+        digest: bytes,
+    ) -> bytes:
+        """
+        Read a stored page
+
+        Args:
+            digest (bytes): Digest of the page
+
+        Returns:
+            bytes: Contents of the page
+        """
+        page = self.cache.get(digest)
+        if page is not None:
+            self.cache.move_to_end(digest)
+            return page
+        offset, length, compressed = self.index[digest]
+        self.pack.flush()
+        self.reader.seek(offset)
+        page = self.reader.read(length)
+        if compressed:
+            if self.decompressor is None:
+                raise ImportError("zstandard is required to read compressed pages")
+            page = self.decompressor.decompress(page)
+        self.cache[digest] = page
+        if len(self.cache) > self.cache_pages:
+            self.cache.popitem(last = False)
+        return page
+
+    def add(
+        self,
+        regions: List[Tuple[str, int, int]],
+        chunks: Iterable[Tuple[str, int, bytes]],
+        metadata: Optional[dict] = None,
+        name: Optional[str] = None,
+    ) -> str:
+        """
+        Store a snapshot from memory read region by region
+
+        Args:
+            regions (List[Tuple[str, int, int]]): Name, address and size of each region
+            chunks (Iterable[Tuple[str, int, bytes]]): Region name, address and contents of
+            each chunk read, e.g. from GdbProcess.read_regions. Chunks must start on a page
+            boundary of their region and hold whole pages, the pages of other chunks are
+            treated as unreadable
+            metadata (Optional[dict], optional): json serializable description of the process.
+            Defaults to None
+            name (Optional[str], optional): Name of the snapshot, usable in file names.
+            Defaults to the number of the snapshot
+
+        Returns:
+            str: Name of the snapshot
+        """
+        if name is None:
+            name = f"{len(self.names):08d}"
+        page_size = self.page_size
+        stored_regions = []
+        pages = 0
+        for region_name, address, size in sorted(regions, key = lambda region: region[1]):
+            stored_regions.append(StoredRegion(region_name, address, size, pages))
+            pages += -(-size // page_size)
+        starts = [region.address for region in stored_regions]
+        table = bytearray(MISSING * pages)
+        for _, address, data in chunks:
+            region = stored_regions[bisect.bisect_right(starts, address) - 1]
+            if (address - region.address) % page_size:
+                continue
+            first_page = region.first_page + (address - region.address) // page_size
+            for i, offset in enumerate(range(0, len(data), page_size)):
+                page = data[offset:offset + page_size]
+                # only the last page of a region may be short, other short pages were cut
+                # off by a chunk size that is not a multiple of the page size
+                if len(page) < min(page_size, region.address + region.size - address - offset):
+                    continue
+                digest = self.put_page(page)
+                table[(first_page + i) * DIGEST_SIZE:(first_page + i + 1) * DIGEST_SIZE] = digest
+        layout = [(region.name, region.address, region.size) for region in stored_regions]
+        keyframe = self.last is None or self.since_keyframe + 1 >= self.keyframe_interval \
+            or layout != [(region.name, region.address, region.size)
+                          for region in self.last.regions]
+        if keyframe:
+            body = bytes(table)
+            self.since_keyframe = 0
+        else:
+            previous = self.last.table
+            body = b"".join(
+                CHANGE.pack(i, table[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE])
+                for i in range(pages)
+                if table[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]
+                != previous[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]
+            )
+            self.since_keyframe += 1
+        header = json.dumps({
+            'parent': None if keyframe else self.last.name,
+            'metadata': metadata or {},
+            'regions': [list(region) for region in layout],
+        }).encode()
+        # pages first, so no page table ever refers to pages that are not on disk
+        self.pack.flush()
+        self.index_file.flush()
+        path = os.path.join(self.directory, "snapshots", f"{name}.snap")
+        with open(f"{path}.tmp", "wb") as snapshot_file:
+            snapshot_file.write(struct.pack("<I", len(header)) + header + body)
+        os.replace(f"{path}.tmp", path)
+        with open(os.path.join(self.directory, "snapshots.txt"), "a",
+                  encoding = "utf-8") as names_file:
+            names_file.write(name + "\n")
+        self.names.append(name)
+        self.last = StoredSnapshot(self, name, metadata or {}, stored_regions, bytes(table))
+        return name
+
+    def open(
+        self,
+        name: str,
+    ) -> StoredSnapshot:
+        """
+        Open a stored snapshot
+
+        Args:
+            name (str): Name of the snapshot
+
+        Returns:
+            StoredSnapshot: The snapshot, with its page table resolved
+        """
+        chain = []
+        parent = name
+        while parent is not None:
+            with open(os.path.join(self.directory, "snapshots", f"{parent}.snap"),
+                      "rb") as snapshot_file:
+                data = snapshot_file.read()
+            header_size = struct.unpack_from("<I", data)[0]
+            header = json.loads(data[4:4 + header_size])
+            chain.append((header, data[4 + header_size:]))
+            parent = header['parent']
+        keyframe_header, table = chain.pop()
+        table = bytearray(table)
+        for _, changes in reversed(chain):
+            for i, digest in CHANGE.iter_unpack(changes):
+                table[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE] = digest
+        header = chain[0][0] if chain else keyframe_header
+        regions = []
+        pages = 0
+        for region_name, address, size in header['regions']:
+            regions.append(StoredRegion(region_name, address, size, pages))
+            pages += -(-size // self.page_size)
+        if name == (self.names[-1] if self.names else None):
+            self.since_keyframe = len(chain)
+        return StoredSnapshot(self, name, header['metadata'], regions, bytes(table))
+
+    def stats(
+        self,
+    ) -> dict:
+        """
+        Describe how much the store holds
+
+        Returns:
+            dict: Amount of snapshots and unique pages, and bytes taken by pages and page tables
+        """
+        snapshots = os.path.join(self.directory, "snapshots")
+        return {
+            'snapshots': len(self.names),
+            'unique_pages': len(self.index),
+            'page_bytes': self.pack_size,
+            'table_bytes': sum(os.path.getsize(os.path.join(snapshots, entry))
+                               for entry in os.listdir(snapshots)),
+        }
+
+    def close(
+        self,
+    ):
+        """
+        Flush and close the store
+        """
+        self.pack.close()
+        self.index_file.close()
+        self.reader.close()
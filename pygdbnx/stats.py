@@ -0,0 +1,192 @@
+"""Counters and latency histograms of gdb commands and breakpoint halts"""
+
+import bisect
+import collections
+import re
+from typing import Dict, Optional
+
+from .hooks import CommandCall
+
+# upper bounds of latency buckets in seconds, the last bucket is unbounded
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0)
+COMMAND_KINDS = (
+    ("memory_read", re.compile(r"-data-read-memory-bytes |x/")),
+    ("memory_write", re.compile(r"-data-write-memory-bytes |set \{")),
+    ("register_read", re.compile(r"info register |-data-list-register-values ")),
+    ("register_write", re.compile(r"set \$")),
+    ("evaluate", re.compile(r"-data-evaluate-expression ")),
+    ("breakpoint_insert", re.compile(r"-break-insert |-dprintf-insert |-break-watch ")),
+    ("breakpoint_modify", re.compile(r"(enable|disable|delete|condition|ignore) |-break-")),
+    ("continue", re.compile(r"(continue|-exec-continue|interrupt|-exec-interrupt)$")),
+)
+PHASES = ("capture", "callback", "resume", "total")
+
+def command_kind(
+    command: str,
+) -> str:
+    """
+    Classify a gdb command
+
+    Args:
+        command (str): gdb command without token
+
+    Returns:
+        str: Kind of command, "console" for anything not recognised
+    """
+    for kind, pattern in COMMAND_KINDS:
+        if pattern.match(command):
+            return kind
+    return "console"
+
+class Histogram:
+    """Latency histogram with fixed buckets"""
+    def __init__(
+        self,
+    ):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(
+        self,
+        value: float,
+    ):
+        """
+        Record a latency
+
+        Args:
+            value (float): Latency in seconds
+        """
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def snapshot(
+        self,
+    ) -> dict:
+        """
+        Summarize the histogram
+
+        Returns:
+            dict: count, total, min, max, mean and counts by bucket upper bound
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+            'buckets': {
+                str(bound): count
+                for bound, count in zip(list(BUCKETS) + ["inf"], self.buckets)
+            },
+        }
+
+class CommandStats:
+    """Statistics of one kind of command"""
+    def __init__(
+        self,
+    ):
+        self.count = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_moved = 0
+        self.latency = Histogram()
+
+    def snapshot(
+        self,
+    ) -> dict:
+        """
+        Summarize the statistics
+
+        Returns:
+            dict: Counters and latency histogram
+        """
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'bytes_sent': self.bytes_sent,
+            'bytes_moved': self.bytes_moved,
+            'latency': self.latency.snapshot(),
+        }
+
+class SessionStats:
+    """Statistics of every command sent and every halt handled by a session"""
+    def __init__(
+        self,
+    ):
+        self.commands: Dict[str, CommandStats] = collections.defaultdict(CommandStats)
+        self.halts: Dict[str, Histogram] = {phase: Histogram() for phase in PHASES}
+
+    def record_command(
+        self,
+        call: CommandCall,
+    ):
+        """
+        Record a command that was sent to gdb, meant to be registered as a post-command hook
+
+        Args:
+            call (CommandCall): Finished command
+        """
+        command = call.command
+        kind = command_kind(command)
+        stats = self.commands[kind]
+        stats.count += 1
+        stats.bytes_sent += len(command) + 1
+        stats.latency.record(call.elapsed)
+        if call.error is not None:
+            stats.errors += 1
+        records = call.records
+        if not records:
+            return
+        result = records[-1]
+        if result['type'] == "result" and result['message'] == "error":
+            stats.errors += 1
+        elif kind == "memory_read" and isinstance(result['payload'], dict):
+            stats.bytes_moved += sum(
+                len(block['contents']) // 2 for block in result['payload'].get('memory', [])
+            )
+        elif kind == "memory_write" and command.startswith("-data-write-memory-bytes "):
+            stats.bytes_moved += len(command.rsplit(" ", 1)[-1]) // 2
+
+    def record_halt(
+        self,
+        capture: float,
+        callback: float,
+        resume: float,
+        total: float,
+    ):
+        """
+        Record where the time of a halt for a breakpoint went
+
+        Args:
+            capture (float): Seconds spent reading registers and memory
+            callback (float): Seconds spent in on_break
+            resume (float): Seconds spent configuring the breakpoint and resuming
+            total (float): Seconds from the stop notification until resuming
+        """
+        self.halts['capture'].record(capture)
+        self.halts['callback'].record(callback)
+        self.halts['resume'].record(resume)
+        self.halts['total'].record(total)
+
+    def snapshot(
+        self,
+    ) -> dict:
+        """
+        Summarize every statistic
+
+        Returns:
+            dict: Statistics by command kind under "commands" and by halt phase under "halts"
+        """
+        return {
+            'commands': {kind: stats.snapshot() for kind, stats in self.commands.items()},
+            'halts': {phase: histogram.snapshot() for phase, histogram in self.halts.items()},
+        }
@@ -0,0 +1,240 @@
+"""Throttling of breakpoints that keep the target halted for too long"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .breakpoint import Breakpoint
+from .logs import throttle_logger
+
+@dataclass
+class HaltStatistics:
+    """Hits and halt time of a breakpoint within the current window"""
+    bkpt: Breakpoint
+    hits: int = 0
+    halt_time: float = 0.0
+
+@dataclass
+class ThrottledBreakpoint:
+    """Breakpoint throttled by the "sample" or "disable" policy, and how to release it"""
+    bkpt: Breakpoint
+    sample_every: int
+
+class OverheadThrottle:
+    """
+    Keeps the time the target spends halted for breakpoints under a fraction of wall time
+
+    The budget is checked whenever a breakpoint halts the target for python, and by
+    GdbProcess.check_throttle between halts. gdb only takes commands while the target runs
+    with mi-async on, so without it a session of auto-continue breakpoints is only throttled
+    at the next python halt, and the "disable" policy keeps the last breakpoint left to halt
+    at enabled so throttled breakpoints can still be released
+    """
+    POLICIES = ("sample", "rate_limit", "disable")
+
+    def __init__(
+        self,
+        budget: float = 0.02,
+        window: float = 1.0,
+        policy: str = "sample",
+        cooldown: float = 1.0,
+        quiet_window: float = 10.0,
+        capture_halt_time: float = 0.005,
+    ):
+        """
+        Create a new throttle
+
+        Args:
+            budget (float, optional): Fraction of wall time the target may spend halted.
+            Defaults to 0.02
+            window (float, optional): Seconds of wall time the budget is measured over.
+            Defaults to 1.0
+            policy (str, optional): What to do with the breakpoint responsible for the most halt
+            time once the budget is exceeded. "sample" doubles its sample_every, "rate_limit"
+            ignores the hits expected within cooldown seconds and "disable" disables it.
+            Defaults to "sample"
+            cooldown (float, optional): Seconds of hits to skip with the "rate_limit" policy.
+            Defaults to 1.0
+            quiet_window (float, optional): Seconds the budget must hold before throttled
+            breakpoints are released again. Defaults to 10.0
+            capture_halt_time (float, optional): Seconds each capture of an auto-continue
+            breakpoint is assumed to halt the target for, as gdb handles those without python.
+            Defaults to 0.005
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown throttle policy {policy}, expected one of {self.POLICIES}")
+        self.budget = budget
+        self.window = window
+        self.policy = policy
+        self.cooldown = cooldown
+        self.quiet_window = quiet_window
+        self.capture_halt_time = capture_halt_time
+        self.window_start = time.perf_counter()
+        self.last_exceeded = self.window_start
+        self.statistics: Dict[int, HaltStatistics] = {}
+        self.throttled: Dict[int, ThrottledBreakpoint] = {}
+
+    def record(
+        self,
+        bkpt: Breakpoint,
+        halt_time: float,
+    ):
+        """
+        Record a hit of a breakpoint
+
+        Args:
+            bkpt (Breakpoint): Breakpoint that was hit
+            halt_time (float): Seconds the target was halted for the hit
+        """
+        statistics = self.statistics.setdefault(bkpt.bkpt_no, HaltStatistics(bkpt))
+        statistics.hits += 1
+        statistics.halt_time += halt_time
+
+    def record_capture(
+        self,
+        bkpt: Breakpoint,
+    ):
+        """
+        Record a hit an auto-continue breakpoint printed a capture for
+
+        Args:
+            bkpt (Breakpoint): Breakpoint that was hit
+        """
+        self.record(bkpt, self.capture_halt_time)
+
+    def overhead(
+        self,
+    ) -> float:
+        """
+        Fraction of wall time spent halted within the current window
+
+        Returns:
+            float: Halted fraction of wall time
+        """
+        elapsed = max(time.perf_counter() - self.window_start, self.window)
+        return sum(statistics.halt_time for statistics in self.statistics.values()) / elapsed
+
+    def due(
+        self,
+    ) -> bool:
+        """
+        Check if apply has anything to do, starting a new window once the current one is over
+
+        Returns:
+            bool: Whether the budget is exceeded or throttled breakpoints can be released
+        """
+        now = time.perf_counter()
+        if self.overhead() > self.budget:
+            return True
+        if now - self.window_start >= self.window:
+            self.window_start = now
+            self.statistics.clear()
+        return bool(self.throttled) and now - self.last_exceeded >= self.quiet_window
+
+    def apply(
+        self,
+        gdbprocess,
+        bkpt: Optional[Breakpoint] = None,
+    ) -> int:
+        """
+        Throttle the worst offender of an exceeded budget, or release throttled breakpoints
+        once the budget held for quiet_window seconds
+
+        Must be called while the target is halted, so auto-continue breakpoints recorded
+        since the last halt are throttled before the target resumes
+
+        Args:
+            gdbprocess (GdbProcess): Process the breakpoint belongs to
+            bkpt (Optional[Breakpoint], optional): Breakpoint the target is halted at, None
+            if it was interrupted. Defaults to None
+
+        Returns:
+            int: Hits of bkpt to ignore, for the caller to send along with the ignore count
+            it sends anyway so neither overwrites the other, 0 if bkpt is None
+        """
+        now = time.perf_counter()
+        ignore = 0
+        if self.overhead() > self.budget:
+            self.last_exceeded = now
+            offender = max(self.statistics.values(), key = lambda statistics: statistics.halt_time)
+            count = self.throttle(gdbprocess, offender, now)
+            if offender.bkpt is bkpt:
+                ignore = count
+            elif count:
+                gdbprocess.ignore_hits(offender.bkpt, count)
+        elif self.throttled and now - self.last_exceeded >= self.quiet_window:
+            self.release(gdbprocess)
+            self.last_exceeded = now
+        if now - self.window_start >= self.window:
+            self.window_start = now
+            self.statistics.clear()
+        return ignore
+
+    def throttle(
+        self,
+        gdbprocess,
+        statistics: HaltStatistics,
+        now: float,
+    ) -> int:
+        """
+        Apply the throttle policy to a breakpoint
+
+        Args:
+            gdbprocess (GdbProcess): Process the breakpoint belongs to
+            statistics (HaltStatistics): Statistics of the breakpoint to throttle
+            now (float): Current time
+
+        Returns:
+            int: Hits of the breakpoint to ignore with the "rate_limit" policy, otherwise 0
+        """
+        bkpt = statistics.bkpt
+        count = 0
+        if self.policy == "rate_limit":
+            hit_rate = statistics.hits / max(now - self.window_start, self.window)
+            count = math.ceil(hit_rate * bkpt.sample_every * self.cooldown)
+            throttle_logger.info("Throttling \"%s\" by ignoring %d hits", bkpt.name, count)
+        elif self.policy == "sample":
+            self.throttled.setdefault(bkpt.bkpt_no, ThrottledBreakpoint(bkpt, bkpt.sample_every))
+            bkpt.sample_every *= 2
+            throttle_logger.info("Throttling \"%s\" to every %d hits", bkpt.name,
+                                 bkpt.sample_every)
+            if bkpt.auto_continue:
+                gdbprocess.write_batch(gdbprocess.sample_commands(bkpt))
+        elif not gdbprocess.async_execution and not any(
+            other is not bkpt and other.active and not other.auto_continue
+            for other in gdbprocess.breakpoints_by_no.values()
+        ):
+            # nothing would halt the target to release it again
+            throttle_logger.warning("Not disabling \"%s\", no breakpoint would be left to "
+                                    "halt at without mi-async", bkpt.name)
+        else:
+            self.throttled.setdefault(bkpt.bkpt_no, ThrottledBreakpoint(bkpt, bkpt.sample_every))
+            throttle_logger.info("Throttling \"%s\" by disabling it", bkpt.name)
+            gdbprocess.disable_breakpoint(bkpt)
+        # start over so the throttled breakpoint is judged by its new overhead
+        self.statistics.clear()
+        self.window_start = now
+        return count
+
+    def release(
+        self,
+        gdbprocess,
+    ):
+        """
+        Undo the throttling of every breakpoint throttled by the "sample" or "disable" policy
+
+        Args:
+            gdbprocess (GdbProcess): Process the breakpoints belong to
+        """
+        for throttled in self.throttled.values():
+            bkpt = throttled.bkpt
+            throttle_logger.info("Releasing throttled \"%s\"", bkpt.name)
+            if self.policy == "sample":
+                bkpt.sample_every = throttled.sample_every
+                if bkpt.auto_continue:
+                    gdbprocess.write_batch(gdbprocess.sample_commands(bkpt))
+            elif not bkpt.active and not bkpt.temporary \
+                    and (bkpt.max_hits is None or bkpt.times_handled < bkpt.max_hits):
+                gdbprocess.enable_breakpoint(bkpt)
+        self.throttled.clear()
@@ -0,0 +1,23 @@
+"""Fixtures shared by the tests"""
+
+import pytest
+
+from pygdbnx.session import SwitchSession
+
+
+@pytest.fixture
+def session():
+    """Session of a console whose main module is loaded at 0x8000000000"""
+    switch_session = SwitchSession()
+    switch_session.init_session("127.0.0.1")
+    switch_session.main_base = 0x8000000000
+    return switch_session
+
+
+@pytest.fixture
+def inserted():
+    """Build the result gdb sends for an inserted breakpoint"""
+    def result(bkpt_no):
+        return {'type': "result", 'message': "done",
+                'payload': {'bkpt': {'number': str(bkpt_no)}}}
+    return result
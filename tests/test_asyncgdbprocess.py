@@ -0,0 +1,56 @@
+"""Tests of the asyncio front end without a gdb"""
+
+import asyncio
+import sys
+
+import pytest
+
+from pygdbnx.asyncgdbprocess import AsyncGdbProcess
+from pygdbnx.exceptions import ConnectionLost
+
+
+class ScriptedProcess(AsyncGdbProcess):
+    """Answers commands from a script instead of a gdb"""
+    def __init__(self, responses, **kwargs):
+        super().__init__("127.0.0.1", sys.executable, **kwargs)
+        self.responses = responses
+
+    async def command(self, command):
+        return self.responses[command]
+
+
+def result(message, **payload):
+    return [{'type': "result", 'message': message, 'payload': payload, 'token': None,
+             'stream': "stdout"}]
+
+
+def test_connect_raises_on_error():
+    process = ScriptedProcess({
+        "target extended-remote 127.0.0.1:22225": result("error", msg = "Connection timed out."),
+    })
+    with pytest.raises(ConnectionLost):
+        asyncio.run(process.connect())
+
+
+def test_attach_remembers_the_process_id():
+    processes = [{'type': "console", 'message': None, 'payload': "81 Application\n",
+                  'token': None, 'stream': "stdout"}]
+    process = ScriptedProcess({
+        "info os processes": processes + result("done"),
+        "attach 81": result("done"),
+    })
+    asyncio.run(process.attach())
+    assert process.process_id == 81
+
+
+def test_unconsumed_notifications_drop_the_oldest():
+    async def notify_all():
+        process = ScriptedProcess({}, max_notifications = 2)
+        process.notifications = asyncio.Queue(process.max_notifications)
+        for i in range(5):
+            process.notify({'type': "notify", 'message': "running", 'payload': i})
+        return process, [process.notifications.get_nowait()['payload'] for _ in range(2)]
+
+    process, payloads = asyncio.run(notify_all())
+    assert payloads == [3, 4]
+    assert process.dropped == 3
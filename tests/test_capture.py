@@ -0,0 +1,42 @@
+"""Tests of the capture records printed by auto-continue breakpoints"""
+
+from pygdbnx.breakpoint import Breakpoint, MemoryRange
+from pygdbnx.capture import capture_printf, parse_capture
+
+
+def make_breakpoint():
+    return Breakpoint(0x7100001000, "capture", capture_key = 3, registers = ["x0", "s0"],
+                      memory = [MemoryRange(0x1000, 10), MemoryRange("$x1", 2)],
+                      auto_continue = True)
+
+
+def test_printf_prints_registers_then_memory_as_words_and_bytes():
+    fmt, args = capture_printf(make_breakpoint())
+    assert fmt == "pygdbnx-capture:3:%lu:%.17g:%016lx%02x%02x:%02x%02x\n"
+    assert args == [
+        "$x0",
+        "$s0.f",
+        "*(unsigned long *)(0x1000 + 0)",
+        "*(unsigned char *)(0x1000 + 8)",
+        "*(unsigned char *)(0x1000 + 9)",
+        "*(unsigned char *)(($x1) + 0)",
+        "*(unsigned char *)(($x1) + 1)",
+    ]
+
+
+def test_parse_decodes_what_printf_prints():
+    bkpt = make_breakpoint()
+    payload = "pygdbnx-capture:3:18446744073709551611:1.5:0807060504030201090a:ff00\\n"
+    event = parse_capture(payload, {3: bkpt}, 12.5)
+    assert event.bkpt is bkpt
+    assert event.timestamp == 12.5
+    # printed unsigned like `info register`
+    assert event.registers == {'x0': 2**64 - 5, 's0': 1.5}
+    assert event.memory == [bytes(range(1, 11)), b"\xff\x00"]
+
+
+def test_parse_ignores_other_payloads_and_unknown_breakpoints():
+    bkpt = make_breakpoint()
+    assert parse_capture("x0             0x1001              4097\\n", {3: bkpt}, 0.0) is None
+    # e.g. printed by a breakpoint deleted while its records were in flight
+    assert parse_capture("pygdbnx-capture:4:1:1.0:00:00\\n", {3: bkpt}, 0.0) is None
@@ -0,0 +1,112 @@
+"""Tests of the columnar capture sink"""
+
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from pygdbnx.breakpoint import Breakpoint, MemoryRange
+from pygdbnx.capture import CaptureEvent
+from pygdbnx.columnar import ColumnarSink, chunk_paths, pa, read_columns
+
+BACKENDS = [
+    pytest.param("arrow", marks = pytest.mark.skipif(pa is None, reason = "needs pyarrow")),
+    "npy",
+]
+STRUCT = np.dtype([("species", "<u4"), ("level", "<u2"), ("flags", "<u2")])
+
+
+def make_breakpoint():
+    return Breakpoint(0x7100001000, "spawn", registers = ["x0", "s0"],
+                      memory = [MemoryRange(0x1000, 8), MemoryRange("$x1", 3)],
+                      auto_continue = True)
+
+
+def make_event(bkpt, i, x0):
+    record = np.array([(i, i * 2, 0xFFFF)], dtype = STRUCT).tobytes()
+    return CaptureEvent(bkpt, float(i), {'x0': x0, 's0': i / 2}, [record, bytes([i, 0, 255])])
+
+
+def wait_for(condition, timeout = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_round_trip(tmp_path, backend):
+    bkpt = make_breakpoint()
+    sink = ColumnarSink(str(tmp_path), chunk_rows = 2, backend = backend,
+                        struct_dtypes = {'spawn': [STRUCT, None]})
+    values = [0, 1, 2**63 - 1, 2**63, 2**64 - 1]
+    for i, x0 in enumerate(values):
+        sink.put(make_event(bkpt, i, x0))
+    # a register that was not captured
+    sink.put(CaptureEvent(bkpt, 5.0, {}, [bytes(8), bytes(3)]))
+    sink.close()
+    assert sink.rows_written == 6
+    assert len(chunk_paths(str(tmp_path), "spawn")) == 3
+    columns = read_columns(str(tmp_path), "spawn")
+    assert columns['x0'].dtype == np.uint64
+    assert columns['x0'].tolist() == values + [0]
+    assert columns['s0'][:5].tolist() == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert np.isnan(columns['s0'][5])
+    assert columns['timestamp'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert columns['memory0.species'].tolist() == [0, 1, 2, 3, 4, 0]
+    assert columns['memory0.level'].tolist() == [0, 2, 4, 6, 8, 0]
+    assert columns['memory0.flags'][:5].tolist() == [0xFFFF] * 5
+    assert [bytes(row) for row in columns['memory1']][:2] == [b"\x00\x00\xff", b"\x01\x00\xff"]
+
+
+def test_struct_dtypes_are_checked(tmp_path, caplog):
+    with pytest.raises(ValueError):
+        ColumnarSink(str(tmp_path), struct_dtypes = {'spawn': [np.uint32]})
+    bkpt = make_breakpoint()
+    # 4 bytes of a range of 8, stored raw instead
+    sink = ColumnarSink(str(tmp_path), backend = "npy",
+                        struct_dtypes = {'spawn': [np.dtype([("species", "<u4")])]})
+    with caplog.at_level(logging.WARNING, logger = "pygdbnx.storage"):
+        sink.put(make_event(bkpt, 1, 1))
+        sink.close()
+    assert "storing it as raw bytes" in caplog.text
+    columns = read_columns(str(tmp_path), "spawn")
+    assert columns['memory0'].dtype.itemsize == 8
+
+
+def test_flusher_writes_late_rows_and_survives_failures(tmp_path, caplog):
+    bkpt = make_breakpoint()
+    sink = ColumnarSink(str(tmp_path), chunk_rows = 4, flush_interval = 0.05, backend = "npy")
+    write_rows = sink.write_rows
+    calls = []
+
+    def failing_once(name, rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write_rows(name, rows)
+
+    sink.write_rows = failing_once
+    with caplog.at_level(logging.ERROR, logger = "pygdbnx.storage"):
+        for i in range(4):
+            sink.put(make_event(bkpt, i, i))
+        wait_for(lambda: sink.rows_dropped == 4)
+    assert "disk full" in caplog.text
+    assert sink.flusher.is_alive()
+    # fewer rows than a chunk are written once they waited for flush_interval
+    sink.put(make_event(bkpt, 4, 4))
+    wait_for(lambda: sink.rows_written == 1)
+    sink.close()
+    assert read_columns(str(tmp_path), "spawn")['x0'].tolist() == [4]
+
+
+def test_put_waits_for_the_flusher_at_max_pending_rows(tmp_path):
+    bkpt = make_breakpoint()
+    sink = ColumnarSink(str(tmp_path), chunk_rows = 1000, flush_interval = 60.0,
+                        backend = "npy", max_pending_rows = 4)
+    for i in range(10):
+        sink.put(make_event(bkpt, i, i))
+        assert sink.pending_rows <= 4
+    sink.close()
+    assert read_columns(str(tmp_path), "spawn")['x0'].tolist() == list(range(10))
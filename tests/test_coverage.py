@@ -0,0 +1,33 @@
+"""Tests of one-shot coverage breakpoints"""
+
+from pygdbnx.coverage import Coverage
+
+
+def test_sites_are_temporary_breakpoints_not_dprintfs(session):
+    coverage = Coverage([0x7100001000, 0x7100002000])
+    commands = session.insert_commands(coverage.breakpoints)
+    # gdb never deletes a temporary dprintf as it never stops
+    assert commands == ["-break-insert -t *0x8000001000", "-break-insert -t *0x8000002000"]
+
+
+def test_sites_print_their_capture_and_continue(session, inserted):
+    coverage = Coverage([0x7100001000])
+    session.insert_commands(coverage.breakpoints)
+    commands, error = session.register_breakpoints(coverage.breakpoints, [inserted(7)])
+    assert error is None
+    assert commands == [
+        '-break-commands 7 "silent" '
+        f'"printf \\"pygdbnx-capture:{coverage.breakpoints[0].capture_key}\\\\n\\"" "continue"'
+    ]
+
+
+def test_hit_site_is_gone_from_gdb(session, inserted):
+    coverage = Coverage([0x7100001000, 0x7100002000])
+    session.insert_commands(coverage.breakpoints)
+    session.register_breakpoints(coverage.breakpoints, [inserted(3), inserted(4)])
+    # gdb deletes the temporary breakpoint at its stop and reports it
+    session.forget_breakpoint(3)
+    remaining = {'payload': {'BreakpointTable': {'body': [{'number': "4"}]}}}
+    assert session.installed_breakpoints(remaining) == [coverage.breakpoints[1]]
+    assert not coverage.breakpoints[0].active
+    assert 3 not in session.breakpoints_by_no
@@ -0,0 +1,66 @@
+"""Tests of the layout of AArch64 core files"""
+
+import os
+import struct
+
+from pygdbnx.elfcore import (CoreWriter, ELF_HEADER, EM_AARCH64, ET_CORE, NOTE_HEADER,
+                             NT_PRSTATUS, PAGE_SIZE, PROGRAM_HEADER, PT_LOAD, PT_NOTE, prstatus)
+
+# sizeof(struct elf_prstatus) and offsetof(struct elf_prstatus, pr_reg) on aarch64 linux
+PRSTATUS_SIZE = 392
+PR_REG = 112
+PR_PID = 32
+
+
+def test_prstatus_matches_elf_prstatus():
+    registers = {'x0': 1, 'x30': 0x7100001234, 'sp': 0x10000, 'pc': 0x7100002000,
+                 'cpsr': 0x60000000, 'x1': -1}
+    note = prstatus(registers, 0x51)
+    namesz, descsz, note_type = NOTE_HEADER.unpack_from(note)
+    assert (namesz, descsz, note_type) == (5, PRSTATUS_SIZE, NT_PRSTATUS)
+    assert note[NOTE_HEADER.size:NOTE_HEADER.size + 8] == b"CORE\0\0\0\0"
+    desc = note[NOTE_HEADER.size + 8:]
+    assert len(desc) == PRSTATUS_SIZE
+    assert struct.unpack_from("<i", desc, PR_PID)[0] == 0x51
+    regs = struct.unpack_from("<34Q", desc, PR_REG)
+    assert regs[0] == 1
+    # sign-extended values are written as their unsigned bits
+    assert regs[1] == 2**64 - 1
+    assert regs[2] == 0
+    assert regs[30:] == (0x7100001234, 0x10000, 0x7100002000, 0x60000000)
+
+
+def test_core_segments_are_merged_and_page_aligned(tmp_path):
+    path = str(tmp_path / "core")
+    writer = CoreWriter(path, {'pc': 0x7100000000}, 0x51)
+    writer.add(0x7100000000, b"\1" * PAGE_SIZE)
+    writer.add(0x7100001000, b"\2" * PAGE_SIZE)
+    writer.add(0x10000, b"\3" * 0x20)
+    assert not os.path.exists(path)
+    writer.finish()
+    with open(path, "rb") as core_file:
+        data = core_file.read()
+    header = ELF_HEADER.unpack_from(data)
+    assert header[0][:4] == b"\x7fELF"
+    assert (header[1], header[2]) == (ET_CORE, EM_AARCH64)
+    program_headers = [PROGRAM_HEADER.unpack_from(data, header[5] + i * PROGRAM_HEADER.size)
+                       for i in range(header[10])]
+    assert [program_header[0] for program_header in program_headers] == [PT_NOTE, PT_LOAD, PT_LOAD]
+    note_offset, note_size = program_headers[0][2], program_headers[0][5]
+    assert NOTE_HEADER.unpack_from(data, note_offset)[2] == NT_PRSTATUS
+    assert note_size == NOTE_HEADER.size + 8 + PRSTATUS_SIZE
+    segments = [(program_header[3], program_header[2], program_header[5])
+                for program_header in program_headers[1:]]
+    assert [(address, size) for address, _, size in segments] == \
+        [(0x7100000000, 2 * PAGE_SIZE), (0x10000, 0x20)]
+    for address, offset, size in segments:
+        assert offset % PAGE_SIZE == 0
+        assert data[offset:offset + size] in (b"\1" * PAGE_SIZE + b"\2" * PAGE_SIZE, b"\3" * 0x20)
+
+
+def test_aborted_core_leaves_nothing_behind(tmp_path):
+    path = str(tmp_path / "core")
+    writer = CoreWriter(path, {})
+    writer.add(0x10000, b"\3" * 0x20)
+    writer.abort()
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,77 @@
+"""Tests of the event log and its sparse index"""
+
+import os
+
+import pytest
+
+from pygdbnx.breakpoint import Breakpoint
+from pygdbnx.capture import CaptureEvent
+from pygdbnx.eventlog import EventLog, EventLogReader
+
+FIRST = Breakpoint(0x7100001000, "first", bkpt_no = 1)
+SECOND = Breakpoint(0x7100002000, "second", bkpt_no = 2)
+
+
+def write_log(path, hits, start = 1):
+    log = EventLog(path, index_interval = 4)
+    for hit_no in range(start, start + hits):
+        bkpt = FIRST if hit_no % 2 else SECOND
+        log.append(CaptureEvent(bkpt, float(hit_no), {'x0': hit_no, 'x1': -1, 's0': 0.5},
+                                [hit_no.to_bytes(4, "little")], hit_no))
+    log.close()
+
+
+def test_get_finds_every_hit_through_the_index(tmp_path):
+    path = str(tmp_path / "events.log")
+    write_log(path, 30)
+    reader = EventLogReader(path)
+    assert reader.hit_nos == [1, 5, 9, 13, 17, 21, 25, 29]
+    for hit_no in (1, 4, 5, 17, 30):
+        event = reader.get(hit_no)
+        assert event.hit_no == hit_no
+        assert event.registers == {'x0': hit_no, 'x1': -1, 's0': 0.5}
+        assert event.memory == [hit_no.to_bytes(4, "little")]
+    assert reader.get(31) is None
+    reader.close()
+
+
+def test_between_filters_by_time_and_breakpoint(tmp_path):
+    path = str(tmp_path / "events.log")
+    write_log(path, 30)
+    reader = EventLogReader(path)
+    assert [event.hit_no for event in reader.between(10.0, 15.0)] == [10, 11, 12, 13, 14, 15]
+    assert [event.hit_no for event in reader.between(10.0, 15.0, "second")] == [10, 12, 14]
+    assert [event.hit_no for event in reader.between(10.0, 15.0, 1)] == [11, 13, 15]
+    reader.close()
+
+
+def test_reopened_log_continues_hit_numbers(tmp_path):
+    path = str(tmp_path / "events.log")
+    write_log(path, 10)
+    log = EventLog(path)
+    assert log.last_hit_no == 10
+    # a new session numbering from 1 would break the index
+    with pytest.raises(ValueError):
+        log.append(CaptureEvent(FIRST, 11.0, hit_no = 1))
+    log.close()
+    write_log(path, 10, 11)
+    reader = EventLogReader(path)
+    assert [event.hit_no for event in reader] == list(range(1, 21))
+    assert reader.get(15).hit_no == 15
+    reader.close()
+
+
+def test_incomplete_record_is_cut_off_when_reopened(tmp_path):
+    path = str(tmp_path / "events.log")
+    write_log(path, 8)
+    size = os.path.getsize(path)
+    with open(path, "ab") as log_file:
+        log_file.write(b"\x40\x00\x00\x00partial")
+    log = EventLog(path)
+    assert log.last_hit_no == 8
+    assert os.path.getsize(path) == size
+    log.close()
+    write_log(path, 2, 9)
+    reader = EventLogReader(path)
+    assert [event.hit_no for event in reader] == list(range(1, 11))
+    reader.close()
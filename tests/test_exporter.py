@@ -0,0 +1,19 @@
+"""Tests of the Prometheus metrics exporter"""
+
+from pygdbnx.breakpoint import Breakpoint
+from pygdbnx.exporter import MetricsExporter
+
+
+def test_only_installed_breakpoints_are_exported(session, inserted):
+    kept = Breakpoint(0x7100001000, "kept")
+    sites = [Breakpoint(0x7100002000 + i * 4, f"site{i}", temporary = True) for i in range(3)]
+    session.insert_commands([kept] + sites)
+    session.register_breakpoints([kept] + sites, [inserted(i + 1) for i in range(4)])
+    kept.times_hit = 7
+    # gdb deleted the temporary breakpoints once they were hit
+    for bkpt_no in (2, 3, 4):
+        session.forget_breakpoint(bkpt_no)
+    metrics = MetricsExporter(session).render()
+    assert 'pygdbnx_breakpoint_hits_total{console="127.0.0.1",breakpoint="kept",number="1"} 7' \
+        in metrics
+    assert "site" not in metrics
@@ -0,0 +1,46 @@
+"""Tests of the fast mi3 parser against pygdbmi's"""
+
+import pytest
+from pygdbmi import gdbmiparser
+
+from pygdbnx import miparser
+
+RECORDS = [
+    '12^done,memory=[{begin="0x0000007100001234",offset="0x0000000000000000",'
+    'end="0x0000007100001334",contents="' + "3b424950" * 64 + '"}]',
+    '13^done,register-values=[{number="0",value="0x1001"},'
+    '{number="1",value="0x7100001234"},{number="2",value="0x1002"}]',
+    '*stopped,reason="breakpoint-hit",disp="keep",bkptno="1",'
+    'frame={addr="0x0000007100001234",func="??",args=[],arch="aarch64"},'
+    'thread-id="1",stopped-threads="all",core="0"',
+    '=breakpoint-modified,bkpt={number="1",type="breakpoint",disp="keep",enabled="y",'
+    'addr="0x0000007100001234",times="3",ignore="2",original-location="*0x7100001234",'
+    'thread-groups=["i1"]}',
+    '=breakpoint-deleted,id="4"',
+    '*running,thread-id="all"',
+    '14^done',
+    '15^error,msg="No symbol \\"foo\\" in current context."',
+    '16^done,value="0x7100001234 \\"name\\" \\\\"',
+    '~"x3             0x1001              4097\\n"',
+    '~"pygdbnx-capture:1:4097:0807060504030201\\n"',
+    '&"info register $x3\\n"',
+    '@"\\tquoted \\"target\\" output\\n"',
+    '(gdb)',
+]
+
+
+@pytest.mark.parametrize("record", RECORDS)
+def test_parses_like_pygdbmi(record):
+    expected = gdbmiparser.parse_response(record)
+    parsed = miparser.parse_response(record)
+    assert {key: parsed[key] for key in expected} == expected
+
+
+def test_records_are_indexable_like_dicts():
+    record = miparser.parse_response('7^done,value="0x1"')
+    assert record['token'] == 7
+    assert record.get('payload') == {'value': "0x1"}
+    assert record.get('unknown', 1) == 1
+    assert 'type' in record
+    with pytest.raises(KeyError):
+        record['unknown'] # pylint: disable=pointless-statement
@@ -0,0 +1,112 @@
+"""Tests of the offline GdbProcess served from snapshots"""
+
+import struct
+
+import pytest
+
+from pygdbnx.exceptions import GdbCommandException, MemoryReadException
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.offline import OfflineGdbProcess
+from pygdbnx.session import SwitchSession
+from pygdbnx.snapshotstore import SnapshotStore
+
+MAIN = 0x8000000000
+HEAP = 0x20000000
+STACK = 0x30000000
+
+
+class FakeConsole(SwitchSession):
+    """Halted console answering the reads snapshots are taken with"""
+    read_regions = GdbProcess.read_regions
+    dump_snapshot = GdbProcess.dump_snapshot
+    store_snapshot = GdbProcess.store_snapshot
+    snapshot_metadata = GdbProcess.snapshot_metadata
+
+    def __init__(self):
+        self.init_session("127.0.0.1")
+        self.process_id = 81
+        self.title = "0100000000010000"
+        self.main_base, self.main_max = MAIN, MAIN + 0x2000
+        self.heap_base, self.heap_max = HEAP, HEAP + 0x2000
+        self.stack_base, self.stack_max = STACK, STACK + 0x1000
+        self.memory = {
+            MAIN: bytes(range(256)) * 32,
+            HEAP: struct.pack("<Qf", 0x1122334455667788, 1.5).ljust(0x2000, b"\0"),
+        }
+
+    def memory_regions(self):
+        # the stack can not be read
+        return [("main", MAIN, 0x2000), ("heap", HEAP, 0x2000), ("stack", STACK, 0x1000)]
+
+    def write_batch(self, commands):
+        results = []
+        for command in commands:
+            address, size = (int(value) for value in command.split()[1:])
+            data = next((data[address - base:address - base + size]
+                         for base, data in self.memory.items()
+                         if base <= address < base + len(data)), None)
+            if data is None:
+                results.append({'message': "error", 'payload': {'msg': "Cannot access memory"}})
+                continue
+            results.append({'message': "done", 'payload': {'memory': [
+                {'begin': hex(address), 'contents': data.hex()}
+            ]}})
+        return results
+
+    def read_registers(self):
+        return {'x0': 2**64 - 5, 'x29': STACK + 0x100, 'x30': MAIN + 0x1234,
+                'sp': STACK + 0x80, 'pc': MAIN + 0x1000}
+
+    def read_register(self, register):
+        return {'s0': 2.5}[register]
+
+
+@pytest.fixture(params = ["file", "store"])
+def offline(request, tmp_path):
+    console = FakeConsole()
+    if request.param == "file":
+        path = str(tmp_path / "halt.snap")
+        console.dump_snapshot(path, chunk_size = 0x1000, extra_registers = ["s0"])
+        process = OfflineGdbProcess(path)
+    else:
+        store = SnapshotStore(str(tmp_path / "store"), compress = False)
+        name = console.store_snapshot(store, chunk_size = 0x1000, extra_registers = ["s0"])
+        process = OfflineGdbProcess(store.open(name))
+    yield process
+    process.close()
+
+
+def test_layout_is_restored(offline):
+    assert offline.process_id == 81
+    assert (offline.main_base, offline.heap_base, offline.stack_base) == (MAIN, HEAP, STACK)
+
+
+def test_memory_is_read_from_the_snapshot(offline):
+    assert offline.read_memory(MAIN + 0x7FE, 4) == bytes([0xFE, 0xFF, 0x00, 0x01])
+    assert offline.read_int(0x10, "w", offset_main = True) == 0x13121110
+    assert offline.read_int(0, offset_heap = True) == 0x1122334455667788
+    assert offline.read_float(8, offset_heap = True) == 1.5
+
+
+def test_unreadable_regions_were_not_captured(offline):
+    with pytest.raises(MemoryReadException):
+        offline.read_memory(STACK, 8)
+    with pytest.raises(MemoryReadException):
+        offline.read_memory(MAIN + 0x1FFC, 8)
+
+
+def test_registers_read_like_a_console(offline):
+    assert offline.read_register("x0") == 2**64 - 5
+    assert offline.read_register("w0") == 2**32 - 5
+    assert offline.read_register("fp") == STACK + 0x100
+    assert offline.read_register("lr") == MAIN + 0x1234
+    assert offline.read_register("s0") == 2.5
+    assert offline.read_program_counter() == 0x7100001000
+    assert offline.evaluate("$sp + 0x18") == STACK + 0x98
+    with pytest.raises(GdbCommandException):
+        offline.read_register("x5")
+
+
+def test_snapshots_are_read_only(offline):
+    with pytest.raises(GdbCommandException):
+        offline.write_int(0, 1, offset_heap = True)
@@ -0,0 +1,46 @@
+"""Tests of matching mi3 records to in-flight commands"""
+
+from pygdbnx.router import RecordRouter
+
+
+def console(payload):
+    return {'type': "console", 'message': None, 'payload': payload, 'token': None}
+
+
+def result(token):
+    return {'type': "result", 'message': "done", 'payload': None, 'token': token}
+
+
+def test_stream_records_belong_to_the_oldest_command():
+    router = RecordRouter()
+    router.expect(1)
+    router.expect(2)
+    assert router.route(console("first")) is None
+    assert router.route(result(1)) == (1, [console("first"), result(1)])
+    assert router.route(console("second")) is None
+    assert router.route(result(2)) == (2, [console("second"), result(2)])
+
+
+def test_captures_and_async_records_are_never_claimed():
+    router = RecordRouter()
+    router.expect(1)
+    capture = console("pygdbnx-capture:1:4097\\n")
+    stopped = {'type': "notify", 'message': "stopped", 'payload': {}, 'token': None}
+    assert router.route(capture) == (None, [capture])
+    assert router.route(stopped) == (None, [stopped])
+    assert router.route(result(1)) == (1, [result(1)])
+
+
+def test_records_without_a_command_are_unclaimed():
+    router = RecordRouter()
+    assert router.route(console("idle")) == (None, [console("idle")])
+    # e.g. the result of a command that timed out and was abandoned
+    assert router.route(result(3)) == (None, [result(3)])
+
+
+def test_abandon_forgets_in_flight_commands():
+    router = RecordRouter()
+    router.expect(1)
+    router.expect(2)
+    assert router.abandon() == [1, 2]
+    assert router.route(result(1)) == (None, [result(1)])
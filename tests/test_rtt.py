@@ -0,0 +1,51 @@
+"""Tests of round-trip time estimation"""
+
+import pytest
+
+from pygdbnx.rtt import RttEstimator
+
+
+def test_initial_values_before_any_sample():
+    rtt = RttEstimator(initial_timeout = 2.0, initial_drain = 0.1)
+    assert rtt.srtt is None
+    assert rtt.timeout() == 2.0
+    assert rtt.drain_window() == 0.1
+
+
+def test_first_sample_sets_the_estimate():
+    rtt = RttEstimator()
+    rtt.sample(0.04)
+    assert rtt.srtt == pytest.approx(0.04)
+    assert rtt.rttvar == pytest.approx(0.02)
+    assert rtt.samples == 1
+    assert rtt.drain_window() == pytest.approx(0.04 + 2 * 0.02)
+
+
+def test_later_samples_are_smoothed():
+    rtt = RttEstimator()
+    rtt.sample(0.04)
+    rtt.sample(0.12)
+    # variation is updated from the previous smoothed value
+    assert rtt.rttvar == pytest.approx(3 / 4 * 0.02 + 1 / 4 * 0.08)
+    assert rtt.srtt == pytest.approx(7 / 8 * 0.04 + 1 / 8 * 0.12)
+    for _ in range(200):
+        rtt.sample(0.03)
+    assert rtt.srtt == pytest.approx(0.03)
+    assert rtt.rttvar == pytest.approx(0.0, abs = 1e-9)
+
+
+def test_drain_window_is_clamped():
+    rtt = RttEstimator(max_drain = 0.15)
+    for _ in range(200):
+        rtt.sample(0.0001)
+    assert rtt.drain_window() == 0.01
+    rtt.sample(2.0)
+    assert rtt.drain_window() == 0.15
+
+
+def test_timeout_is_clamped():
+    rtt = RttEstimator(min_timeout = 1.0, max_timeout = 30.0)
+    rtt.sample(0.05)
+    assert rtt.timeout() == 1.0
+    rtt.sample(100.0)
+    assert rtt.timeout() == 30.0
@@ -0,0 +1,56 @@
+"""Tests of the gdb commands sampling and budgeting breakpoints"""
+
+from pygdbnx.breakpoint import Breakpoint
+from pygdbnx.session import SwitchSession
+
+
+def test_sample_condition_counts_hits_in_gdb():
+    bkpt = Breakpoint(0x7100001000, "sampled", bkpt_no = 5, sample_every = 4)
+    assert SwitchSession.sample_condition(bkpt) == "++$pygdbnx_hits_5 % 4 == 0"
+
+
+def test_sample_commands_reset_the_counter_or_clear_the_condition(session):
+    bkpt = Breakpoint(0x7100001000, "sampled", bkpt_no = 5, sample_every = 4)
+    assert session.sample_commands(bkpt) == [
+        "set $pygdbnx_hits_5 = 0",
+        "condition 5 ++$pygdbnx_hits_5 % 4 == 0",
+    ]
+    bkpt.sample_every = 1
+    assert session.sample_commands(bkpt) == ["condition 5"]
+
+
+def test_auto_continue_budget_is_left_to_gdb(session, inserted):
+    bkpt = Breakpoint(0x7100001000, "budgeted", registers = ["x0"], auto_continue = True,
+                      sample_every = 4, max_hits = 10)
+    session.insert_commands([bkpt])
+    commands, error = session.register_breakpoints([bkpt], [inserted(5)])
+    assert error is None
+    assert commands == [
+        "set $pygdbnx_hits_5 = 0",
+        "condition 5 ++$pygdbnx_hits_5 % 4 == 0",
+        "enable count 10 5",
+    ]
+    bkpt.times_handled = 4
+    assert session.toggle_commands("enable", [bkpt]) == ["enable count 6 5"]
+    for _ in range(6):
+        session.count_capture(bkpt)
+    assert not bkpt.active
+    # re-enabling would capture past the budget
+    assert session.toggle_commands("enable", [bkpt]) == []
+
+
+def test_handled_hits_are_sampled_through_the_ignore_count(session):
+    bkpt = Breakpoint(0x7100001000, "sampled", bkpt_no = 6, sample_every = 3)
+    assert session.handled_hit_commands(bkpt) == ["ignore 6 2"]
+    # a throttle asking for more wins over sampling
+    assert session.handled_hit_commands(bkpt, 7) == ["ignore 6 7"]
+
+
+def test_forgotten_breakpoints_leave_active_breakpoints(session, inserted):
+    bkpts = [Breakpoint(0x7100001000 + i * 4, f"site{i}", temporary = True) for i in range(4)]
+    session.insert_commands(bkpts)
+    session.register_breakpoints(bkpts, [inserted(i + 1) for i in range(4)])
+    assert session.forget_breakpoint(2) is bkpts[1]
+    assert session.forget_breakpoints([3, 4, 9]) == bkpts[2:]
+    assert session.active_breakpoints == [bkpts[0]]
+    assert list(session.breakpoints_by_no) == [1]
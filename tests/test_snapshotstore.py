@@ -0,0 +1,73 @@
+"""Tests of deduplicated snapshot storage"""
+
+import pytest
+
+from pygdbnx.exceptions import MemoryReadException
+from pygdbnx.snapshotstore import SnapshotStore
+
+PAGE = 0x1000
+REGIONS = [("heap", 0x10000, 4 * PAGE), ("main", 0x7100000000, 2 * PAGE)]
+
+
+def pages(*fills):
+    return b"".join(bytes([fill]) * PAGE for fill in fills)
+
+
+def chunks(heap, main):
+    return [("heap", 0x10000, heap), ("main", 0x7100000000, main)]
+
+
+def test_identical_pages_are_stored_once(tmp_path):
+    store = SnapshotStore(str(tmp_path), compress = False)
+    store.add(REGIONS, chunks(pages(1, 2, 1, 2), pages(3, 3)))
+    store.add(REGIONS, chunks(pages(1, 2, 1, 4), pages(3, 3)))
+    stats = store.stats()
+    assert stats['snapshots'] == 2
+    assert stats['unique_pages'] == 4
+    assert stats['page_bytes'] == 4 * PAGE
+    store.close()
+
+
+def test_snapshots_read_back_through_their_deltas(tmp_path):
+    store = SnapshotStore(str(tmp_path), compress = False, keyframe_interval = 2)
+    names = [store.add(REGIONS, chunks(pages(1, 2, 3, i), pages(9, i)), {'i': i})
+             for i in range(5)]
+    store.close()
+    # reopened, so page tables are resolved from the files alone
+    store = SnapshotStore(str(tmp_path), compress = False)
+    assert store.snapshots() == names
+    for i, name in enumerate(names):
+        snapshot = store.open(name)
+        assert snapshot.metadata == {'i': i}
+        assert snapshot.read(0x10000 + 3 * PAGE, 4) == bytes([i]) * 4
+        # across a page boundary
+        assert snapshot.read(0x7100000000 + PAGE - 2, 4) == bytes([9, 9, i, i])
+    store.close()
+
+
+def test_unread_pages_can_not_be_read(tmp_path):
+    store = SnapshotStore(str(tmp_path), compress = False)
+    # the second heap chunk failed to be read and an unaligned chunk is skipped
+    name = store.add(REGIONS, [("heap", 0x10000, pages(1)), ("heap", 0x12000, pages(3, 4)),
+                               ("main", 0x7100000010, pages(5))])
+    snapshot = store.open(name)
+    assert snapshot.read(0x12000, 2 * PAGE) == pages(3, 4)
+    for address in (0x11000, 0x7100000000, 0x20000):
+        with pytest.raises(MemoryReadException):
+            snapshot.read(address, 4)
+    store.close()
+
+
+def test_pages_cut_short_by_small_chunks_are_skipped(tmp_path):
+    store = SnapshotStore(str(tmp_path), compress = False)
+    regions = [("heap", 0x10000, 2 * PAGE), ("main", 0x7100000000, PAGE + 0x10)]
+    # half a heap page, and main ends with a short page of its own
+    name = store.add(regions, [("heap", 0x10000, pages(1)[:PAGE // 2]),
+                               ("heap", 0x11000, pages(2)),
+                               ("main", 0x7100000000, pages(3) + b"\4" * 0x10)])
+    snapshot = store.open(name)
+    with pytest.raises(MemoryReadException):
+        snapshot.read(0x10000 + PAGE // 2 - 2, 4)
+    assert snapshot.read(0x11000, 4) == b"\2" * 4
+    assert snapshot.read(0x7100000000 + PAGE - 2, 4) == b"\3\3\4\4"
+    store.close()
@@ -0,0 +1,153 @@
+"""Tests of throttling breakpoints to an overhead budget"""
+
+import pytest
+
+from pygdbnx.breakpoint import Breakpoint
+from pygdbnx.gdbprocess import GdbProcess
+from pygdbnx.session import SwitchSession
+from pygdbnx.throttle import OverheadThrottle
+
+
+class Clock:
+    """Stands in for time.perf_counter"""
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProcess(SwitchSession):
+    """Records the commands a throttle sends instead of sending them to gdb"""
+    def __init__(self, throttle, bkpts, async_execution = True):
+        self.init_session("127.0.0.1")
+        self.throttle = throttle
+        self.async_execution = async_execution
+        self.target_running = False
+        self.sent = []
+        for bkpt_no, bkpt in enumerate(bkpts, 1):
+            bkpt.bkpt_no = bkpt_no
+            self.breakpoints_by_no[bkpt_no] = bkpt
+
+    def write_batch(self, commands):
+        self.sent.extend(commands)
+
+    def ignore_hits(self, bkpt, count):
+        self.sent.append(f"ignore {bkpt.bkpt_no} {count}")
+
+    def disable_breakpoint(self, bkpt):
+        bkpt.active = False
+        self.sent.append(f"disable {bkpt.bkpt_no}")
+
+    def enable_breakpoint(self, bkpt):
+        bkpt.active = True
+        self.sent.append(f"enable {bkpt.bkpt_no}")
+
+    def interrupt(self):
+        self.sent.append("-exec-interrupt")
+        self.target_running = False
+
+    def resume_execution(self):
+        self.sent.append("continue &")
+        self.target_running = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake_clock = Clock()
+    monkeypatch.setattr("pygdbnx.throttle.time.perf_counter", fake_clock)
+    return fake_clock
+
+
+def test_overhead_within_budget_throttles_nothing(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0)
+    bkpt = Breakpoint(0x7100001000, "cheap", sample_every = 1)
+    process = FakeProcess(throttle, [bkpt])
+    clock.now += 0.5
+    throttle.record(bkpt, 0.05)
+    assert not throttle.due()
+    assert throttle.apply(process, bkpt) == 0
+    assert bkpt.sample_every == 1
+    assert not process.sent
+
+
+def test_worst_offender_is_throttled(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0)
+    cheap = Breakpoint(0x7100001000, "cheap")
+    costly = Breakpoint(0x7100002000, "costly", registers = ["x0"], auto_continue = True)
+    process = FakeProcess(throttle, [cheap, costly])
+    clock.now += 0.5
+    throttle.record(cheap, 0.05)
+    for _ in range(20):
+        throttle.record_capture(costly)
+    assert throttle.due()
+    # the halt at cheap throttles the auto-continue breakpoint costing the most
+    assert throttle.apply(process, cheap) == 0
+    assert (cheap.sample_every, costly.sample_every) == (1, 2)
+    assert process.sent == ["set $pygdbnx_hits_2 = 0", "condition 2 ++$pygdbnx_hits_2 % 2 == 0"]
+    assert not throttle.statistics
+
+
+def test_rate_limit_is_merged_with_sampling(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0, policy = "rate_limit", cooldown = 2.0)
+    halted = Breakpoint(0x7100001000, "halted", sample_every = 3)
+    other = Breakpoint(0x7100002000, "other")
+    process = FakeProcess(throttle, [halted, other])
+    for _ in range(10):
+        throttle.record(halted, 0.02)
+    # 10 hits a second, sampled every 3 hits, skipped for 2 seconds
+    ignore = throttle.apply(process, halted)
+    assert ignore == 60
+    assert not process.sent
+    assert process.handled_hit_commands(halted, ignore) == ["ignore 1 60"]
+    # an offender the target is not halted at gets its ignore count of its own
+    for _ in range(10):
+        throttle.record(other, 0.02)
+    assert throttle.apply(process, halted) == 0
+    assert process.sent == ["ignore 2 20"]
+    assert process.handled_hit_commands(halted, 0) == ["ignore 1 2"]
+
+
+def test_throttling_is_released_after_the_quiet_window(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0, policy = "disable",
+                                quiet_window = 10.0)
+    noisy = Breakpoint(0x7100001000, "noisy")
+    process = FakeProcess(throttle, [noisy])
+    throttle.record(noisy, 0.5)
+    throttle.apply(process, noisy)
+    assert not noisy.active
+    clock.now += 5.0
+    assert not throttle.due()
+    clock.now += 5.0
+    assert throttle.due()
+    throttle.apply(process)
+    assert noisy.active
+    assert process.sent == ["disable 1", "enable 1"]
+    assert not throttle.throttled
+
+
+def test_check_throttle_interrupts_a_running_target(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0)
+    capture = Breakpoint(0x7100001000, "capture", registers = ["x0"], auto_continue = True)
+    process = FakeProcess(throttle, [capture])
+    process.target_running = True
+    for _ in range(40):
+        throttle.record_capture(capture)
+    GdbProcess.check_throttle(process)
+    assert process.sent == ["-exec-interrupt", "set $pygdbnx_hits_1 = 0",
+                            "condition 1 ++$pygdbnx_hits_1 % 2 == 0", "continue &"]
+    assert process.target_running
+
+
+def test_last_breakpoint_to_halt_at_is_kept_without_mi_async(clock):
+    throttle = OverheadThrottle(budget = 0.1, window = 1.0, policy = "disable")
+    only = Breakpoint(0x7100001000, "only")
+    process = FakeProcess(throttle, [only], async_execution = False)
+    process.target_running = True
+    throttle.record(only, 0.5)
+    # nothing can be sent to gdb while the target runs
+    GdbProcess.check_throttle(process)
+    assert not process.sent
+    throttle.apply(process, only)
+    assert only.active
+    assert not throttle.throttled